@@ -0,0 +1,130 @@
+"""
+Contexte d'authentification mis en cache (par process API)
+- User + membership (company_id, role) + CompanyPermission, chargés en une requête
+- LRU à TTL court, clé = user_id
+- Invalidé explicitement quand membership/permissions changent (routers/company.py);
+  les autres process API voient le changement au plus tard après AUTH_CONTEXT_TTL_SECONDS
+"""
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from sqlalchemy import and_, select
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.core.cache import TTLCache
+from app.models.company_member import CompanyMember
+from app.models.company_permission import CompanyPermission
+from app.models.user import User
+
+AUTH_CONTEXT_TTL_SECONDS = 30
+
+PERMISSION_FLAGS = (
+    "can_withdraw_warehouse",
+    "can_deposit_warehouse",
+    "can_withdraw_factory",
+    "can_deposit_factory",
+    "can_manage_aircraft",
+    "can_use_aircraft",
+    "can_sell_market",
+    "can_buy_market",
+    "can_manage_workers",
+    "can_manage_members",
+    "can_manage_factories",
+    "is_founder",
+)
+
+_auth_cache = TTLCache(maxsize=10_000, ttl_seconds=AUTH_CONTEXT_TTL_SECONDS)
+
+
+@dataclass(frozen=True)
+class AuthContext:
+    user_id: uuid.UUID
+    email: str
+    username: str
+    is_active: bool
+    is_admin: bool
+    created_at: datetime
+    company_id: uuid.UUID | None = None
+    role: str | None = None
+    permissions: dict[str, bool] = field(default_factory=dict)  # Vide si pas de CompanyPermission
+
+    def can(self, flag: str) -> bool:
+        """Les fondateurs ont toutes les permissions."""
+        return bool(self.permissions.get("is_founder") or self.permissions.get(flag))
+
+    def to_user(self) -> User:
+        """
+        User détaché construit depuis le cache (à rattacher via merge(load=False)).
+        wallet et password_hash ne sont pas cachés: chargés à la demande
+        depuis la session de la requête (jamais de solde périmé).
+        """
+        user = User(
+            id=self.user_id,
+            email=self.email,
+            username=self.username,
+            is_active=self.is_active,
+            is_admin=self.is_admin,
+            created_at=self.created_at,
+        )
+        make_transient_to_detached(user)
+        return user
+
+
+def auth_context_query(user_id: uuid.UUID):
+    return select(
+        User.id, User.email, User.username, User.is_active, User.is_admin, User.created_at,
+        CompanyMember.company_id, CompanyMember.role, CompanyPermission,
+    ).outerjoin(
+        CompanyMember, CompanyMember.user_id == User.id
+    ).outerjoin(
+        CompanyPermission, and_(
+            CompanyPermission.user_id == User.id,
+            CompanyPermission.company_id == CompanyMember.company_id,
+        )
+    ).where(User.id == user_id).order_by(
+        # Plusieurs memberships: toujours la plus ancienne (stable entre requêtes et rechargements du cache)
+        CompanyMember.joined_at.asc().nulls_last(), CompanyMember.company_id.asc().nulls_last()
+    ).limit(1)
+
+
+def _from_row(row) -> AuthContext:
+    user_id, email, username, is_active, is_admin, created_at, company_id, role, perms = row
+    return AuthContext(
+        user_id=user_id,
+        email=email,
+        username=username,
+        is_active=is_active,
+        is_admin=is_admin,
+        created_at=created_at,
+        company_id=company_id,
+        role=role,
+        permissions={flag: getattr(perms, flag) for flag in PERMISSION_FLAGS} if perms else {},
+    )
+
+
+def get_auth_context(db: Session, user_id: uuid.UUID) -> AuthContext | None:
+    ctx = _auth_cache.get(user_id)
+    if ctx is None:
+        row = db.execute(auth_context_query(user_id)).first()
+        if row is None:
+            return None
+        ctx = _from_row(row)
+        _auth_cache.set(user_id, ctx)
+    return ctx
+
+
+async def get_auth_context_async(db, user_id: uuid.UUID) -> AuthContext | None:
+    ctx = _auth_cache.get(user_id)
+    if ctx is None:
+        row = (await db.execute(auth_context_query(user_id))).first()
+        if row is None:
+            return None
+        ctx = _from_row(row)
+        _auth_cache.set(user_id, ctx)
+    return ctx
+
+
+def invalidate_auth_context(*user_ids: uuid.UUID):
+    for user_id in user_ids:
+        _auth_cache.invalidate(user_id)
@@ -2,8 +2,20 @@ from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    ASYNC_DATABASE_URL: str | None = None  # Défaut: DATABASE_URL avec le driver asyncpg
+
+    # Pool de connexions (par engine et par process: sync + async)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: int = 30   # Attente max d'une connexion libre
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # Remplace les connexions plus vieilles (proxy/firewall idle)
+    DB_POOL_PRE_PING: bool = True        # Ping à chaque checkout (désactivable si recycle suffit)
+    DB_STATEMENT_TIMEOUT_MS: int = 0     # statement_timeout Postgres, 0 = désactivé
     JWT_SECRET: str = "CHANGE_ME"
     JWT_ALG: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
 
+    # Scheduler (worker): décalage aléatoire max appliqué à chaque tick des jobs
+    SCHEDULER_JITTER_SECONDS: int = 0
+
 settings = Settings()
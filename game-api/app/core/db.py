@@ -1,10 +1,55 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from app.core.config import settings
+from app.core.pool_metrics import TimedAsyncAdaptedQueuePool, TimedQueuePool
 
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
+POOL_OPTIONS = dict(
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+    pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+)
+
+_statement_timeout = str(settings.DB_STATEMENT_TIMEOUT_MS)
+
+engine = create_engine(
+    settings.DATABASE_URL,
+    poolclass=TimedQueuePool,
+    connect_args={"options": f"-c statement_timeout={_statement_timeout}"} if settings.DB_STATEMENT_TIMEOUT_MS else {},
+    **POOL_OPTIONS,
+)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
+# Query params of DATABASE_URL passed on to asyncpg (string values only: the dialect
+# does not coerce them); libpq-only params (connect_timeout, sslrootcert, ...) are dropped
+ASYNCPG_URL_PARAMS = {"ssl", "prepared_statement_cache_size"}
+LIBPQ_TO_ASYNCPG_PARAMS = {"sslmode": "ssl"}  # Mêmes valeurs (disable, require, verify-full...)
+
+
+def async_database_url(database_url: str):
+    """DATABASE_URL (psycopg2/libpq) -> URL asyncpg: driver + query params traduits (sslmode -> ssl)."""
+    url = make_url(database_url)
+    query = {}
+    for key, value in url.query.items():
+        key = LIBPQ_TO_ASYNCPG_PARAMS.get(key, key)
+        if key in ASYNCPG_URL_PARAMS:
+            query[key] = value
+    return url.set(drivername="postgresql+asyncpg", query=query)
+
+
+# Async engine (asyncpg) for I/O-bound read endpoints (world, market, active mission).
+# Same database as DATABASE_URL unless ASYNC_DATABASE_URL is set.
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL),
+    poolclass=TimedAsyncAdaptedQueuePool,
+    connect_args={"server_settings": {"statement_timeout": _statement_timeout}} if settings.DB_STATEMENT_TIMEOUT_MS else {},
+    **POOL_OPTIONS,
+)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 class Base(DeclarativeBase):
     pass
 
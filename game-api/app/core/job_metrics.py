@@ -0,0 +1,214 @@
+"""
+Métriques d'exécution des jobs du scheduler
+- Durée (histogramme), lignes traitées, dernier succès, échecs, runs sautés
+- Tenues en mémoire dans le worker leader, puis persistées après chaque run
+  dans game.scheduler_job_metrics (lues par l'API: GET /admin/metrics/jobs)
+- Les totaux persistés sont rechargés au premier usage d'un job (redémarrage,
+  changement de leader): les compteurs continuent au lieu de repartir de zéro
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.core.db import SessionLocal
+from app.models.scheduler_job_metric import SchedulerJobMetric
+
+logger = logging.getLogger(__name__)
+
+# Bornes supérieures (secondes) de l'histogramme de durée; dernier bucket = +inf
+DURATION_BUCKETS_SECONDS = (0.1, 0.5, 1, 5, 15, 60, 300)
+
+
+def _utcnow_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _rows_processed(result) -> int | None:
+    """Les jobs retournent un nombre de lignes ou la liste des lignes traitées."""
+    if isinstance(result, bool):
+        return None
+    if isinstance(result, int):
+        return result
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    return None
+
+
+class JobMetrics:
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0  # Tick ignoré: run précédent encore en cours ou tick manqué
+        self.running = False
+        self.last_started_at: str | None = None
+        self.last_success_at: str | None = None
+        self.last_failure_at: str | None = None
+        self.last_error: str | None = None
+        self.last_duration_s: float | None = None
+        self.total_duration_s = 0.0
+        self.max_duration_s = 0.0
+        self.last_rows: int | None = None
+        self.total_rows = 0
+        self.duration_buckets = [0] * (len(DURATION_BUCKETS_SECONDS) + 1)
+        self.restored = False  # Totaux persistés rechargés (sinon jamais écrasés)
+
+    def restore(self, stored: dict | None):
+        """Ajoute les totaux d'un snapshot persisté (précédent leader) aux compteurs en mémoire."""
+        self.restored = True
+        if not stored:
+            return
+        self.runs += stored.get("runs") or 0
+        self.failures += stored.get("failures") or 0
+        self.skipped += stored.get("skipped") or 0
+        self.total_duration_s += stored.get("total_duration_s") or 0.0
+        self.max_duration_s = max(self.max_duration_s, stored.get("max_duration_s") or 0.0)
+        self.total_rows += stored.get("total_rows") or 0
+        histogram = stored.get("duration_histogram") or {}
+        keys = [f"le_{bound}" for bound in DURATION_BUCKETS_SECONDS] + ["le_inf"]
+        for i, key in enumerate(keys):
+            self.duration_buckets[i] += histogram.get(key) or 0
+        for attr in ("last_started_at", "last_success_at", "last_failure_at", "last_error",
+                     "last_duration_s", "last_rows"):
+            if getattr(self, attr) is None:
+                setattr(self, attr, stored.get(attr))
+
+    def observe(self, duration_s: float, rows: int | None, error: Exception | None):
+        self.runs += 1
+        self.running = False
+        self.last_duration_s = round(duration_s, 4)
+        self.total_duration_s += duration_s
+        self.max_duration_s = max(self.max_duration_s, duration_s)
+        bucket = next(
+            (i for i, bound in enumerate(DURATION_BUCKETS_SECONDS) if duration_s <= bound),
+            len(DURATION_BUCKETS_SECONDS),
+        )
+        self.duration_buckets[bucket] += 1
+
+        if error is None:
+            self.last_success_at = _utcnow_iso()
+            self.last_rows = rows
+            if rows is not None:
+                self.total_rows += rows
+        else:
+            self.failures += 1
+            self.last_failure_at = _utcnow_iso()
+            self.last_error = f"{type(error).__name__}: {error}"[:500]
+
+    def snapshot(self) -> dict:
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "running": self.running,
+            "last_started_at": self.last_started_at,
+            "last_success_at": self.last_success_at,
+            "last_failure_at": self.last_failure_at,
+            "last_error": self.last_error,
+            "last_duration_s": self.last_duration_s,
+            "avg_duration_s": round(self.total_duration_s / self.runs, 4) if self.runs else None,
+            "max_duration_s": round(self.max_duration_s, 4),
+            "total_duration_s": round(self.total_duration_s, 4),
+            "last_rows": self.last_rows,
+            "total_rows": self.total_rows,
+            "duration_histogram": {
+                **{f"le_{bound}": count for bound, count in zip(DURATION_BUCKETS_SECONDS, self.duration_buckets)},
+                "le_inf": self.duration_buckets[-1],
+            },
+            "worker": f"{socket.gethostname()}:{os.getpid()}",
+        }
+
+
+class JobMetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, JobMetrics] = {}
+        self._lock = threading.Lock()
+
+    def get(self, job_id: str) -> JobMetrics:
+        with self._lock:
+            metrics = self._metrics.get(job_id)
+            if metrics is None:
+                metrics = self._metrics[job_id] = JobMetrics(job_id)
+            if metrics.restored:
+                return metrics
+
+        # Rechargement hors verrou (I/O DB); un seul appel applique le résultat
+        try:
+            stored = self._load(job_id)
+        except Exception as e:
+            logger.warning(f"[Scheduler] Métriques du job {job_id} non rechargées: {e}")
+            return metrics
+        with self._lock:
+            if not metrics.restored:
+                metrics.restore(stored)
+        return metrics
+
+    def _load(self, job_id: str) -> dict | None:
+        db = SessionLocal()
+        try:
+            return db.scalar(select(SchedulerJobMetric.metrics).where(SchedulerJobMetric.job_id == job_id))
+        finally:
+            db.close()
+
+    def snapshots(self) -> dict[str, dict]:
+        with self._lock:
+            return {job_id: m.snapshot() for job_id, m in self._metrics.items()}
+
+    def instrument(self, job_id: str, func):
+        """Enveloppe un job: chronomètre, compte les lignes et les échecs (l'exception est propagée)."""
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            metrics = self.get(job_id)
+            metrics.running = True
+            metrics.last_started_at = _utcnow_iso()
+            self.persist(job_id)  # Visible "en cours" (ou bloqué) côté admin pendant le run
+            start = time.perf_counter()
+            error = None
+            result = None
+            try:
+                result = func(*args, **kwargs)
+                return result
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                metrics.observe(time.perf_counter() - start, _rows_processed(result), error)
+                self.persist(job_id)
+
+        return wrapper
+
+    def record_skipped(self, job_id: str):
+        self.get(job_id).skipped += 1
+        self.persist(job_id)
+
+    def persist(self, job_id: str):
+        """Écrit le snapshot du job; une erreur ici ne doit jamais faire échouer le job."""
+        metrics = self.get(job_id)
+        if not metrics.restored:
+            return  # Totaux persistés pas encore rechargés: ne pas les écraser (réessayé au prochain run)
+        snapshot = metrics.snapshot()
+        db = SessionLocal()
+        try:
+            stmt = pg_insert(SchedulerJobMetric).values(job_id=job_id, metrics=snapshot)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[SchedulerJobMetric.job_id],
+                set_={"metrics": stmt.excluded.metrics, "updated_at": stmt.excluded.updated_at},
+            ))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"[Scheduler] Métriques du job {job_id} non persistées: {e}")
+        finally:
+            db.close()
+
+
+# Instance globale (worker leader)
+job_metrics = JobMetricsRegistry()
@@ -0,0 +1,86 @@
+"""
+Métriques des pools de connexions (par process)
+- Jauges: taille, connexions empruntées, overflow, disponibles
+- Attente au checkout (count, total, max, timeouts): détecte la famine du pool
+  avant que les requêtes ne tombent en timeout
+"""
+import threading
+import time
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Un checkout plus lent que ce seuil est compté comme "attente" (pool saturé)
+SLOW_CHECKOUT_SECONDS = 0.01
+
+
+class CheckoutStats:
+    def __init__(self):
+        self.checkouts = 0
+        self.waits = 0  # Checkouts > SLOW_CHECKOUT_SECONDS
+        self.timeouts = 0
+        self.total_wait_s = 0.0
+        self.max_wait_s = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, wait_s: float, timed_out: bool):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait_s += wait_s
+            self.max_wait_s = max(self.max_wait_s, wait_s)
+            if wait_s > SLOW_CHECKOUT_SECONDS:
+                self.waits += 1
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "slow_checkouts": self.waits,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait_s / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait_s * 1000, 3),
+            }
+
+
+class _TimedCheckoutMixin:
+    """Chronomètre l'obtention d'une connexion (attente sur la queue et ouverture d'une nouvelle connexion incluses)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_stats = CheckoutStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.checkout_stats.observe(time.perf_counter() - start, timed_out)
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_snapshot(pool) -> dict:
+    snapshot = {
+        "pool_class": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+        "max_overflow": pool._max_overflow,
+    }
+    stats = getattr(pool, "checkout_stats", None)
+    if stats is not None:
+        snapshot["checkout"] = stats.snapshot()
+    return snapshot
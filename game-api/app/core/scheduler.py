@@ -2,191 +2,241 @@
 APScheduler pour les tâches automatiques
 - Production automatique des usines T0 (NPC)
 - Complétion des batches de production T1+
+- Exécuté dans le worker dédié (python -m app.worker), jamais dans les process API
+- Chaque job est instrumenté (app.core.job_metrics) et ne peut pas se chevaucher
 """
 import logging
+from apscheduler.events import EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 
+from app.core.config import settings
+from app.core.job_metrics import job_metrics
+
 logger = logging.getLogger(__name__)
 
-# Instance globale du scheduler
-scheduler = BackgroundScheduler()
+# Scheduler du mandat de leader en cours (None hors mandat)
+# Recréé à chaque élection: après shutdown(), le pool de threads de l'executor
+# APScheduler ne peut plus être redémarré
+scheduler: BackgroundScheduler | None = None
 
 # Configuration
 T0_PRODUCTION_INTERVAL_MINUTES = 5  # Production T0 toutes les 5 min
-BATCH_CHECK_INTERVAL_MINUTES = 1    # Vérification batches toutes les minutes
+BATCH_RECONCILE_INTERVAL_MINUTES = 15  # Réconciliation batches (complétion événementielle via batch_timer)
 HOURLY_JOBS_INTERVAL_MINUTES = 60   # Jobs horaires (salaires, injuries)
 POOL_RESET_INTERVAL_HOURS = 6       # Reset pools toutes les 6 heures
 MISSION_TIMEOUT_CHECK_MINUTES = 15  # V0.8 Check mission timeouts every 15 min
 MISSION_TIMEOUT_HOURS = 24  # Missions expire after 24 hours
+MARKET_STATS_FOLD_INTERVAL_MINUTES = 1  # Repli des deltas market_stats
+
+
+# Sweep ensembliste des missions expirées (un seul statement):
+# - missions in_progress depuis plus de MISSION_TIMEOUT_HOURS -> failed/timeout
+# - avions remis en "parked" (restent à l'origine)
+# - le cargo n'a jamais quitté la soute (create_mission ne fait qu'un snapshot):
+#   il reste dans l'avion, rien n'est re-crédité à l'inventaire d'origine
+MISSION_TIMEOUT_SWEEP_SQL = """
+    WITH expired AS (
+        UPDATE game.missions
+        SET status = 'failed',
+            failure_reason = 'timeout',
+            completed_at = now(),
+            xp_earned = 0
+        WHERE status = 'in_progress'
+          AND started_at < :cutoff
+        RETURNING id, aircraft_id
+    ),
+    parked AS (
+        UPDATE game.company_aircraft a
+        SET status = 'parked'
+        FROM expired e
+        WHERE a.id = e.aircraft_id
+        RETURNING a.id
+    )
+    SELECT e.id,
+           (SELECT COUNT(*) FROM parked) AS aircraft_parked
+    FROM expired e
+"""
 
 
 def check_mission_timeouts():
     """
     V0.8 - Check for missions that have timed out (in_progress > 24 hours).
-    Returns cargo to origin, marks mission as failed.
+    Marks mission as failed, aircraft parked at origin with its cargo still aboard.
+    Set-based: coût constant en allers-retours quel que soit le nombre de missions expirées.
     """
     from datetime import datetime, timedelta
+    from sqlalchemy import text
     from sqlalchemy.orm import Session
     from app.core.db import SessionLocal
-    from app.models.mission import Mission
-    from app.models.company_aircraft import CompanyAircraft
-    from app.models.company_inventory import CompanyInventory
-    import uuid
 
     db: Session = SessionLocal()
     try:
         cutoff = datetime.utcnow() - timedelta(hours=MISSION_TIMEOUT_HOURS)
 
-        # Find expired missions
-        expired_missions = db.query(Mission).filter(
-            Mission.status == "in_progress",
-            Mission.started_at < cutoff,
-        ).all()
-
-        for mission in expired_missions:
-            logger.info(f"[Scheduler] Mission {mission.id} timed out after 24h")
-
-            # Return cargo to origin
-            if mission.cargo_snapshot and mission.cargo_snapshot.get("items"):
-                for cargo in mission.cargo_snapshot["items"]:
-                    try:
-                        item_id = uuid.UUID(cargo["item_id"])
-                        # Find or create inventory at origin
-                        origin_inv = db.query(CompanyInventory).filter(
-                            CompanyInventory.company_id == mission.company_id,
-                            CompanyInventory.item_id == item_id,
-                            CompanyInventory.airport_ident == mission.origin_icao,
-                        ).first()
-
-                        if origin_inv:
-                            origin_inv.quantity += cargo["quantity"]
-                        else:
-                            origin_inv = CompanyInventory(
-                                company_id=mission.company_id,
-                                item_id=item_id,
-                                airport_ident=mission.origin_icao,
-                                quantity=cargo["quantity"],
-                            )
-                            db.add(origin_inv)
-                    except Exception as e:
-                        logger.error(f"[Scheduler] Error returning cargo: {e}")
-
-            # Reset aircraft to parked at origin
-            if mission.aircraft_id:
-                aircraft = db.query(CompanyAircraft).filter(
-                    CompanyAircraft.id == mission.aircraft_id
-                ).first()
-                if aircraft:
-                    aircraft.status = "parked"
-                    # Keep at origin (don't change location)
-
-            # Mark mission as failed
-            mission.status = "failed"
-            mission.failure_reason = "timeout"
-            mission.completed_at = datetime.utcnow()
-            mission.xp_earned = 0
-
-        if expired_missions:
-            db.commit()
-            logger.info(f"[Scheduler] Processed {len(expired_missions)} timed out missions")
+        expired = db.execute(text(MISSION_TIMEOUT_SWEEP_SQL), {"cutoff": cutoff}).all()
+        db.commit()
+
+        if expired:
+            for mission in expired:
+                logger.info(f"[Scheduler] Mission {mission.id} timed out after {MISSION_TIMEOUT_HOURS}h")
+            logger.info(
+                f"[Scheduler] Processed {len(expired)} timed out missions "
+                f"({expired[0].aircraft_parked} aircraft parked)"
+            )
+        return len(expired)
 
     except Exception as e:
         db.rollback()
         logger.error(f"[Scheduler] Error in check_mission_timeouts: {e}")
+        raise
+    finally:
+        db.close()
+
+
+def fold_market_stats():
+    """
+    V0.9 - Replie les deltas en attente (game.market_stats_deltas) dans game.market_stats.
+    Les triggers n'écrivent que des deltas (insert-only): ce job est le seul à
+    mettre à jour les lignes partagées (aéroport, tier), dans l'ordre des clés.
+    """
+    from sqlalchemy import text
+    from app.core.db import SessionLocal
+
+    db = SessionLocal()
+    try:
+        rows = db.execute(text("SELECT game.fold_market_stats()")).scalar_one()
+        db.commit()
+        return rows
+    except Exception as e:
+        db.rollback()
+        logger.error(f"[Scheduler] Error in fold_market_stats: {e}")
+        raise
     finally:
         db.close()
 
 
+def _new_scheduler() -> BackgroundScheduler:
+    # max_instances=1 + coalesce: un run lent ne s'empile jamais, les ticks manqués
+    # sont fusionnés en un seul run (et comptés comme "skipped" dans les métriques)
+    new = BackgroundScheduler(job_defaults={
+        "max_instances": 1,
+        "coalesce": True,
+        "misfire_grace_time": 60,
+    })
+    new.add_listener(_on_job_skipped, EVENT_JOB_MAX_INSTANCES | EVENT_JOB_MISSED)
+    return new
+
+
+def _add_job(func, job_id: str, name: str, **interval):
+    scheduler.add_job(
+        job_metrics.instrument(job_id, func),
+        trigger=IntervalTrigger(**interval, jitter=settings.SCHEDULER_JITTER_SECONDS or None),
+        id=job_id,
+        name=name,
+        replace_existing=True,
+    )
+
+
+def _on_job_skipped(event):
+    """Run sauté: précédent encore en cours (max_instances) ou tick manqué."""
+    logger.warning(f"[Scheduler] Job {event.job_id} sauté (run précédent encore en cours ou en retard)")
+    job_metrics.record_skipped(event.job_id)
+
+
 def setup_jobs():
     """Configure tous les jobs planifiés"""
     from app.services.production_service import (
         process_t0_factories,
-        complete_pending_batches,
         process_injured_workers,
         process_salary_payments,
     )
+    from app.services.batch_timer import batch_timer
     from app.services.worker_service import (
         process_food_and_injuries,
         cleanup_dead_workers,
     )
 
     # Job 1: Production automatique T0 (toutes les 5 min)
-    scheduler.add_job(
-        process_t0_factories,
-        trigger=IntervalTrigger(minutes=T0_PRODUCTION_INTERVAL_MINUTES),
-        id="t0_auto_production",
-        name="Production automatique usines T0",
-        replace_existing=True,
+    _add_job(
+        process_t0_factories, "t0_auto_production", "Production automatique usines T0",
+        minutes=T0_PRODUCTION_INTERVAL_MINUTES,
     )
 
-    # Job 2: Complétion des batches T1+ (toutes les minutes)
-    scheduler.add_job(
-        complete_pending_batches,
-        trigger=IntervalTrigger(minutes=BATCH_CHECK_INTERVAL_MINUTES),
-        id="batch_completion",
-        name="Complétion batches de production",
-        replace_existing=True,
+    # Job 2: Réconciliation des batches T1+ (toutes les 15 min)
+    # La complétion normale est faite à l'échéance exacte par batch_timer
+    _add_job(
+        batch_timer.reconcile, "batch_completion", "Réconciliation batches de production",
+        minutes=BATCH_RECONCILE_INTERVAL_MINUTES,
     )
 
     # Job 3: V0.6 - Food consumption & injury checks (toutes les heures)
-    scheduler.add_job(
-        process_food_and_injuries,
-        trigger=IntervalTrigger(minutes=HOURLY_JOBS_INTERVAL_MINUTES),
-        id="food_and_injuries",
-        name="V0.6 Food consumption et blessures",
-        replace_existing=True,
+    _add_job(
+        process_food_and_injuries, "food_and_injuries", "V0.6 Food consumption et blessures",
+        minutes=HOURLY_JOBS_INTERVAL_MINUTES,
     )
 
     # Job 4: V0.6 - Salary payments (toutes les heures)
-    scheduler.add_job(
-        process_salary_payments,
-        trigger=IntervalTrigger(minutes=HOURLY_JOBS_INTERVAL_MINUTES),
-        id="salary_payments",
-        name="V0.6 Paiement des salaires",
-        replace_existing=True,
+    _add_job(
+        process_salary_payments, "salary_payments", "V0.6 Paiement des salaires",
+        minutes=HOURLY_JOBS_INTERVAL_MINUTES,
     )
 
     # Job 5: V0.6 - Injured workers processing (toutes les heures)
-    scheduler.add_job(
-        process_injured_workers,
-        trigger=IntervalTrigger(minutes=HOURLY_JOBS_INTERVAL_MINUTES),
-        id="injury_processing",
-        name="V0.6 Traitement blessures workers",
-        replace_existing=True,
+    _add_job(
+        process_injured_workers, "injury_processing", "V0.6 Traitement blessures workers",
+        minutes=HOURLY_JOBS_INTERVAL_MINUTES,
     )
 
     # Job 6: V2 - Cleanup dead workers (tous les jours)
-    scheduler.add_job(
-        cleanup_dead_workers,
-        trigger=IntervalTrigger(hours=24),
-        id="dead_workers_cleanup",
-        name="V2 Nettoyage workers morts",
-        replace_existing=True,
+    _add_job(
+        cleanup_dead_workers, "dead_workers_cleanup", "V2 Nettoyage workers morts",
+        hours=24,
     )
 
     # Job 7: V0.8 - Mission timeout check (toutes les 15 min)
-    scheduler.add_job(
-        check_mission_timeouts,
-        trigger=IntervalTrigger(minutes=MISSION_TIMEOUT_CHECK_MINUTES),
-        id="mission_timeout_check",
-        name="V0.8 Mission timeout check",
-        replace_existing=True,
+    _add_job(
+        check_mission_timeouts, "mission_timeout_check", "V0.8 Mission timeout check",
+        minutes=MISSION_TIMEOUT_CHECK_MINUTES,
     )
 
-    logger.info("[Scheduler] Jobs configurés (7 jobs)")
+    # Job 8: V0.9 - Repli des stats marché (toutes les minutes)
+    _add_job(
+        fold_market_stats, "market_stats_fold", "V0.9 Repli des stats marché",
+        minutes=MARKET_STATS_FOLD_INTERVAL_MINUTES,
+    )
+
+    logger.info("[Scheduler] Jobs configurés (8 jobs)")
 
 
 def start_scheduler():
-    """Démarre le scheduler au lancement de l'app"""
-    if not scheduler.running:
+    """Démarre un nouveau scheduler pour ce mandat (appelé par le worker leader, cf. app.worker)"""
+    global scheduler
+    from app.services.batch_timer import batch_timer
+
+    if scheduler is None or not scheduler.running:
+        scheduler = _new_scheduler()
         setup_jobs()
         scheduler.start()
         logger.info("[Scheduler] Démarré")
 
+    # Complétion des batches à l'échéance (complete aussi les batches déjà en retard)
+    try:
+        batch_timer.start()
+    except Exception as e:
+        logger.error(f"[Scheduler] BatchTimer non démarré: {e}")
+
 
 def stop_scheduler():
-    """Arrête proprement le scheduler"""
-    if scheduler.running:
-        scheduler.shutdown(wait=False)
+    """
+    Arrête proprement le scheduler. Attend la fin des jobs en cours: le worker ne
+    libère l'advisory lock du leader qu'ensuite (pas de chevauchement avec le suivant).
+    """
+    from app.services.batch_timer import batch_timer
+
+    global scheduler
+    batch_timer.stop()
+    if scheduler is not None and scheduler.running:
+        scheduler.shutdown(wait=True)
         logger.info("[Scheduler] Arrêté")
+    scheduler = None
@@ -1,9 +1,14 @@
+import uuid
+
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import jwt, JWTError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.core.db import SessionLocal
+from app.core.auth_context import AuthContext, get_auth_context, get_auth_context_async
+from app.core.db import AsyncSessionLocal, SessionLocal
 from app.core.config import settings
+from app.models.company import Company
 from app.models.user import User
 
 bearer = HTTPBearer()
@@ -15,20 +20,99 @@ def get_db():
     finally:
         db.close()
 
-def get_current_user(
-    creds: HTTPAuthorizationCredentials = Depends(bearer),
-    db: Session = Depends(get_db),
-) -> User:
-    token = creds.credentials
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def _user_id_from_token(token: str) -> uuid.UUID:
     try:
         payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALG])
-        user_id = payload.get("sub")
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token")
-    except JWTError:
+        return uuid.UUID(payload["sub"])
+    except (JWTError, KeyError, TypeError, ValueError):
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user or not user.is_active:
+def get_current_auth_context(
+    creds: HTTPAuthorizationCredentials = Depends(bearer),
+    db: Session = Depends(get_db),
+) -> AuthContext:
+    """User + membership + permissions (cache TTL court, cf. app.core.auth_context)."""
+    ctx = get_auth_context(db, _user_id_from_token(creds.credentials))
+    if not ctx or not ctx.is_active:
+        raise HTTPException(status_code=401, detail="User inactive or not found")
+    return ctx
+
+def get_current_user(
+    ctx: AuthContext = Depends(get_current_auth_context),
+    db: Session = Depends(get_db),
+) -> User:
+    # Rattache le user caché à la session de la requête sans requête SQL
+    return db.merge(ctx.to_user(), load=False)
+
+async def get_current_user_async(
+    creds: HTTPAuthorizationCredentials = Depends(bearer),
+    db: AsyncSession = Depends(get_async_db),
+) -> User:
+    """get_current_user pour les endpoints async (AsyncSession)."""
+    ctx = await get_auth_context_async(db, _user_id_from_token(creds.credentials))
+    if not ctx or not ctx.is_active:
         raise HTTPException(status_code=401, detail="User inactive or not found")
+    return await db.merge(ctx.to_user(), load=False)
+
+class RequestContext:
+    """
+    Contexte d'une requête authentifiée: user, company, rôle et permissions.
+    Membership et permissions viennent de l'AuthContext (une requête jointe, cachée);
+    la Company (solde, etc.) est chargée au plus une fois, à la demande.
+    """
+
+    def __init__(self, db: Session, auth: AuthContext, user: User):
+        self.db = db
+        self.auth = auth
+        self.user = user
+        self._company: Company | None = None
+
+    @property
+    def user_id(self) -> uuid.UUID:
+        return self.auth.user_id
+
+    @property
+    def company_id(self) -> uuid.UUID | None:
+        return self.auth.company_id
+
+    @property
+    def role(self) -> str | None:
+        return self.auth.role
+
+    @property
+    def permissions(self) -> dict[str, bool]:
+        return self.auth.permissions
+
+    def can(self, flag: str) -> bool:
+        return self.auth.can(flag)
+
+    def is_member_of(self, company_id) -> bool:
+        return self.company_id is not None and self.company_id == company_id
+
+    @property
+    def company(self) -> Company | None:
+        if self._company is None and self.company_id is not None:
+            self._company = self.db.get(Company, self.company_id)
+        return self._company
+
+    def require_company(self) -> Company:
+        company = self.company
+        if not company:
+            raise HTTPException(status_code=404, detail="User is not in a company")
+        return company
+
+def get_request_context(
+    ctx: AuthContext = Depends(get_current_auth_context),
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> RequestContext:
+    return RequestContext(db, ctx, user)
+
+def get_current_admin(user: User = Depends(get_current_user)) -> User:
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin only")
     return user
@@ -13,8 +13,9 @@ logger = logging.getLogger(__name__)
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy import text
 
-from app.core.db import engine, Base
-from app.core.scheduler import start_scheduler, stop_scheduler
+from app.core.db import engine, Base, SessionLocal
+from app.services.airport_index import load_airport_index
+from app.services.airport_tiles import get_tile_set
 from app.routers import auth, company, users, inventory, profile
 from app.routers.fleet import router as fleet_router
 from app.routers.company_profile import router as company_profile_router
@@ -24,6 +25,7 @@ from app.routers.world import router as world_router
 from app.routers.workers import router as workers_router
 from app.routers.sql_executor import router as sql_executor_router
 from app.routers.missions import router as missions_router
+from app.routers.admin import router as admin_router
 
 
 ROOT_PATH = os.getenv("ROOT_PATH", "")
@@ -37,16 +39,20 @@ async def lifespan(app: FastAPI):
         conn.execute(text("CREATE SCHEMA IF NOT EXISTS game"))
     # Base.metadata.create_all(bind=engine)  # Commented - tables created via SQL scripts
 
-    # Start production scheduler
-    start_scheduler()
-    logger.info("[Scheduler] Production scheduler started")
-
+    # Build in-memory airport spatial index (closest/nearest lookups)
+    db = SessionLocal()
+    try:
+        load_airport_index(db)
+        get_tile_set()  # Precompute low-zoom airport tiles
+    except Exception as e:
+        logger.error(f"[AirportIndex] Failed to build index: {e}")
+    finally:
+        db.close()
+
+    # Les jobs planifiés (production, salaires, batch_timer...) tournent dans
+    # le worker dédié (python -m app.worker), pas dans les process API
     yield
 
-    # Shutdown
-    stop_scheduler()
-    logger.info("[Scheduler] Production scheduler stopped")
-
 
 app = FastAPI(
     title="MSFS Game API",
@@ -62,6 +68,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[inventory.NEXT_CURSOR_HEADER],  # Pagination keyset lisible côté navigateur (webmap)
 )
 
 
@@ -90,6 +97,8 @@ app.include_router(world_router)
 app.include_router(workers_router)
 # V0.8 Mission System
 app.include_router(missions_router)
+# V0.9 Admin metrics
+app.include_router(admin_router)
 # SQL Executor (DEV ONLY)
 app.include_router(sql_executor_router)
 
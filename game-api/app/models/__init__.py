@@ -27,3 +27,12 @@ from .aircraft_inventory import AircraftInventory
 
 # V0.8 Mission System
 from .mission import Mission
+
+# V0.9 Scheduler metrics
+from .scheduler_job_metric import SchedulerJobMetric
+
+# V0.9 Market stats (trigger-maintained)
+from .market_stat import MarketStat, MarketStatDelta
+
+# V0.9 Market order book
+from .market_order import MarketOrder, MarketTrade
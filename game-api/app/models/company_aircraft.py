@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Float, Integer, Numeric, Boolean, CheckConstraint, ForeignKey, text
+from sqlalchemy import BigInteger, Column, String, DateTime, Float, Integer, Numeric, Boolean, CheckConstraint, ForeignKey, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from app.core.db import Base
@@ -92,6 +92,11 @@ class CompanyAircraft(Base):
     # V0.7: Cargo capacity for inventory system
     cargo_capacity_kg = Column(Integer, nullable=False, server_default=text("500"))
 
+    # V0.9: Cargo totals maintained by trigger (sql/v0_9_aircraft_cargo_totals.sql)
+    current_cargo_kg = Column(Numeric(14, 3), nullable=False, server_default=text("0"))
+    current_cargo_items = Column(BigInteger, nullable=False, server_default=text("0"))
+    current_pax = Column(Integer, nullable=False, server_default=text("0"))
+
     current_airport_ident = Column(String, ForeignKey("public.airports.ident"), nullable=True)
 
     # V0.7.1: Economics
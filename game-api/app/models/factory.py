@@ -41,6 +41,12 @@ class Factory(Base):
         ForeignKey("game.recipes.id"),
         nullable=True
     )
+    output_item_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("game.items.id"),
+        nullable=True,
+        comment="T0: item produced (resolved once from factory name)"
+    )
 
     # Core Fields
     airport_ident: Mapped[str] = mapped_column(
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey, String, Integer, Numeric, func
+from sqlalchemy import BigInteger, DateTime, ForeignKey, String, Integer, Numeric, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -26,7 +26,12 @@ class MarketOrder(Base):
     quantity: Mapped[int] = mapped_column(Integer, nullable=False)
     unit_price: Mapped[float] = mapped_column(Numeric(14, 2), nullable=False)
 
-    status: Mapped[str] = mapped_column(String(16), nullable=False, default="open")
+    # V0.9 Order book: un carnet par (item_code, airport_ident)
+    airport_ident: Mapped[str | None] = mapped_column(String(8), nullable=True)
+    filled_quantity: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    book_seq: Mapped[int | None] = mapped_column(BigInteger, nullable=True)  # Priorité temps (market_books.seq)
+
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="open")  # open / partial / filled / cancelled
 
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
@@ -40,3 +45,32 @@ class MarketOrder(Base):
         onupdate=func.now(),
         nullable=False,
     )
+
+
+class MarketTrade(Base):
+    """Exécution (fill) entre un ordre d'achat et un ordre de vente, au prix de l'ordre en carnet."""
+    __tablename__ = "market_trades"
+    __table_args__ = {"schema": "game"}
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    item_code: Mapped[str] = mapped_column(String(64), nullable=False)
+    airport_ident: Mapped[str] = mapped_column(String(8), nullable=False)
+
+    buy_order_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("game.market_orders.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    sell_order_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("game.market_orders.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    buyer_company_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    seller_company_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+
+    quantity: Mapped[int] = mapped_column(Integer, nullable=False)
+    unit_price: Mapped[float] = mapped_column(Numeric(14, 2), nullable=False)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+    )
@@ -0,0 +1,53 @@
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import BigInteger, DateTime, Integer, Numeric, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.db import Base
+
+
+class MarketStat(Base):
+    """
+    Agrégat des annonces HV par (aéroport, tier).
+    Alimenté par game.fold_market_stats() (job market_stats_fold) depuis MarketStatDelta
+    (sql/v0_9_market_stats.sql): lecture seule côté API.
+    """
+    __tablename__ = "market_stats"
+    __table_args__ = {"schema": "game"}
+
+    airport_ident: Mapped[str] = mapped_column(String(8), primary_key=True)
+    tier: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    listings: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    items_for_sale: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    total_value: Mapped[Decimal] = mapped_column(Numeric(20, 2), nullable=False, default=0)
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+    )
+
+
+class MarketStatDelta(Base):
+    """
+    Deltas en attente de MarketStat, ajoutés (insert-only) par les triggers sur
+    inventory_items / inventory_locations, repliés périodiquement dans market_stats.
+    """
+    __tablename__ = "market_stats_deltas"
+    __table_args__ = {"schema": "game"}
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    airport_ident: Mapped[str] = mapped_column(String(8), nullable=False)
+    tier: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    listings: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    items_for_sale: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    total_value: Mapped[Decimal] = mapped_column(Numeric(20, 2), nullable=False, default=0)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+    )
@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, String, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.db import Base
+
+
+class SchedulerJobMetric(Base):
+    """Dernier snapshot des métriques d'un job du scheduler (écrit par le worker leader)."""
+    __tablename__ = "scheduler_job_metrics"
+    __table_args__ = {"schema": "game"}
+
+    job_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    metrics: Mapped[dict] = mapped_column(JSONB, nullable=False, server_default="{}")
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+    )
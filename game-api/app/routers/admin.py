@@ -0,0 +1,53 @@
+"""
+V0.9 Admin - Metrics Router
+"""
+import os
+import socket
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app.core.db import async_engine, engine
+from app.core.pool_metrics import pool_snapshot
+from app.deps import get_db, get_current_admin
+from app.models.scheduler_job_metric import SchedulerJobMetric
+from app.models.user import User
+from app.schemas.admin import JobMetricsOut, PoolMetricsOut
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.get("/metrics/jobs", response_model=list[JobMetricsOut])
+def get_job_metrics(
+    db: Session = Depends(get_db),
+    admin: User = Depends(get_current_admin),
+):
+    """
+    Métriques des jobs du scheduler: runs, échecs, runs sautés (chevauchement),
+    histogramme de durée, lignes traitées, dernier succès.
+    Triées par temps DB cumulé (les jobs les plus coûteux en premier).
+    """
+    rows = db.query(SchedulerJobMetric).all()
+    return sorted(
+        rows,
+        key=lambda r: r.metrics.get("total_duration_s") or 0,
+        reverse=True,
+    )
+
+
+@router.get("/metrics/pool", response_model=PoolMetricsOut)
+def get_pool_metrics(
+    admin: User = Depends(get_current_admin),
+):
+    """
+    Usage des pools de connexions (sync + async) du process qui répond:
+    connexions empruntées, overflow, attente au checkout, timeouts.
+    Les métriques sont par process uvicorn.
+    """
+    return PoolMetricsOut(
+        process=f"{socket.gethostname()}:{os.getpid()}",
+        pools={
+            "sync": pool_snapshot(engine.pool),
+            "async": pool_snapshot(async_engine.sync_engine.pool),
+        },
+    )
@@ -4,7 +4,8 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 
-from app.deps import get_db, get_current_user
+from app.core.auth_context import invalidate_auth_context
+from app.deps import RequestContext, get_db, get_current_user, get_request_context
 from app.models.company import Company, slugify
 from app.models.company_member import CompanyMember
 from app.models.company_permission import CompanyPermission
@@ -16,13 +17,6 @@ router = APIRouter(prefix="/company", tags=["company"])
 
 ALLOWED_ROLES = {"owner", "admin", "member"}
 
-def get_my_company(db: Session, user_id):
-    cm = db.query(CompanyMember).filter(CompanyMember.user_id == user_id).first()
-    if not cm:
-        return None, None
-    c = db.query(Company).filter(Company.id == cm.company_id).first()
-    return c, cm
-
 @router.post("", response_model=CompanyOut)
 def create_company(
     payload: CompanyCreateIn,
@@ -85,6 +79,7 @@ def create_company(
     db.add(vault)
 
     db.commit()
+    invalidate_auth_context(user.id)
     db.refresh(c)
 
     return CompanyOut(
@@ -97,9 +92,9 @@ def create_company(
 @router.get("/me", response_model=CompanyOut)
 def company_me(
     db: Session = Depends(get_db),
-    user = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
-    c, _cm = get_my_company(db, user.id)
+    c = ctx.company
     if not c:
         raise HTTPException(status_code=404, detail="No company")
 
@@ -115,9 +110,9 @@ def company_me(
 @router.get("/members", response_model=list[MemberOut])
 def list_members(
     db: Session = Depends(get_db),
-    user = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
-    c, _cm = get_my_company(db, user.id)
+    c = ctx.company
     if not c:
         raise HTTPException(status_code=404, detail="No company")
 
@@ -140,13 +135,13 @@ def list_members(
 def add_member(
     payload: MemberAddIn,
     db: Session = Depends(get_db),
-    user = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
-    c, my_member = get_my_company(db, user.id)
-    if not c or not my_member:
+    c = ctx.company
+    if not c:
         raise HTTPException(status_code=404, detail="No company")
 
-    if my_member.role not in {"owner", "admin"}:
+    if ctx.role not in {"owner", "admin"}:
         raise HTTPException(status_code=403, detail="Not allowed")
 
     role = payload.role.lower().strip()
@@ -188,6 +183,7 @@ def add_member(
     db.add(perms)
 
     db.commit()
+    invalidate_auth_context(target.id)
 
     return MemberOut(
         company_id=cm.company_id,
@@ -205,24 +201,24 @@ def add_member(
 @router.get("/permissions", response_model=list[CompanyPermissionOut])
 def list_company_permissions(
     db: Session = Depends(get_db),
-    user=Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """V0.7 - List all member permissions for my company"""
-    c, my_member = get_my_company(db, user.id)
-    if not c or not my_member:
+    c = ctx.company
+    if not c:
         raise HTTPException(status_code=404, detail="No company")
 
     # Only owners/admins can see all permissions
-    if my_member.role not in {"owner", "admin"}:
+    if ctx.role not in {"owner", "admin"}:
         # Regular members can only see their own
         perms = db.query(CompanyPermission).filter(
             CompanyPermission.company_id == c.id,
-            CompanyPermission.user_id == user.id,
+            CompanyPermission.user_id == ctx.user_id,
         ).first()
         if not perms:
             return []
 
-        u = db.query(User).filter(User.id == user.id).first()
+        u = db.query(User).filter(User.id == ctx.user_id).first()
         return [CompanyPermissionOut(
             user_id=perms.user_id,
             username=u.username if u else None,
@@ -270,15 +266,15 @@ def list_company_permissions(
 def get_member_permissions(
     user_id: UUID,
     db: Session = Depends(get_db),
-    user=Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """V0.7 - Get permissions for a specific member"""
-    c, my_member = get_my_company(db, user.id)
-    if not c or not my_member:
+    c = ctx.company
+    if not c:
         raise HTTPException(status_code=404, detail="No company")
 
     # Can only view own permissions unless owner/admin
-    if my_member.role not in {"owner", "admin"} and user_id != user.id:
+    if ctx.role not in {"owner", "admin"} and user_id != ctx.user_id:
         raise HTTPException(status_code=403, detail="Not allowed")
 
     perms = db.query(CompanyPermission).filter(
@@ -314,20 +310,15 @@ def update_member_permissions(
     user_id: UUID,
     payload: CompanyPermissionUpdateIn,
     db: Session = Depends(get_db),
-    user=Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """V0.7 - Update permissions for a member (owner/admin only)"""
-    c, my_member = get_my_company(db, user.id)
-    if not c or not my_member:
+    c = ctx.company
+    if not c:
         raise HTTPException(status_code=404, detail="No company")
 
     # Check caller has permission to manage members
-    my_perms = db.query(CompanyPermission).filter(
-        CompanyPermission.company_id == c.id,
-        CompanyPermission.user_id == user.id,
-    ).first()
-
-    if not my_perms or not (my_perms.is_founder or my_perms.can_manage_members):
+    if not ctx.can("can_manage_members"):
         raise HTTPException(status_code=403, detail="No permission to manage members")
 
     # Get target permissions
@@ -340,7 +331,7 @@ def update_member_permissions(
         raise HTTPException(status_code=404, detail="Member permissions not found")
 
     # Cannot modify founder permissions unless you are the founder
-    if target_perms.is_founder and not my_perms.is_founder:
+    if target_perms.is_founder and not ctx.permissions.get("is_founder"):
         raise HTTPException(status_code=403, detail="Cannot modify founder permissions")
 
     # Update only provided fields
@@ -350,6 +341,7 @@ def update_member_permissions(
             setattr(target_perms, field, value)
 
     db.commit()
+    invalidate_auth_context(user_id)
     db.refresh(target_perms)
 
     target_user = db.query(User).filter(User.id == user_id).first()
@@ -380,19 +372,14 @@ def update_member_permissions(
 def get_company_by_id(
     company_id: UUID,
     db: Session = Depends(get_db),
-    user = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """Get company by ID (for wallet display etc.)"""
     # Verify user is a member of this company
-    membership = db.query(CompanyMember).filter(
-        CompanyMember.company_id == company_id,
-        CompanyMember.user_id == user.id
-    ).first()
-
-    if not membership:
+    if not ctx.is_member_of(company_id):
         raise HTTPException(status_code=403, detail="Not a member of this company")
 
-    c = db.query(Company).filter(Company.id == company_id).first()
+    c = ctx.company
     if not c:
         raise HTTPException(status_code=404, detail="Company not found")
 
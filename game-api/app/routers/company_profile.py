@@ -1,10 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
-from app.deps import get_db, get_current_user
-from app.models.user import User
-from app.models.company import Company
-from app.models.company_member import CompanyMember
+from app.deps import RequestContext, get_db, get_request_context
 from app.schemas.company_profile import CompanyProfileOut, CompanyProfilePatchIn
 
 router = APIRouter(prefix="/company-profile", tags=["company-profile"])
@@ -12,24 +9,12 @@ router = APIRouter(prefix="/company-profile", tags=["company-profile"])
 EDIT_ROLES = {"owner", "admin"}
 
 
-def _get_my_company(db: Session, user_id):
-    cm = db.query(CompanyMember).filter(CompanyMember.user_id == user_id).one_or_none()
-    if not cm:
-        raise HTTPException(status_code=404, detail="User is not in a company")
-
-    company = db.query(Company).filter(Company.id == cm.company_id).one_or_none()
-    if not company:
-        raise HTTPException(status_code=404, detail="Company not found")
-
-    return company, cm
-
-
 @router.get("/me", response_model=CompanyProfileOut)
 def get_my_company_profile(
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
-    company, _ = _get_my_company(db, user.id)
+    company = ctx.require_company()
     return company
 
 
@@ -37,11 +22,11 @@ def get_my_company_profile(
 def patch_my_company_profile(
     payload: CompanyProfilePatchIn,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
-    company, cm = _get_my_company(db, user.id)
+    company = ctx.require_company()
 
-    if cm.role not in EDIT_ROLES:
+    if ctx.role not in EDIT_ROLES:
         raise HTTPException(status_code=403, detail="Insufficient role")
 
     if payload.display_name is not None:
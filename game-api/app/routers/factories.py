@@ -8,10 +8,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
-from app.deps import get_db, get_current_user
-from app.models.user import User
-from app.models.company_member import CompanyMember
-from app.models.company import Company
+from app.deps import RequestContext, get_db, get_request_context
 from app.models.factory import Factory
 from app.models.item import Item
 from app.models.recipe import Recipe, RecipeIngredient
@@ -44,6 +41,7 @@ from app.schemas.workers import (
     FactoryWorkersV2Out,
 )
 from app.services.production_service import calculate_production_time
+from app.services.batch_timer import batch_timer
 
 router = APIRouter(prefix="/factories", tags=["factories"])
 
@@ -52,14 +50,6 @@ router = APIRouter(prefix="/factories", tags=["factories"])
 # HELPER FUNCTIONS
 # =====================================================
 
-def _get_my_company(db: Session, user_id: uuid.UUID):
-    """Get current user's company."""
-    cm = db.query(CompanyMember).filter(CompanyMember.user_id == user_id).first()
-    if not cm:
-        return None, None
-    c = db.query(Company).filter(Company.id == cm.company_id).first()
-    return c, cm
-
 
 def _get_factory_or_404(db: Session, company_id: uuid.UUID, factory_id: uuid.UUID):
     """Get factory or raise 404."""
@@ -126,10 +116,10 @@ FOOD_TIER_BONUS = {
 def list_my_factories(
     airport_ident: str | None = Query(None, description="Filter by airport ICAO code"),
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """List all factories owned by current company. Optionally filter by airport."""
-    c, _cm = _get_my_company(db, user.id)
+    c = ctx.company
     if not c:
         raise HTTPException(status_code=404, detail="No company")
 
@@ -170,10 +160,10 @@ def list_my_factories(
 def create_factory(
     data: FactoryCreateIn,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """Create a new factory at specified airport."""
-    c, _cm = _get_my_company(db, user.id)
+    c = ctx.company
     if not c:
         raise HTTPException(status_code=404, detail="No company")
 
@@ -226,10 +216,10 @@ def create_factory(
 def get_factory_details(
     factory_id: uuid.UUID,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """Get detailed factory information."""
-    c, _cm = _get_my_company(db, user.id)
+    c = ctx.company
     if not c:
         raise HTTPException(status_code=404, detail="No company")
 
@@ -243,10 +233,10 @@ def update_factory(
     factory_id: uuid.UUID,
     data: FactoryUpdateIn,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """Update factory name, recipe, or status."""
-    c, _cm = _get_my_company(db, user.id)
+    c = ctx.company
     if not c:
         raise HTTPException(status_code=404, detail="No company")
 
@@ -282,10 +272,10 @@ def update_factory(
 def delete_factory(
     factory_id: uuid.UUID,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """Delete factory (soft delete via is_active=false)."""
-    c, _cm = _get_my_company(db, user.id)
+    c = ctx.company
     if not c:
         raise HTTPException(status_code=404, detail="No company")
 
@@ -340,13 +330,13 @@ def start_production(
     factory_id: uuid.UUID,
     data: StartProductionIn,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """
     Start production batch (V2).
     Consumes ingredients directly from company_inventory at factory's airport.
     """
-    c, _cm = _get_my_company(db, user.id)
+    c = ctx.company
     if not c:
         raise HTTPException(status_code=404, detail="No company")
 
@@ -461,6 +451,9 @@ def start_production(
     db.commit()
     db.refresh(batch)
 
+    # Complétion à l'échéance exacte
+    batch_timer.schedule(batch.id, batch.estimated_completion)
+
     return ProductionBatchOut(
         id=batch.id,
         factory_id=batch.factory_id,
@@ -480,10 +473,10 @@ def start_production(
 def list_production_batches(
     factory_id: uuid.UUID,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """List production batches for this factory."""
-    c, _cm = _get_my_company(db, user.id)
+    c = ctx.company
     if not c:
         raise HTTPException(status_code=404, detail="No company")
 
@@ -515,10 +508,10 @@ def list_production_batches(
 def stop_production(
     factory_id: uuid.UUID,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """Stop current production."""
-    c, _cm = _get_my_company(db, user.id)
+    c = ctx.company
     if not c:
         raise HTTPException(status_code=404, detail="No company")
 
@@ -539,6 +532,9 @@ def stop_production(
 
     db.commit()
 
+    if batch:
+        batch_timer.cancel(batch.id)
+
     return {"message": "Production stopped"}
 
 
@@ -550,13 +546,13 @@ def stop_production(
 def list_factory_workers(
     factory_id: uuid.UUID,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """List all workers assigned to this factory (V2).
 
     For full worker management, use /workers/v2 endpoints.
     """
-    c, _cm = _get_my_company(db, user.id)
+    c = ctx.company
     if not c:
         raise HTTPException(status_code=404, detail="No company")
 
@@ -603,10 +599,10 @@ def list_factory_workers(
 def get_factory_storage(
     factory_id: uuid.UUID,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """Get factory storage inventory."""
-    c, _cm = _get_my_company(db, user.id)
+    c = ctx.company
     if not c:
         raise HTTPException(status_code=404, detail="No company")
 
@@ -639,10 +635,10 @@ def deposit_to_storage(
     factory_id: uuid.UUID,
     data: StorageDepositIn,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """Deposit items from company inventory to factory storage."""
-    c, _cm = _get_my_company(db, user.id)
+    c = ctx.company
     if not c:
         raise HTTPException(status_code=404, detail="No company")
 
@@ -714,10 +710,10 @@ def withdraw_from_storage(
     factory_id: uuid.UUID,
     data: StorageWithdrawIn,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """Withdraw items from factory storage to company inventory."""
-    c, _cm = _get_my_company(db, user.id)
+    c = ctx.company
     if not c:
         raise HTTPException(status_code=404, detail="No company")
 
@@ -794,10 +790,10 @@ def withdraw_from_storage(
 @router.get("/stats/overview", response_model=FactoryStatsOut)
 def get_factory_stats(
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """Get factory statistics for current company."""
-    c, _cm = _get_my_company(db, user.id)
+    c = ctx.company
     if not c:
         raise HTTPException(status_code=404, detail="No company")
 
@@ -867,10 +863,10 @@ def get_factory_stats(
 def get_food_status(
     factory_id: uuid.UUID,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """Get factory food status (V0.8.1)."""
-    c, _cm = _get_my_company(db, user.id)
+    c = ctx.company
     if not c:
         raise HTTPException(status_code=404, detail="No company")
 
@@ -920,7 +916,7 @@ def deposit_food(
     factory_id: uuid.UUID,
     data: FoodDepositIn,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """
     Deposit food into factory (V0.8.1).
@@ -932,7 +928,7 @@ def deposit_food(
     - Consumption: 1 unit/worker/hour
     - Bonus: T0=0%, T1=15%, T2=30%, T3=45%, T4=60%, T5=75%
     """
-    c, _cm = _get_my_company(db, user.id)
+    c = ctx.company
     if not c:
         raise HTTPException(status_code=404, detail="No company")
 
@@ -2,14 +2,11 @@ from decimal import Decimal
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import text, func, or_
+from sqlalchemy import insert, func, or_, tuple_
 from uuid import UUID
 from typing import List, Optional
 
-from app.deps import get_db, get_current_user
-from app.models.company_member import CompanyMember
-from app.models.company_permission import CompanyPermission
-from app.models.company import Company
+from app.deps import RequestContext, get_db, get_current_user, get_request_context
 from app.models.company_aircraft import CompanyAircraft, AircraftCatalog
 from app.models.inventory_location import InventoryLocation
 from app.models.inventory_item import InventoryItem
@@ -22,6 +19,7 @@ from app.schemas.fleet import (
     CargoItemOut,
     LoadCargoIn,
     UnloadCargoIn,
+    CargoManifestIn,
     AircraftLocationUpdateIn,
     AircraftCatalogOut,
     AircraftCreateIn,
@@ -33,14 +31,6 @@ from app.schemas.fleet import (
 router = APIRouter(prefix="/fleet", tags=["fleet"])
 
 
-def _get_my_company(db: Session, user_id) -> Company | None:
-    """Get user's company"""
-    cm = db.query(CompanyMember).filter(CompanyMember.user_id == user_id).first()
-    if not cm:
-        return None
-    return db.query(Company).filter(Company.id == cm.company_id).first()
-
-
 def _guess_category(type_str: str) -> str:
     """Guess aircraft category from type string"""
     if not type_str:
@@ -59,40 +49,15 @@ def _guess_category(type_str: str) -> str:
     return "other"
 
 
-def get_user_company_id(db: Session, user_id) -> UUID:
-    cm = db.query(CompanyMember).filter(CompanyMember.user_id == user_id).first()
-    if not cm:
-        raise HTTPException(status_code=404, detail="No company")
-    return cm.company_id
-
-
-def _can_use_aircraft(db: Session, user_id: UUID, aircraft: CompanyAircraft) -> bool:
+def _can_use_aircraft(ctx: RequestContext, aircraft: CompanyAircraft) -> bool:
     """Check if user can use an aircraft"""
     # Player-owned aircraft
     if aircraft.owner_type == "player":
-        return aircraft.user_id == user_id
+        return aircraft.user_id == ctx.user_id
 
-    # Company-owned aircraft
+    # Company-owned aircraft: members have basic access (can_use_aircraft or not)
     if aircraft.owner_type == "company" and aircraft.company_id:
-        # Check membership
-        membership = db.query(CompanyMember).filter(
-            CompanyMember.user_id == user_id,
-            CompanyMember.company_id == aircraft.company_id,
-        ).first()
-        if not membership:
-            return False
-
-        # Check permissions
-        perms = db.query(CompanyPermission).filter(
-            CompanyPermission.user_id == user_id,
-            CompanyPermission.company_id == aircraft.company_id,
-        ).first()
-
-        if perms and (perms.is_founder or perms.can_use_aircraft):
-            return True
-
-        # If no permissions record, allow basic access for members
-        return True
+        return ctx.is_member_of(aircraft.company_id)
 
     return False
 
@@ -171,10 +136,10 @@ def get_catalog_aircraft(
 @router.get("/stats", response_model=FleetStatsOut)
 def get_fleet_stats(
     db: Session = Depends(get_db),
-    user=Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """Get fleet statistics"""
-    company = _get_my_company(db, user.id)
+    company = ctx.company
     if not company:
         raise HTTPException(status_code=404, detail="No company")
 
@@ -188,8 +153,9 @@ def get_fleet_stats(
     in_flight = sum(1 for a in aircraft_list if a.status == "in_flight")
     maintenance = sum(1 for a in aircraft_list if a.status == "maintenance")
 
-    # Total capacity
+    # Total capacity / current load
     total_capacity = sum(a.cargo_capacity_kg for a in aircraft_list)
+    total_cargo = sum(Decimal(a.current_cargo_kg) for a in aircraft_list)
 
     # By category
     categories = {}
@@ -203,6 +169,7 @@ def get_fleet_stats(
         in_flight_count=in_flight,
         maintenance_count=maintenance,
         total_cargo_capacity_kg=total_capacity,
+        total_cargo_kg=total_cargo,
         categories=categories
     )
 
@@ -216,6 +183,7 @@ def get_fleet_available(
     icao: str = Query(..., min_length=3, max_length=4, description="Airport ICAO code"),
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """
     V0.8 Mission System - Get available aircraft at a specific airport.
@@ -223,7 +191,7 @@ def get_fleet_available(
     ICAO is required to prevent cheating (player must be at the airport).
     Used by EFB to populate aircraft dropdown for mission creation.
     """
-    company = _get_my_company(db, user.id)
+    company = ctx.company
     icao = icao.upper()
 
     # Build ownership filter: company aircraft OR player-owned aircraft
@@ -249,6 +217,8 @@ def get_fleet_available(
             aircraft_model=a.icao_type,  # Maps icao_type to aircraft_model for specs
             current_icao=a.current_airport_ident,
             cargo_capacity_kg=a.cargo_capacity_kg,
+            current_cargo_kg=a.current_cargo_kg,
+            current_pax=a.current_pax,
             status=a.status,
         ))
 
@@ -262,20 +232,15 @@ def get_fleet_available(
 @router.get("", response_model=List[AircraftOut])
 def list_my_fleet(
     db: Session = Depends(get_db),
-    user=Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """List all aircraft user has access to (company + personal)"""
     # Get company aircraft
-    company_ids = [
-        cm.company_id for cm in
-        db.query(CompanyMember).filter(CompanyMember.user_id == user.id).all()
-    ]
-
     company_aircraft = []
-    if company_ids:
+    if ctx.company_id:
         company_aircraft = (
             db.query(CompanyAircraft)
-            .filter(CompanyAircraft.company_id.in_(company_ids))
+            .filter(CompanyAircraft.company_id == ctx.company_id)
             .all()
         )
 
@@ -284,7 +249,7 @@ def list_my_fleet(
         db.query(CompanyAircraft)
         .filter(
             CompanyAircraft.owner_type == "player",
-            CompanyAircraft.user_id == user.id,
+            CompanyAircraft.user_id == ctx.user_id,
         )
         .all()
     )
@@ -296,13 +261,13 @@ def list_my_fleet(
 def get_aircraft(
     aircraft_id: UUID,
     db: Session = Depends(get_db),
-    user=Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     row = db.query(CompanyAircraft).filter(CompanyAircraft.id == aircraft_id).first()
     if not row:
         raise HTTPException(status_code=404, detail="Aircraft not found")
 
-    if not _can_use_aircraft(db, user.id, row):
+    if not _can_use_aircraft(ctx, row):
         raise HTTPException(status_code=403, detail="Forbidden")
 
     return row
@@ -317,19 +282,15 @@ def add_aircraft(
     payload: AircraftCreateIn,
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """Add a new aircraft to the company fleet"""
-    company = _get_my_company(db, user.id)
+    company = ctx.company
     if not company:
         raise HTTPException(status_code=404, detail="No company")
 
-    # Check permission
-    perms = db.query(CompanyPermission).filter(
-        CompanyPermission.user_id == user.id,
-        CompanyPermission.company_id == company.id,
-    ).first()
-
-    if perms and not (perms.is_founder or perms.can_manage_aircraft):
+    # Check permission (no permissions record = allowed)
+    if ctx.permissions and not ctx.can("can_manage_aircraft"):
         raise HTTPException(status_code=403, detail="No permission to manage aircraft")
 
     # Check registration uniqueness
@@ -414,10 +375,10 @@ def add_aircraft(
 def get_aircraft_details(
     aircraft_id: UUID,
     db: Session = Depends(get_db),
-    user=Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """Get aircraft details with cargo summary"""
-    company = _get_my_company(db, user.id)
+    company = ctx.company
     if not company:
         raise HTTPException(status_code=404, detail="No company")
 
@@ -430,28 +391,9 @@ def get_aircraft_details(
     if not aircraft:
         raise HTTPException(status_code=404, detail="Aircraft not found")
 
-    # Get cargo from inventory_location
-    cargo_location = db.query(InventoryLocation).filter(
-        InventoryLocation.aircraft_id == aircraft_id,
-        InventoryLocation.kind == "aircraft"
-    ).first()
-
-    current_cargo_kg = Decimal("0")
-    current_cargo_items = 0
-
-    if cargo_location:
-        # Sum cargo weight
-        cargo_data = db.execute(text("""
-            SELECT COALESCE(SUM(ii.qty * i.weight_kg), 0) as total_weight,
-                   COALESCE(SUM(ii.qty), 0) as total_items
-            FROM game.inventory_items ii
-            JOIN game.items i ON i.id = ii.item_id
-            WHERE ii.location_id = :loc_id
-        """), {"loc_id": str(cargo_location.id)}).fetchone()
-
-        if cargo_data:
-            current_cargo_kg = Decimal(str(cargo_data[0]))
-            current_cargo_items = int(cargo_data[1])
+    # Cargo totals maintained by trigger on inventory_items
+    current_cargo_kg = Decimal(aircraft.current_cargo_kg)
+    current_cargo_items = int(aircraft.current_cargo_items)
 
     utilization = 0.0
     if aircraft.cargo_capacity_kg > 0:
@@ -475,6 +417,7 @@ def get_aircraft_details(
         is_active=aircraft.is_active,
         created_at=aircraft.created_at,
         current_cargo_kg=current_cargo_kg,
+        current_pax=aircraft.current_pax,
         current_cargo_items=current_cargo_items,
         cargo_utilization_percent=round(utilization, 1)
     )
@@ -485,10 +428,10 @@ def update_aircraft(
     aircraft_id: UUID,
     payload: AircraftUpdateIn,
     db: Session = Depends(get_db),
-    user=Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """Update aircraft details"""
-    company = _get_my_company(db, user.id)
+    company = ctx.company
     if not company:
         raise HTTPException(status_code=404, detail="No company")
 
@@ -532,19 +475,15 @@ def remove_aircraft(
     aircraft_id: UUID,
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """Remove an aircraft from the fleet (soft delete)"""
-    company = _get_my_company(db, user.id)
+    company = ctx.company
     if not company:
         raise HTTPException(status_code=404, detail="No company")
 
-    # Check permission
-    perms = db.query(CompanyPermission).filter(
-        CompanyPermission.user_id == user.id,
-        CompanyPermission.company_id == company.id,
-    ).first()
-
-    if perms and not (perms.is_founder or perms.can_manage_aircraft):
+    # Check permission (no permissions record = allowed)
+    if ctx.permissions and not ctx.can("can_manage_aircraft"):
         raise HTTPException(status_code=403, detail="No permission to manage aircraft")
 
     aircraft = db.query(CompanyAircraft).filter(
@@ -587,14 +526,14 @@ def remove_aircraft(
 def get_aircraft_cargo(
     aircraft_id: UUID,
     db: Session = Depends(get_db),
-    user=Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """V0.7 - Get cargo contents of an aircraft"""
     aircraft = db.query(CompanyAircraft).filter(CompanyAircraft.id == aircraft_id).first()
     if not aircraft:
         raise HTTPException(status_code=404, detail="Aircraft not found")
 
-    if not _can_use_aircraft(db, user.id, aircraft):
+    if not _can_use_aircraft(ctx, aircraft):
         raise HTTPException(status_code=403, detail="Forbidden")
 
     # Get cargo location
@@ -645,13 +584,14 @@ def load_cargo(
     payload: LoadCargoIn,
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """V0.7 - Load items into aircraft cargo"""
     aircraft = db.query(CompanyAircraft).filter(CompanyAircraft.id == aircraft_id).first()
     if not aircraft:
         raise HTTPException(status_code=404, detail="Aircraft not found")
 
-    if not _can_use_aircraft(db, user.id, aircraft):
+    if not _can_use_aircraft(ctx, aircraft):
         raise HTTPException(status_code=403, detail="No permission to use this aircraft")
 
     # Check aircraft is at an airport
@@ -690,15 +630,8 @@ def load_cargo(
     # Get cargo location
     cargo_loc = _get_aircraft_cargo_location(db, aircraft_id)
 
-    # Check cargo capacity
-    current_weight_result = db.execute(text("""
-        SELECT COALESCE(SUM(ii.qty * i.weight_kg), 0) as total_weight
-        FROM game.inventory_items ii
-        JOIN game.items i ON i.id = ii.item_id
-        WHERE ii.location_id = :loc_id
-    """), {"loc_id": str(cargo_loc.id)}).fetchone()
-
-    current_weight = Decimal(str(current_weight_result[0])) if current_weight_result else Decimal("0")
+    # Check cargo capacity (current weight maintained by trigger on inventory_items)
+    current_weight = Decimal(aircraft.current_cargo_kg)
     added_weight = item.weight_kg * payload.qty
 
     if current_weight + added_weight > aircraft.cargo_capacity_kg:
@@ -753,7 +686,7 @@ def load_cargo(
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
-    return get_aircraft_cargo(aircraft_id, db, user)
+    return get_aircraft_cargo(aircraft_id, db, ctx)
 
 
 @router.post("/{aircraft_id}/unload", response_model=AircraftCargoOut)
@@ -762,13 +695,14 @@ def unload_cargo(
     payload: UnloadCargoIn,
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """V0.7 - Unload items from aircraft cargo"""
     aircraft = db.query(CompanyAircraft).filter(CompanyAircraft.id == aircraft_id).first()
     if not aircraft:
         raise HTTPException(status_code=404, detail="Aircraft not found")
 
-    if not _can_use_aircraft(db, user.id, aircraft):
+    if not _can_use_aircraft(ctx, aircraft):
         raise HTTPException(status_code=403, detail="No permission to use this aircraft")
 
     if not aircraft.current_airport_ident:
@@ -852,7 +786,142 @@ def unload_cargo(
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
-    return get_aircraft_cargo(aircraft_id, db, user)
+    return get_aircraft_cargo(aircraft_id, db, ctx)
+
+
+@router.post("/{aircraft_id}/manifest", response_model=AircraftCargoOut)
+def apply_cargo_manifest(
+    aircraft_id: UUID,
+    payload: CargoManifestIn,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
+):
+    """
+    Load/unload many items in one call (EFB pre-flight manifest).
+    Lines are applied in order, all or nothing; capacity is checked once on the final weight.
+    """
+    aircraft = db.query(CompanyAircraft).filter(CompanyAircraft.id == aircraft_id).first()
+    if not aircraft:
+        raise HTTPException(status_code=404, detail="Aircraft not found")
+
+    if not _can_use_aircraft(ctx, aircraft):
+        raise HTTPException(status_code=403, detail="No permission to use this aircraft")
+
+    if not aircraft.current_airport_ident:
+        raise HTTPException(status_code=400, detail="Aircraft must be at an airport to load cargo")
+
+    lines = payload.lines
+    location_ids = {line.location_id for line in lines}
+    item_ids = {line.item_id for line in lines}
+
+    # Ground locations (one query), all at the aircraft's airport
+    locations = {
+        loc.id: loc
+        for loc in db.query(InventoryLocation).filter(InventoryLocation.id.in_(location_ids))
+    }
+    for location_id in location_ids:
+        loc = locations.get(location_id)
+        if not loc:
+            raise HTTPException(status_code=404, detail=f"Location {location_id} not found")
+        if loc.airport_ident != aircraft.current_airport_ident:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Location ({loc.airport_ident}) must be at same airport as aircraft ({aircraft.current_airport_ident})"
+            )
+
+    items = {item.id: item for item in db.query(Item).filter(Item.id.in_(item_ids))}
+    missing = item_ids - items.keys()
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Item {missing.pop()} not found")
+
+    cargo_loc = _get_aircraft_cargo_location(db, aircraft_id)
+
+    try:
+        # Every stock row touched by the manifest, locked in id order (one query)
+        keys = {(line.location_id, line.item_id) for line in lines}
+        keys |= {(cargo_loc.id, item_id) for item_id in item_ids}
+        stock = {
+            (inv.location_id, inv.item_id): inv
+            for inv in db.query(InventoryItem)
+            .filter(tuple_(InventoryItem.location_id, InventoryItem.item_id).in_(keys))
+            .order_by(InventoryItem.id)
+            .with_for_update(key_share=True)
+        }
+
+        # Current cargo weight (maintained by trigger on inventory_items)
+        current_weight = Decimal(aircraft.current_cargo_kg)
+        new_weight = current_weight
+
+        audits = []
+        for n, line in enumerate(lines, start=1):
+            item = items[line.item_id]
+            loc = locations[line.location_id]
+            if line.action == "load":
+                src_key, dst_key = (loc.id, item.id), (cargo_loc.id, item.id)
+                new_weight += item.weight_kg * line.qty
+            else:
+                src_key, dst_key = (cargo_loc.id, item.id), (loc.id, item.id)
+                new_weight -= item.weight_kg * line.qty
+
+            src_inv = stock.get(src_key)
+            if not src_inv or src_inv.qty < line.qty:
+                available = src_inv.qty if src_inv else 0
+                where = "stock" if line.action == "load" else "cargo"
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Line {n}: insufficient {where} for {item.name} ({available} available)"
+                )
+
+            dst_inv = stock.get(dst_key)
+            if not dst_inv:
+                dst_inv = InventoryItem(location_id=dst_key[0], item_id=item.id, qty=0)
+                db.add(dst_inv)
+                stock[dst_key] = dst_inv
+
+            src_inv.qty -= line.qty
+            dst_inv.qty += line.qty
+
+            if line.action == "load":
+                audits.append(dict(location_id=loc.id, item_id=item.id, quantity_delta=-line.qty,
+                                   action="load_aircraft", user_id=user.id,
+                                   notes=f"Loaded into {aircraft.aircraft_type}"))
+                audits.append(dict(location_id=cargo_loc.id, item_id=item.id, quantity_delta=line.qty,
+                                   action="cargo_loaded", user_id=user.id,
+                                   notes=f"Loaded from {loc.name}"))
+            else:
+                audits.append(dict(location_id=cargo_loc.id, item_id=item.id, quantity_delta=-line.qty,
+                                   action="cargo_unloaded", user_id=user.id,
+                                   notes=f"Unloaded to {loc.name}"))
+                audits.append(dict(location_id=loc.id, item_id=item.id, quantity_delta=line.qty,
+                                   action="unload_aircraft", user_id=user.id,
+                                   notes=f"Unloaded from {aircraft.aircraft_type}"))
+
+        if new_weight > aircraft.cargo_capacity_kg:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Cargo capacity exceeded ({aircraft.cargo_capacity_kg}kg max, {current_weight}kg current, {new_weight}kg after manifest)"
+            )
+
+        # Emptied rows are removed (same as single load/unload)
+        for inv in stock.values():
+            if inv.qty == 0:
+                if inv in db.new:
+                    db.expunge(inv)
+                else:
+                    db.delete(inv)
+
+        db.execute(insert(InventoryAudit), audits)
+        db.commit()
+
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return get_aircraft_cargo(aircraft_id, db, ctx)
 
 
 @router.patch("/{aircraft_id}/location")
@@ -860,14 +929,14 @@ def update_aircraft_location(
     aircraft_id: UUID,
     payload: AircraftLocationUpdateIn,
     db: Session = Depends(get_db),
-    user=Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """V0.7 - Update aircraft location after flight"""
     aircraft = db.query(CompanyAircraft).filter(CompanyAircraft.id == aircraft_id).first()
     if not aircraft:
         raise HTTPException(status_code=404, detail="Aircraft not found")
 
-    if not _can_use_aircraft(db, user.id, aircraft):
+    if not _can_use_aircraft(ctx, aircraft):
         raise HTTPException(status_code=403, detail="No permission to use this aircraft")
 
     new_ident = payload.airport_ident.strip().upper()
@@ -1,23 +1,25 @@
+import base64
+import json
 import uuid
 from decimal import Decimal
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import and_, or_, select, tuple_, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
-from app.deps import get_db, get_current_user
-from app.models.company_member import CompanyMember
+from app.deps import RequestContext, get_async_db, get_db, get_current_user, get_request_context
 from app.models.company import Company
-from app.models.company_permission import CompanyPermission
 from app.models.item import Item
 from app.models.inventory_location import InventoryLocation
 from app.models.inventory_item import InventoryItem
 from app.models.inventory_audit import InventoryAudit
-from app.models.user import User
 from app.models.player_inventory import PlayerInventory
 from app.models.company_inventory import CompanyInventory
 from app.models.aircraft_inventory import AircraftInventory
 from app.models.company_aircraft import CompanyAircraft
+from app.models.market_stat import MarketStat, MarketStatDelta
 from app.schemas.inventory import (
     # Legacy (HV/T0)
     LocationOut,
@@ -55,14 +57,6 @@ router = APIRouter(prefix="/inventory", tags=["inventory"])
 ALLOWED_KINDS = {"vault", "warehouse", "in_transit"}
 
 
-def _get_my_company(db: Session, user_id):
-    cm = db.query(CompanyMember).filter(CompanyMember.user_id == user_id).first()
-    if not cm:
-        return None, None
-    c = db.query(Company).filter(Company.id == cm.company_id).first()
-    return c, cm
-
-
 def _ensure_vault(db: Session, company_id, company_slug: str):
     loc = db.query(InventoryLocation).filter(
         InventoryLocation.company_id == company_id,
@@ -105,9 +99,9 @@ def _get_item_by_name(db: Session, item_name: str):
 @router.get("/locations", response_model=list[LocationOut])
 def list_locations(
     db: Session = Depends(get_db),
-    user=Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
-    c, _cm = _get_my_company(db, user.id)
+    c = ctx.company
     if not c:
         raise HTTPException(status_code=404, detail="No company")
 
@@ -131,9 +125,9 @@ def list_locations(
 def create_or_get_warehouse(
     payload: WarehouseCreateIn,
     db: Session = Depends(get_db),
-    user=Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
-    c, _cm = _get_my_company(db, user.id)
+    c = ctx.company
     if not c:
         raise HTTPException(status_code=404, detail="No company")
 
@@ -176,9 +170,9 @@ def create_or_get_warehouse(
 def get_inventory(
     location_id: uuid.UUID,
     db: Session = Depends(get_db),
-    user=Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
-    c, _cm = _get_my_company(db, user.id)
+    c = ctx.company
     if not c:
         raise HTTPException(status_code=404, detail="No company")
 
@@ -218,8 +212,9 @@ def deposit(
     payload: AdjustIn,
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
-    c, _cm = _get_my_company(db, user.id)
+    c = ctx.company
     if not c:
         raise HTTPException(status_code=404, detail="No company")
 
@@ -262,7 +257,7 @@ def deposit(
         db.rollback()
         raise
 
-    return get_inventory(loc.id, db, user)
+    return get_inventory(loc.id, db, ctx)
 
 
 @router.post("/withdraw", response_model=InventoryOut)
@@ -270,8 +265,9 @@ def withdraw(
     payload: AdjustIn,
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
-    c, _cm = _get_my_company(db, user.id)
+    c = ctx.company
     if not c:
         raise HTTPException(status_code=404, detail="No company")
 
@@ -312,7 +308,7 @@ def withdraw(
         db.rollback()
         raise
 
-    return get_inventory(loc.id, db, user)
+    return get_inventory(loc.id, db, ctx)
 
 
 @router.post("/move", response_model=InventoryOut)
@@ -320,8 +316,9 @@ def move(
     payload: MoveIn,
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
-    c, _cm = _get_my_company(db, user.id)
+    c = ctx.company
     if not c:
         raise HTTPException(status_code=404, detail="No company")
 
@@ -387,7 +384,7 @@ def move(
         raise
 
     # Return destination inventory by default
-    return get_inventory(to_loc.id, db, user)
+    return get_inventory(to_loc.id, db, ctx)
 
 
 # ═══════════════════════════════════════════════════════════
@@ -399,9 +396,10 @@ def set_for_sale(
     payload: SetForSaleIn,
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """Mettre des items en vente ou les retirer de la vente"""
-    c, _cm = _get_my_company(db, user.id)
+    c = ctx.company
     if not c:
         raise HTTPException(status_code=404, detail="No company")
 
@@ -475,16 +473,16 @@ def set_for_sale(
         db.rollback()
         raise
 
-    return get_inventory(loc.id, db, user)
+    return get_inventory(loc.id, db, ctx)
 
 
 @router.get("/my-listings", response_model=list[MarketListingOut])
 def get_my_listings(
     db: Session = Depends(get_db),
-    user=Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """Récupérer mes propres items en vente"""
-    c, _cm = _get_my_company(db, user.id)
+    c = ctx.company
     if not c:
         return []
 
@@ -530,8 +528,27 @@ def cancel_sale(
     return set_for_sale(payload, db, user)
 
 
+MARKET_PAGE_MAX = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _encode_market_cursor(item_name: str, sale_price: Decimal, inventory_item_id: uuid.UUID) -> str:
+    raw = json.dumps([item_name, str(sale_price), str(inventory_item_id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_market_cursor(cursor: str) -> tuple[str, Decimal, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        item_name, sale_price, inventory_item_id = json.loads(raw)
+        return item_name, Decimal(sale_price), uuid.UUID(inventory_item_id)
+    except (ValueError, TypeError, ArithmeticError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.get("/market", response_model=list[MarketListingOut])
-def get_global_market_listings(
+async def get_global_market_listings(
+    response: Response,
     airport: str | None = None,
     item_name: str | None = None,
     tier: int | None = None,
@@ -539,42 +556,57 @@ def get_global_market_listings(
     max_price: float | None = None,
     limit: int = 100,
     offset: int = 0,
-    db: Session = Depends(get_db),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     HV (Hôtel des Ventes) - Liste globale des items en vente.
-    Filtres optionnels: airport, item_name (recherche partielle), tier, min_price, max_price
-    Pagination: limit (max 500), offset
+    Filtres optionnels: airport, item_name (recherche partielle, index trigram), tier, min_price, max_price
+    Pagination keyset: limit (max 500) + cursor; le curseur de la page suivante est renvoyé
+    dans l'en-tête X-Next-Cursor (absent sur la dernière page).
+    offset reste accepté (legacy) mais se dégrade avec la profondeur: préférer cursor.
     """
     query = (
-        db.query(InventoryItem, InventoryLocation, Item, Company)
+        select(InventoryItem, InventoryLocation, Item, Company)
         .join(InventoryLocation, InventoryLocation.id == InventoryItem.location_id)
         .join(Item, Item.id == InventoryItem.item_id)
         .join(Company, Company.id == InventoryLocation.company_id)
-        .filter(
+        .where(
             InventoryItem.for_sale == True,
             InventoryItem.sale_qty > 0,
+            InventoryItem.sale_price.isnot(None),
         )
     )
 
     # Filtres optionnels
     if airport:
-        query = query.filter(InventoryLocation.airport_ident == airport.upper())
+        query = query.where(InventoryLocation.airport_ident == airport.upper())
     if item_name:
-        query = query.filter(Item.name.ilike(f"%{item_name}%"))
+        query = query.where(Item.name.ilike(f"%{item_name}%"))
     if tier is not None:
-        query = query.filter(Item.tier == tier)
+        query = query.where(Item.tier == tier)
     if min_price is not None:
-        query = query.filter(InventoryItem.sale_price >= min_price)
+        query = query.where(InventoryItem.sale_price >= min_price)
     if max_price is not None:
-        query = query.filter(InventoryItem.sale_price <= max_price)
+        query = query.where(InventoryItem.sale_price <= max_price)
 
-    # Pagination (max 500)
-    limit = min(limit, 500)
-    query = query.order_by(Item.name, InventoryItem.sale_price)
-    query = query.offset(offset).limit(limit)
+    # Ordre total (name, price, id): sert de clé au curseur
+    if cursor:
+        query = query.where(
+            tuple_(Item.name, InventoryItem.sale_price, InventoryItem.id) > _decode_market_cursor(cursor)
+        )
+    elif offset:
+        query = query.offset(offset)
 
-    rows = query.all()
+    limit = max(1, min(limit, MARKET_PAGE_MAX))
+    query = query.order_by(Item.name, InventoryItem.sale_price, InventoryItem.id).limit(limit + 1)
+
+    rows = (await db.execute(query)).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_inv, _loc, last_item, _company = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = _encode_market_cursor(last_item.name, last_inv.sale_price, last_inv.id)
 
     return [
         MarketListingOut(
@@ -595,38 +627,45 @@ def get_global_market_listings(
 
 
 @router.get("/market/stats", response_model=MarketStatsOut)
-def get_market_stats(
-    db: Session = Depends(get_db),
+async def get_market_stats(
+    db: AsyncSession = Depends(get_async_db),
 ):
-    """HV - Statistiques globales du marché"""
-    from sqlalchemy import distinct
-
-    # Base query - items for sale
-    base_query = (
-        db.query(InventoryItem, InventoryLocation, Item)
-        .join(InventoryLocation, InventoryLocation.id == InventoryItem.location_id)
-        .join(Item, Item.id == InventoryItem.item_id)
-        .filter(
-            InventoryItem.for_sale == True,
-            InventoryItem.sale_qty > 0,
-        )
-    )
-
-    rows = base_query.all()
+    """
+    HV - Statistiques globales du marché
+    Lues dans game.market_stats (agrégat par aéroport/tier) + deltas pas encore repliés:
+    coût indépendant du nombre d'annonces.
+    """
+    combined = union_all(
+        select(MarketStat.airport_ident, MarketStat.tier, MarketStat.listings,
+               MarketStat.items_for_sale, MarketStat.total_value),
+        select(MarketStatDelta.airport_ident, MarketStatDelta.tier, MarketStatDelta.listings,
+               MarketStatDelta.items_for_sale, MarketStatDelta.total_value),
+    ).subquery()
+    listings = func.sum(combined.c.listings)
+    rows = (await db.execute(
+        select(
+            combined.c.airport_ident,
+            combined.c.tier,
+            listings.label("listings"),
+            func.sum(combined.c.items_for_sale).label("items_for_sale"),
+            func.sum(combined.c.total_value).label("total_value"),
+        ).group_by(combined.c.airport_ident, combined.c.tier).having(listings > 0)
+    )).all()
 
-    total_listings = len(rows)
     airports = set()
+    total_listings = 0
     total_items = 0
     total_value = Decimal("0")
     tier_counts = {}
 
-    for inv, loc, item in rows:
-        airports.add(loc.airport_ident)
-        total_items += inv.sale_qty
-        total_value += inv.sale_price * inv.sale_qty
+    for stat in rows:
+        airports.add(stat.airport_ident)
+        total_listings += stat.listings
+        total_items += stat.items_for_sale
+        total_value += stat.total_value
 
-        tier_key = f"T{item.tier}"
-        tier_counts[tier_key] = tier_counts.get(tier_key, 0) + 1
+        tier_key = f"T{stat.tier}"
+        tier_counts[tier_key] = tier_counts.get(tier_key, 0) + stat.listings
 
     return MarketStatsOut(
         total_listings=total_listings,
@@ -639,25 +678,24 @@ def get_market_stats(
 
 
 @router.get("/market/{airport_ident}", response_model=list[MarketListingOut])
-def get_market_listings(
+async def get_market_listings(
     airport_ident: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Liste tous les items en vente à un aéroport (endpoint public - legacy)"""
     ident = airport_ident.strip().upper()
 
-    rows = (
-        db.query(InventoryItem, InventoryLocation, Item, Company)
+    rows = (await db.execute(
+        select(InventoryItem, InventoryLocation, Item, Company)
         .join(InventoryLocation, InventoryLocation.id == InventoryItem.location_id)
         .join(Item, Item.id == InventoryItem.item_id)
         .join(Company, Company.id == InventoryLocation.company_id)
-        .filter(
+        .where(
             InventoryLocation.airport_ident == ident,
             InventoryItem.for_sale == True,
             InventoryItem.sale_qty > 0,
         )
-        .all()
-    )
+    )).all()
 
     return [
         MarketListingOut(
@@ -682,6 +720,7 @@ def buy_from_market(
     payload: BuyFromMarketIn,
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """Acheter des items sur le marché (wallet personnel ou company)"""
     qty = int(payload.qty)
@@ -691,7 +730,7 @@ def buy_from_market(
     buyer_type = payload.buyer_type  # "player" or "company"
 
     # Get buyer company (needed for company purchases and to check "can't buy from self")
-    buyer_company, _cm = _get_my_company(db, user.id)
+    buyer_company = ctx.company
 
     if buyer_type == "company" and not buyer_company:
         raise HTTPException(status_code=404, detail="No company")
@@ -714,27 +753,6 @@ def buy_from_market(
 
         it = _get_item_by_name(db, payload.item_code)
 
-        # Trouver l'item en vente
-        seller_item = db.query(InventoryItem).filter(
-            InventoryItem.location_id == seller_loc.id,
-            InventoryItem.item_id == it.id,
-            InventoryItem.for_sale == True,
-        ).first()
-
-        if not seller_item or seller_item.sale_qty < qty:
-            raise HTTPException(status_code=400, detail="Not enough items for sale")
-
-        # Calculer le coût total
-        total_cost = seller_item.sale_price * qty
-
-        # Vérifier le solde selon le type d'acheteur
-        if buyer_type == "player":
-            if user.wallet < total_cost:
-                raise HTTPException(status_code=400, detail="Insufficient personal balance")
-        else:
-            if buyer_company.balance < total_cost:
-                raise HTTPException(status_code=400, detail="Insufficient company balance")
-
         # Créer ou récupérer la location de l'acheteur au même aéroport
         if buyer_type == "player":
             # Achat personnel -> stockage personnel
@@ -777,6 +795,49 @@ def buy_from_market(
                 db.flush()
             buyer_name = buyer_company.name
 
+        # Verrous pris dans un ordre fixe pour éviter les deadlocks entre achats croisés:
+        # 1. inventory_items (vendeur + acheteur, par id), 2. users, 3. companies (par id)
+        # FOR NO KEY UPDATE: ne bloque pas les FOR KEY SHARE des FK (création de location, audits...)
+        # La ligne acheteur est créée vide au besoin pour être verrouillée avec celle du vendeur.
+        db.execute(
+            pg_insert(InventoryItem)
+            .values(id=uuid.uuid4(), location_id=buyer_loc.id, item_id=it.id, qty=0, for_sale=False, sale_qty=0)
+            .on_conflict_do_nothing(constraint="inventory_items_location_id_item_id_key")
+        )
+        locked_items = (
+            db.query(InventoryItem)
+            .filter(
+                InventoryItem.item_id == it.id,
+                InventoryItem.location_id.in_((seller_loc.id, buyer_loc.id)),
+            )
+            .order_by(InventoryItem.id)
+            .with_for_update(key_share=True)
+            .populate_existing()
+            .all()
+        )
+        seller_item = next((i for i in locked_items if i.location_id == seller_loc.id), None)
+        buyer_item = next(i for i in locked_items if i.location_id == buyer_loc.id)
+
+        if not seller_item or not seller_item.for_sale or seller_item.sale_qty < qty:
+            raise HTTPException(status_code=400, detail="Not enough items for sale")
+
+        # Calculer le coût total (prix lu sur la ligne verrouillée)
+        total_cost = seller_item.sale_price * qty
+
+        # Vérifier le solde selon le type d'acheteur (lignes verrouillées)
+        if buyer_type == "player":
+            db.refresh(user, attribute_names=["wallet"], with_for_update={"key_share": True})
+        db.query(Company).filter(
+            Company.id.in_({seller_company.id, buyer_company.id} if buyer_type == "company" else {seller_company.id})
+        ).order_by(Company.id).with_for_update(key_share=True).populate_existing().all()
+
+        if buyer_type == "player":
+            if user.wallet < total_cost:
+                raise HTTPException(status_code=400, detail="Insufficient personal balance")
+        else:
+            if buyer_company.balance < total_cost:
+                raise HTTPException(status_code=400, detail="Insufficient company balance")
+
         # Effectuer la transaction
         # 1. Retirer du vendeur
         seller_item.qty -= qty
@@ -787,16 +848,6 @@ def buy_from_market(
             seller_item.sale_qty = 0
 
         # 2. Ajouter à l'acheteur
-        buyer_item = db.query(InventoryItem).filter(
-            InventoryItem.location_id == buyer_loc.id,
-            InventoryItem.item_id == it.id,
-        ).first()
-
-        if not buyer_item:
-            buyer_item = InventoryItem(location_id=buyer_loc.id, item_id=it.id, qty=0)
-            db.add(buyer_item)
-            db.flush()
-
         buyer_item.qty += qty
 
         # 3. Transférer l'argent
@@ -839,146 +890,133 @@ def buy_from_market(
         db.rollback()
         raise
 
-    return get_inventory(buyer_loc.id, db, user)
+    return get_inventory(buyer_loc.id, db, ctx)
 
 
 # ═══════════════════════════════════════════════════════════
 # V0.7 UNIFIED INVENTORY SYSTEM
 # ═══════════════════════════════════════════════════════════
 
-def _get_user_permissions(db: Session, user_id: uuid.UUID, company_id: uuid.UUID) -> CompanyPermission | None:
-    """Get user's permissions for a company"""
-    return db.query(CompanyPermission).filter(
-        CompanyPermission.user_id == user_id,
-        CompanyPermission.company_id == company_id,
-    ).first()
-
-
-def _can_access_location(db: Session, user_id: uuid.UUID, location: InventoryLocation) -> tuple[bool, CompanyPermission | None]:
+def _can_access_location(ctx: RequestContext, location: InventoryLocation) -> bool:
     """Check if user can access a location"""
     if location.owner_type == "player":
-        return location.owner_id == user_id, None
+        return location.owner_id == ctx.user_id
 
     if location.owner_type == "company":
-        # Check membership
-        membership = db.query(CompanyMember).filter(
-            CompanyMember.user_id == user_id,
-            CompanyMember.company_id == location.owner_id,
-        ).first()
-        if not membership:
-            return False, None
+        return ctx.is_member_of(location.owner_id)
+
+    return False
 
-        perms = _get_user_permissions(db, user_id, location.owner_id)
-        return True, perms
 
-    return False, None
+# Permission requise par type d'emplacement compagnie (retrait, dépôt)
+LOCATION_PERMISSIONS = {
+    "company_warehouse": ("can_withdraw_warehouse", "can_deposit_warehouse"),
+    "warehouse": ("can_withdraw_warehouse", "can_deposit_warehouse"),
+    "factory_storage": ("can_withdraw_factory", "can_deposit_factory"),
+    "aircraft": ("can_use_aircraft", "can_use_aircraft"),
+}
 
 
-def _can_withdraw_from_location(db: Session, user_id: uuid.UUID, location: InventoryLocation) -> bool:
+def _can_withdraw_from_location(ctx: RequestContext, location: InventoryLocation) -> bool:
     """Check if user can withdraw from a location"""
-    has_access, perms = _can_access_location(db, user_id, location)
-    if not has_access:
+    if not _can_access_location(ctx, location):
         return False
 
     if location.owner_type == "player":
         return True
 
     # Company location - check permissions
-    if not perms:
-        return False
-
-    if perms.is_founder:
+    if ctx.can("is_founder"):
         return True
 
-    if location.kind in ("company_warehouse", "warehouse"):
-        return perms.can_withdraw_warehouse
-    if location.kind == "factory_storage":
-        return perms.can_withdraw_factory
-    if location.kind == "aircraft":
-        return perms.can_use_aircraft
-
-    return False
+    flags = LOCATION_PERMISSIONS.get(location.kind)
+    if not flags:
+        return False
+    return ctx.can(flags[0])
 
 
-def _can_deposit_to_location(db: Session, user_id: uuid.UUID, location: InventoryLocation) -> bool:
+def _can_deposit_to_location(ctx: RequestContext, location: InventoryLocation) -> bool:
     """Check if user can deposit to a location"""
-    has_access, perms = _can_access_location(db, user_id, location)
-    if not has_access:
+    if not _can_access_location(ctx, location):
         return False
 
     if location.owner_type == "player":
         return True
 
     # Company location - check permissions
-    if not perms:
-        return False
-
-    if perms.is_founder:
+    if ctx.can("is_founder"):
         return True
 
-    if location.kind in ("company_warehouse", "warehouse"):
-        return perms.can_deposit_warehouse
-    if location.kind == "factory_storage":
-        return perms.can_deposit_factory
-    if location.kind == "aircraft":
-        return perms.can_use_aircraft
-
-    return False
+    flags = LOCATION_PERMISSIONS.get(location.kind)
+    if not flags:
+        return False
+    return ctx.can(flags[1])
 
 
 @router.get("/overview", response_model=InventoryOverviewOut)
 def get_inventory_overview(
     db: Session = Depends(get_db),
-    user=Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
-    """V0.7 - Get complete inventory overview for current user (personal + company)"""
-
-    # Get all locations user has access to
-    # 1. Player's own locations
-    player_locations = db.query(InventoryLocation).filter(
+    """
+    V0.7 - Get complete inventory overview for current user (personal + company)
+    Deux requêtes quel que soit le nombre d'emplacements:
+    1. emplacements accessibles + items (qty > 0) + nom du propriétaire
+    2. CompanyInventory (production) de la compagnie
+    """
+    # 1. Player's own locations + company locations, with their items
+    access_filter = and_(
         InventoryLocation.owner_type == "player",
-        InventoryLocation.owner_id == user.id,
-    ).all()
-
-    # 2. Company locations (for companies user is member of)
-    company_ids = db.query(CompanyMember.company_id).filter(
-        CompanyMember.user_id == user.id
-    ).subquery()
-
-    company_locations = db.query(InventoryLocation).filter(
-        InventoryLocation.owner_type == "company",
-        InventoryLocation.owner_id.in_(company_ids),
-    ).all()
+        InventoryLocation.owner_id == ctx.user_id,
+    )
+    if ctx.company_id:
+        access_filter = or_(access_filter, and_(
+            InventoryLocation.owner_type == "company",
+            InventoryLocation.owner_id == ctx.company_id,
+        ))
 
-    all_locations = player_locations + company_locations
+    rows = (
+        db.query(InventoryLocation, InventoryItem, Item, Company.name)
+        .outerjoin(InventoryItem, and_(
+            InventoryItem.location_id == InventoryLocation.id,
+            InventoryItem.qty > 0,
+        ))
+        .outerjoin(Item, Item.id == InventoryItem.item_id)
+        .outerjoin(Company, and_(
+            InventoryLocation.owner_type == "company",
+            Company.id == InventoryLocation.owner_id,
+        ))
+        .filter(access_filter)
+        .order_by(InventoryLocation.owner_type.desc(), InventoryLocation.id, Item.name)  # player avant company
+        .all()
+    )
 
-    # Group by airport
-    airports_data: dict[str, list[InventoryLocation]] = {}
-    for loc in all_locations:
+    # Group by airport, then by location (insertion order preserved)
+    airports_data: dict[str, dict] = {}
+    for loc, inv_item, item, company_name in rows:
         airport = loc.airport_ident or "GLOBAL"
-        if airport not in airports_data:
-            airports_data[airport] = []
-        airports_data[airport].append(loc)
-
-    # V0.7: Also get CompanyInventory items (production output)
+        locs = airports_data.setdefault(airport, {})
+        if loc.id not in locs:
+            owner_name = company_name if loc.owner_type == "company" else "Personal"
+            locs[loc.id] = (loc, owner_name, [])
+        if inv_item is not None and item is not None:
+            locs[loc.id][2].append((inv_item, item))
+
+    # 2. V0.7: Also get CompanyInventory items (production output)
     company_inv_by_airport: dict[str, list] = {}
-    for company_id in db.query(CompanyMember.company_id).filter(CompanyMember.user_id == user.id).all():
-        company_id = company_id[0]
+    if ctx.company_id:
         company_items = (
             db.query(CompanyInventory, Item, Company.name)
             .join(Item, Item.id == CompanyInventory.item_id)
             .join(Company, Company.id == CompanyInventory.company_id)
-            .filter(CompanyInventory.company_id == company_id, CompanyInventory.qty > 0)
+            .filter(CompanyInventory.company_id == ctx.company_id, CompanyInventory.qty > 0)
             .all()
         )
         for ci, item, company_name in company_items:
             airport = ci.airport_ident or "GLOBAL"
-            if airport not in company_inv_by_airport:
-                company_inv_by_airport[airport] = []
-            company_inv_by_airport[airport].append((ci, item, company_name))
+            company_inv_by_airport.setdefault(airport, []).append((ci, item, company_name))
             # Ensure airport exists in airports_data
-            if airport not in airports_data:
-                airports_data[airport] = []
+            airports_data.setdefault(airport, {})
 
     # Build response
     total_items = 0
@@ -988,20 +1026,12 @@ def get_inventory_overview(
     for airport_ident, locs in airports_data.items():
         containers = []
 
-        for loc in locs:
-            # Get items in this location
-            items_query = (
-                db.query(InventoryItem, Item)
-                .join(Item, Item.id == InventoryItem.item_id)
-                .filter(InventoryItem.location_id == loc.id, InventoryItem.qty > 0)
-                .all()
-            )
-
+        for loc, owner_name, items_rows in locs.values():
             items_out = []
             container_total = Decimal("0")
             container_items = 0
 
-            for inv_item, item in items_query:
+            for inv_item, item in items_rows:
                 item_total_value = item.base_value * inv_item.qty
                 item_total_weight = item.weight_kg * inv_item.qty
                 container_total += item_total_value
@@ -1022,14 +1052,6 @@ def get_inventory_overview(
             total_items += container_items
             total_value += container_total
 
-            # Get owner name
-            owner_name = None
-            if loc.owner_type == "company":
-                company = db.query(Company).filter(Company.id == loc.owner_id).first()
-                owner_name = company.name if company else None
-            else:
-                owner_name = "Personal"
-
             containers.append(ContainerOut(
                 id=loc.id,
                 type=loc.kind,
@@ -1106,6 +1128,7 @@ def transfer_items(
     payload: TransferIn,
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """V0.7 - Transfer items between locations (same airport only)"""
 
@@ -1130,10 +1153,10 @@ def transfer_items(
         )
 
     # Check permissions
-    if not _can_withdraw_from_location(db, user.id, from_loc):
+    if not _can_withdraw_from_location(ctx, from_loc):
         raise HTTPException(status_code=403, detail="No permission to withdraw from source location")
 
-    if not _can_deposit_to_location(db, user.id, to_loc):
+    if not _can_deposit_to_location(ctx, to_loc):
         raise HTTPException(status_code=403, detail="No permission to deposit to destination location")
 
     # Get item
@@ -1163,15 +1186,8 @@ def transfer_items(
         ).first()
 
         if aircraft:
-            # Calculate current cargo weight
-            current_weight_result = db.execute(text("""
-                SELECT COALESCE(SUM(ii.qty * i.weight_kg), 0) as total_weight
-                FROM game.inventory_items ii
-                JOIN game.items i ON i.id = ii.item_id
-                WHERE ii.location_id = :loc_id
-            """), {"loc_id": str(to_loc.id)}).fetchone()
-
-            current_weight = Decimal(str(current_weight_result[0])) if current_weight_result else Decimal("0")
+            # Current cargo weight (maintained by trigger on inventory_items)
+            current_weight = Decimal(aircraft.current_cargo_kg)
             added_weight = item.weight_kg * payload.qty
 
             if current_weight + added_weight > aircraft.cargo_capacity_kg:
@@ -1329,15 +1345,13 @@ def get_inventory_at_airport(
     icao: str,
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """V0.7 - Get all user's inventory at a specific airport"""
     ident = icao.strip().upper()
 
     # Get company IDs user is member of
-    company_ids = [
-        cm.company_id for cm in
-        db.query(CompanyMember).filter(CompanyMember.user_id == user.id).all()
-    ]
+    company_ids = [ctx.company_id] if ctx.company_id else []
 
     # Get all locations at this airport user can access
     locations = db.query(InventoryLocation).filter(
@@ -1412,15 +1426,6 @@ def get_inventory_at_airport(
 # Uses: player_inventory, company_inventory, aircraft_inventory
 # ═══════════════════════════════════════════════════════════
 
-def _get_user_company_v2(db: Session, user_id: uuid.UUID) -> tuple[Company | None, CompanyMember | None]:
-    """Get user's company and membership"""
-    member = db.query(CompanyMember).filter(CompanyMember.user_id == user_id).first()
-    if not member:
-        return None, None
-    company = db.query(Company).filter(Company.id == member.company_id).first()
-    return company, member
-
-
 def _calculate_aircraft_cargo_weight(db: Session, aircraft_id: uuid.UUID) -> Decimal:
     """Calculate total weight of cargo in an aircraft"""
     result = db.query(
@@ -1494,14 +1499,14 @@ def get_player_inventory(
 def get_company_inventory(
     airport: str | None = None,
     db: Session = Depends(get_db),
-    user=Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """
     V0.7 Simplified - Get company's complete inventory.
     User must be a member of the company.
     Optional: filter by airport_ident
     """
-    company, member = _get_user_company_v2(db, user.id)
+    company = ctx.company
     if not company:
         raise HTTPException(status_code=404, detail="No company membership")
 
@@ -1558,10 +1563,11 @@ def get_aircraft_cargo(
     aircraft_id: uuid.UUID,
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """V0.7 Simplified - Get cargo contents of an aircraft"""
     # Verify user has access to this aircraft
-    company, member = _get_user_company_v2(db, user.id)
+    company = ctx.company
 
     aircraft = db.query(CompanyAircraft).filter(CompanyAircraft.id == aircraft_id).first()
     if not aircraft:
@@ -1615,6 +1621,7 @@ def load_cargo(
     payload: LoadCargoIn,
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """
     V0.7 Simplified - Load items from inventory into an aircraft.
@@ -1645,7 +1652,7 @@ def load_cargo(
             PlayerInventory.airport_ident == aircraft_airport,
         ).first()
     else:
-        company, _ = _get_user_company_v2(db, user.id)
+        company = ctx.company
         if not company:
             raise HTTPException(status_code=404, detail="No company membership")
         source_inv = db.query(CompanyInventory).filter(
@@ -1714,6 +1721,7 @@ def unload_cargo(
     payload: UnloadCargoIn,
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """
     V0.7 Simplified - Unload items from aircraft to inventory.
@@ -1774,7 +1782,7 @@ def unload_cargo(
 
             dest_inv.qty += payload.qty
         else:
-            company, _ = _get_user_company_v2(db, user.id)
+            company = ctx.company
             if not company:
                 raise HTTPException(status_code=404, detail="No company membership")
 
@@ -2,12 +2,10 @@ import uuid
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
-from app.deps import get_db, get_current_user
-from app.models.user import User
-from app.models.company import Company
-from app.models.company_member import CompanyMember
+from app.deps import RequestContext, get_db, get_request_context
 from app.models.market_order import MarketOrder
 from app.models.company_transaction import CompanyTransaction
+from app.services.order_book import OrderRejected, matching_engine
 from app.schemas.market import (
     WalletOut,
     TransactionOut,
@@ -18,35 +16,23 @@ from app.schemas.market import (
 router = APIRouter(prefix="/market", tags=["market"])
 
 
-def _get_my_company(db: Session, user_id):
-    cm = db.query(CompanyMember).filter(CompanyMember.user_id == user_id).one_or_none()
-    if not cm:
-        raise HTTPException(status_code=404, detail="User is not in a company")
-
-    company = db.query(Company).filter(Company.id == cm.company_id).one_or_none()
-    if not company:
-        raise HTTPException(status_code=404, detail="Company not found")
-
-    return company, cm
-
-
 # ===== Wallet =====
 
 @router.get("/wallet", response_model=WalletOut)
 def get_wallet(
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
-    company, _ = _get_my_company(db, user.id)
+    company = ctx.require_company()
     return WalletOut(company_id=company.id, balance=float(company.balance))
 
 
 @router.get("/transactions", response_model=list[TransactionOut])
 def list_transactions(
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
-    company, _ = _get_my_company(db, user.id)
+    company = ctx.require_company()
 
     txs = (
         db.query(CompanyTransaction)
@@ -63,9 +49,9 @@ def list_transactions(
 @router.get("/orders", response_model=list[MarketOrderOut])
 def list_my_orders(
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
-    company, _ = _get_my_company(db, user.id)
+    company = ctx.require_company()
 
     orders = (
         db.query(MarketOrder)
@@ -81,11 +67,11 @@ def list_my_orders(
 def create_order(
     payload: MarketOrderCreateIn,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
-    company, cm = _get_my_company(db, user.id)
+    company = ctx.require_company()
 
-    if cm.role not in {"owner", "admin"}:
+    if ctx.role not in {"owner", "admin"}:
         raise HTTPException(status_code=403, detail="Insufficient role")
 
     order = MarketOrder(
@@ -93,12 +79,41 @@ def create_order(
         company_id=company.id,
         side=payload.side,
         item_code=payload.item_code,
+        airport_ident=payload.airport_ident.strip().upper(),
         quantity=payload.quantity,
         unit_price=payload.unit_price,
         status="open",
     )
 
-    db.add(order)
-    db.commit()
+    # Garantie + matching + règlement dans une transaction (commit inclus)
+    try:
+        matching_engine.place(db, order)
+    except OrderRejected as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    db.refresh(order)
+    return order
+
+
+@router.delete("/orders/{order_id}", response_model=MarketOrderOut)
+def cancel_order(
+    order_id: uuid.UUID,
+    db: Session = Depends(get_db),
+    ctx: RequestContext = Depends(get_request_context),
+):
+    company = ctx.require_company()
+
+    if ctx.role not in {"owner", "admin"}:
+        raise HTTPException(status_code=403, detail="Insufficient role")
+
+    order = db.get(MarketOrder, order_id)
+    if not order or order.company_id != company.id:
+        raise HTTPException(status_code=404, detail="Order not found")
+
+    try:
+        matching_engine.cancel(db, order)
+    except OrderRejected as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     db.refresh(order)
     return order
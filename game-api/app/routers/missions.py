@@ -6,13 +6,12 @@ from datetime import datetime, timedelta
 from math import radians, sin, cos, sqrt, atan2
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import func, select
 
-from app.deps import get_db, get_current_user
+from app.deps import RequestContext, get_async_db, get_db, get_current_user, get_current_user_async, get_request_context
 from app.models.user import User
-from app.models.company import Company
-from app.models.company_member import CompanyMember
 from app.models.company_aircraft import CompanyAircraft
 from app.models.mission import Mission
 from app.models.airport import Airport
@@ -32,6 +31,7 @@ from app.schemas.mission import (
     MissionHistoryListOut,
     AvailableAircraftOut,
 )
+from app.services.airport_index import get_airport_index
 
 router = APIRouter(prefix="/missions", tags=["missions"])
 
@@ -40,14 +40,6 @@ router = APIRouter(prefix="/missions", tags=["missions"])
 # HELPER FUNCTIONS
 # =====================================================
 
-def _get_my_company(db: Session, user_id: uuid.UUID):
-    """Get current user's company."""
-    cm = db.query(CompanyMember).filter(CompanyMember.user_id == user_id).first()
-    if not cm:
-        return None, None
-    c = db.query(Company).filter(Company.id == cm.company_id).first()
-    return c, cm
-
 
 def _haversine_distance_nm(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """Calculate distance between two coordinates in nautical miles."""
@@ -71,6 +63,32 @@ def _get_airport_coords(db: Session, icao: str) -> tuple[float, float] | None:
     return None
 
 
+def _route_distance_nm(db: Session, origin_icao: str, destination_icao: str) -> float | None:
+    """
+    Distance origin -> destination (nm), 404 if the destination is unknown.
+    Served from the airport index; database fallback if it is not loaded yet or if
+    an airport is not indexed (closed, or added after the index was built).
+    """
+    index = get_airport_index()
+    if index is not None:
+        distance = index.distance_nm(origin_icao, destination_icao)
+        if distance is not None:
+            return distance
+
+    dest_airport = db.query(Airport).filter(Airport.ident == destination_icao).first()
+    if not dest_airport:
+        raise HTTPException(status_code=404, detail=f"Destination airport {destination_icao} not found")
+
+    origin_coords = _get_airport_coords(db, origin_icao)
+    dest_coords = _get_airport_coords(db, destination_icao)
+    if origin_coords and dest_coords:
+        return _haversine_distance_nm(
+            origin_coords[0], origin_coords[1],
+            dest_coords[0], dest_coords[1]
+        )
+    return None
+
+
 def _calculate_expected_flight_time(distance_nm: float, cruise_speed_kts: int = 150) -> int:
     """Calculate expected flight time in minutes."""
     if cruise_speed_kts <= 0:
@@ -86,13 +104,13 @@ def _calculate_expected_flight_time(distance_nm: float, cruise_speed_kts: int =
 def get_available_aircraft(
     icao: str = Query(..., min_length=3, max_length=4, description="Airport ICAO code"),
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """
     Get aircraft available at a specific airport for mission.
     Returns company aircraft positioned at this airport.
     """
-    company, _ = _get_my_company(db, user.id)
+    company = ctx.company
     if not company:
         raise HTTPException(status_code=404, detail="No company found")
 
@@ -118,12 +136,13 @@ def create_mission(
     payload: MissionCreateIn,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """
     Create a new mission (status: pending).
     Origin is deduced from aircraft's current location.
     """
-    company, _ = _get_my_company(db, user.id)
+    company = ctx.company
     if not company:
         raise HTTPException(status_code=404, detail="No company found")
 
@@ -167,67 +186,44 @@ def create_mission(
 
     destination_icao = payload.destination_icao.upper()
 
-    # Validate destination exists
-    dest_airport = db.query(Airport).filter(Airport.ident == destination_icao).first()
-    if not dest_airport:
-        raise HTTPException(status_code=404, detail=f"Destination airport {destination_icao} not found")
+    # Validate destination exists + distance (in-memory airport index, no query)
+    distance_nm = _route_distance_nm(db, origin_icao, destination_icao)
 
-    # Calculate distance
-    origin_coords = _get_airport_coords(db, origin_icao)
-    dest_coords = _get_airport_coords(db, destination_icao)
-    distance_nm = None
-    if origin_coords and dest_coords:
-        distance_nm = _haversine_distance_nm(
-            origin_coords[0], origin_coords[1],
-            dest_coords[0], dest_coords[1]
+    # Cargo totals maintained by trigger on inventory_items (no recomputation)
+    total_weight = float(aircraft.current_cargo_kg)
+    pax_count = aircraft.current_pax
+
+    # Check weight capacity
+    if total_weight > aircraft.cargo_capacity_kg:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cargo too heavy ({total_weight:.1f}kg) for aircraft capacity ({aircraft.cargo_capacity_kg}kg)"
         )
 
-    # Get cargo from aircraft's inventory location (already loaded via fleet/load)
+    # Cargo snapshot from aircraft's inventory location (already loaded via fleet/load)
     cargo_snapshot = {"items": []}
-    total_weight = 0.0
-    pax_count = 0
-
-    # Find aircraft inventory location
-    aircraft_loc = db.query(InventoryLocation).filter(
-        InventoryLocation.aircraft_id == aircraft.id,
-        InventoryLocation.kind == "aircraft",
-    ).first()
-
-    if aircraft_loc:
-        # Get all items in aircraft cargo
+    if aircraft.current_cargo_items:
         cargo_items = (
             db.query(InventoryItem, Item)
+            .join(InventoryLocation, InventoryLocation.id == InventoryItem.location_id)
             .join(Item, Item.id == InventoryItem.item_id)
             .filter(
-                InventoryItem.location_id == aircraft_loc.id,
+                InventoryLocation.aircraft_id == aircraft.id,
+                InventoryLocation.kind == "aircraft",
                 InventoryItem.qty > 0,
             )
             .all()
         )
 
         for inv_item, item in cargo_items:
-            item_weight = float(item.weight_kg) * inv_item.qty
-            total_weight += item_weight
-
-            # Check if it's a passenger item
-            if "pax" in (item.tags or []):
-                pax_count += inv_item.qty
-
             cargo_snapshot["items"].append({
                 "item_id": str(item.id),
                 "item_name": item.name,
                 "item_icon": item.icon,
                 "quantity": inv_item.qty,
-                "weight_kg": item_weight,
+                "weight_kg": float(item.weight_kg) * inv_item.qty,
             })
 
-    # Check weight capacity
-    if total_weight > aircraft.cargo_capacity_kg:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Cargo too heavy ({total_weight:.1f}kg) for aircraft capacity ({aircraft.cargo_capacity_kg}kg)"
-        )
-
     # Create mission (auto-start: status = in_progress)
     mission = Mission(
         company_id=company.id,
@@ -259,6 +255,7 @@ def start_mission(
     mission_id: uuid.UUID,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """
     Start a pending mission (pending -> in_progress).
@@ -275,7 +272,7 @@ def start_mission(
     if mission.status != "pending":
         raise HTTPException(status_code=400, detail=f"Mission is {mission.status}, not pending")
 
-    company, _ = _get_my_company(db, user.id)
+    company = ctx.company
     if not company or mission.company_id != company.id:
         raise HTTPException(status_code=403, detail="Not authorized")
 
@@ -319,6 +316,7 @@ def complete_mission(
     payload: MissionCompleteIn,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """
     Complete a mission with flight data.
@@ -335,7 +333,7 @@ def complete_mission(
     if mission.status != "in_progress":
         raise HTTPException(status_code=400, detail=f"Mission is {mission.status}, not in_progress")
 
-    company, _ = _get_my_company(db, user.id)
+    company = ctx.company
     if not company or mission.company_id != company.id:
         raise HTTPException(status_code=403, detail="Not authorized")
 
@@ -440,6 +438,7 @@ def fail_mission(
     payload: MissionFailIn,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """
     Fail or cancel a mission.
@@ -456,7 +455,7 @@ def fail_mission(
     if mission.status not in ["pending", "in_progress"]:
         raise HTTPException(status_code=400, detail=f"Mission is {mission.status}, cannot fail")
 
-    company, _ = _get_my_company(db, user.id)
+    company = ctx.company
     if not company or mission.company_id != company.id:
         raise HTTPException(status_code=403, detail="Not authorized")
 
@@ -507,34 +506,42 @@ def fail_mission(
 # =====================================================
 
 @router.get("/active", response_model=ActiveMissionOut | None)
-def get_active_mission(
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+async def get_active_mission(
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user_async),
 ):
-    """Get user's active mission (pending or in_progress)."""
-    mission = db.query(Mission).filter(
-        Mission.pilot_user_id == user.id,
-        Mission.status.in_(["pending", "in_progress"]),
-    ).first()
-
-    if not mission:
+    """
+    Get user's active mission (pending or in_progress).
+    Polled by the EFB: async, one query (mission + airport names + aircraft).
+    """
+    Origin = aliased(Airport)
+    Destination = aliased(Airport)
+
+    row = (await db.execute(
+        select(
+            Mission,
+            select(Origin.name).where(Origin.ident == Mission.origin_icao).limit(1).scalar_subquery(),
+            select(Destination.name).where(Destination.ident == Mission.destination_icao).limit(1).scalar_subquery(),
+            CompanyAircraft,
+        ).outerjoin(
+            CompanyAircraft, CompanyAircraft.id == Mission.aircraft_id
+        ).where(
+            Mission.pilot_user_id == user.id,
+            Mission.status.in_(["pending", "in_progress"]),
+        ).limit(1)
+    )).first()
+
+    if not row:
         return None
 
-    # Get airport names
-    origin = db.query(Airport).filter(Airport.ident == mission.origin_icao).first()
-    dest = db.query(Airport).filter(Airport.ident == mission.destination_icao).first()
-    aircraft = None
-    if mission.aircraft_id:
-        aircraft = db.query(CompanyAircraft).filter(
-            CompanyAircraft.id == mission.aircraft_id
-        ).first()
+    mission, origin_name, destination_name, aircraft = row
 
     return ActiveMissionOut(
         id=mission.id,
         origin_icao=mission.origin_icao,
-        origin_name=origin.name if origin else None,
+        origin_name=origin_name,
         destination_icao=mission.destination_icao,
-        destination_name=dest.name if dest else None,
+        destination_name=destination_name,
         distance_nm=mission.distance_nm,
         status=mission.status,
         cargo_weight_kg=mission.cargo_weight_kg,
@@ -9,9 +9,8 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy import select, func, and_
 from sqlalchemy.orm import Session
 
-from app.deps import get_db, get_current_user
+from app.deps import RequestContext, get_db, get_current_user, get_request_context
 from app.models.factory import Factory
-from app.models.company import Company
 from app.models.worker import WorkerInstance
 from app.models.item import Item
 from app.models.user import User
@@ -32,24 +31,24 @@ router = APIRouter(prefix="/workers", tags=["workers"])
 # WORKERS V2 - Item-based workers system
 # ═══════════════════════════════════════════════════════════
 
-def _get_my_company(db: Session, user_id: uuid.UUID):
-    """Get company owned by user."""
-    company = db.execute(
-        select(Company).where(Company.owner_user_id == user_id)
-    ).scalar_one_or_none()
-    return company
+def _owned_company(ctx: RequestContext):
+    """Company of the current user, only if they are its owner."""
+    company = ctx.company
+    if company and company.owner_user_id == ctx.user_id:
+        return company
+    return None
 
 
 @router.get("/v2/all", response_model=list[WorkerInstanceListOut])
 def get_all_company_workers_v2(
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """
     [V2] Get ALL workers owned by company (all airports, all statuses).
     For inventory display.
     """
-    company = _get_my_company(db, user.id)
+    company = _owned_company(ctx)
     if not company:
         raise HTTPException(status_code=404, detail="No company found")
 
@@ -84,13 +83,13 @@ def get_all_company_workers_v2(
 def get_inventory_workers_v2(
     airport: str = Query(..., description="Airport ICAO code"),
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """
     [V2] Get workers available in company inventory at an airport.
     These are workers that can be assigned to factories.
     """
-    company = _get_my_company(db, user.id)
+    company = _owned_company(ctx)
     if not company:
         raise HTTPException(status_code=404, detail="No company found")
 
@@ -138,9 +137,10 @@ def get_worker_instance_v2(
     instance_id: uuid.UUID,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """[V2] Get a specific worker instance's details."""
-    company = _get_my_company(db, user.id)
+    company = _owned_company(ctx)
 
     query = select(WorkerInstance, Item.name.label("item_name")).join(
         Item, WorkerInstance.item_id == Item.id
@@ -185,10 +185,10 @@ def assign_worker_instance_v2(
     instance_id: uuid.UUID,
     assign_data: WorkerInstanceAssignIn,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """[V2] Assign a worker instance to a factory."""
-    company = _get_my_company(db, user.id)
+    company = _owned_company(ctx)
     if not company:
         raise HTTPException(status_code=404, detail="No company found")
 
@@ -280,10 +280,10 @@ def assign_worker_instance_v2(
 def unassign_worker_instance_v2(
     instance_id: uuid.UUID,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """[V2] Unassign a worker instance from factory (returns to inventory)."""
-    company = _get_my_company(db, user.id)
+    company = _owned_company(ctx)
     if not company:
         raise HTTPException(status_code=404, detail="No company found")
 
@@ -342,10 +342,10 @@ def unassign_worker_instance_v2(
 def get_factory_workers_v2(
     factory_id: uuid.UUID,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    ctx: RequestContext = Depends(get_request_context),
 ):
     """[V2] Get workers assigned to a factory."""
-    company = _get_my_company(db, user.id)
+    company = _owned_company(ctx)
     if not company:
         raise HTTPException(status_code=404, detail="No company found")
 
@@ -1,13 +1,23 @@
 """
 World router - Public world data (items, recipes, airports).
+Async endpoints (AsyncSession): polled by every EFB/webmap client.
+Endpoints served from the in-memory airport index are CPU-bound (numpy, tile
+building): they stay plain `def` so FastAPI runs them in the threadpool and
+never blocks the event loop (/airports/closest keeps its async DB fallback and
+offloads the index query with run_in_threadpool).
 """
+import math
 import uuid
+from functools import lru_cache
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy import case, func, select
 
-from app.deps import get_db
+from app.core.cache import TTLCache
+from app.deps import get_async_db
 from app.models.item import Item
 from app.models.recipe import Recipe, RecipeIngredient
 from app.models.airport import Airport
@@ -21,7 +31,13 @@ from app.schemas.factories import (
     RecipeWithInputsOut,
     AirportSlotOut,
     AirportOut,
+    AirportNearestOut,
+    AirportDistanceOut,
+    AirportDistanceMatrixIn,
+    AirportDistanceMatrixOut,
 )
+from app.services.airport_index import get_airport_index
+from app.services.airport_tiles import MAX_ZOOM, get_tile_set
 
 router = APIRouter(prefix="/world", tags=["world"])
 
@@ -31,26 +47,26 @@ router = APIRouter(prefix="/world", tags=["world"])
 # =====================================================
 
 @router.get("/items", response_model=list[ItemListOut])
-def list_items(
+async def list_items(
     tier: int | None = Query(None, ge=0, le=5, description="Filter by tier (0-5)"),
     tag: str | None = Query(None, description="Filter by tag (food, construction, etc.)"),
     is_raw: bool | None = Query(None, description="Filter raw materials only"),
     limit: int = Query(100, ge=1, le=500, description="Max results"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """List all items (with filters)."""
-    query = db.query(Item)
+    query = select(Item)
 
     if tier is not None:
-        query = query.filter(Item.tier == tier)
+        query = query.where(Item.tier == tier)
 
     if tag is not None:
-        query = query.filter(Item.tags.contains([tag]))
+        query = query.where(Item.tags.contains([tag]))
 
     if is_raw is not None:
-        query = query.filter(Item.is_raw == is_raw)
+        query = query.where(Item.is_raw == is_raw)
 
-    items = query.order_by(Item.tier, Item.name).limit(limit).all()
+    items = (await db.scalars(query.order_by(Item.tier, Item.name).limit(limit))).all()
 
     return [
         ItemListOut(
@@ -65,12 +81,12 @@ def list_items(
 
 
 @router.get("/items/{item_id}", response_model=ItemOut)
-def get_item_details(
+async def get_item_details(
     item_id: uuid.UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Get detailed item information."""
-    item = db.query(Item).filter(Item.id == item_id).first()
+    item = await db.get(Item, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
 
@@ -89,15 +105,17 @@ def get_item_details(
 
 
 @router.get("/items/search/{name}", response_model=list[ItemListOut])
-def search_items_by_name(
+async def search_items_by_name(
     name: str,
     limit: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Search items by name (case-insensitive)."""
-    items = db.query(Item).filter(
-        Item.name.ilike(f"%{name}%")
-    ).order_by(Item.tier, Item.name).limit(limit).all()
+    items = (await db.scalars(
+        select(Item).where(
+            Item.name.ilike(f"%{name}%")
+        ).order_by(Item.tier, Item.name).limit(limit)
+    )).all()
 
     return [
         ItemListOut(
@@ -116,43 +134,46 @@ def search_items_by_name(
 # =====================================================
 
 @router.get("/recipes", response_model=list[RecipeWithInputsOut])
-def list_recipes(
+async def list_recipes(
     tier: int | None = Query(None, ge=1, le=10, description="Filter by tier (1-10)"),
     tag: str | None = Query(None, description="Filter by tag (food, construction, etc.)"),
     limit: int = Query(100, ge=1, le=500, description="Max results"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """List all recipes with inputs (V2.1 - for recipe detection)."""
-    query = db.query(Recipe)
+    OutputItem = aliased(Item)
 
-    if tier is not None:
-        query = query.filter(Recipe.tier == tier)
-
-    recipes = query.order_by(Recipe.tier, Recipe.name).limit(limit).all()
-
-    result = []
-    for recipe in recipes:
-        # Get output item
-        output_item = db.query(Item).filter(Item.id == recipe.result_item_id).first()
-        output_name = output_item.name if output_item else recipe.name
-        output_icon = output_item.icon if output_item else None
-
-        # Get inputs with item details
-        ingredients_data = db.query(RecipeIngredient, Item).join(
-            Item, RecipeIngredient.item_id == Item.id
-        ).filter(
-            RecipeIngredient.recipe_id == recipe.id
-        ).all()
+    # Recipes with their output item (one query)
+    query = select(Recipe, OutputItem).outerjoin(OutputItem, OutputItem.id == Recipe.result_item_id)
 
-        inputs = [
-            RecipeIngredientOut(
+    if tier is not None:
+        query = query.where(Recipe.tier == tier)
+
+    recipes = (await db.execute(query.order_by(Recipe.tier, Recipe.name).limit(limit))).all()
+
+    # Inputs of all listed recipes with item details (one query)
+    inputs_by_recipe: dict[uuid.UUID, list[RecipeIngredientOut]] = {}
+    if recipes:
+        ingredients_data = await db.execute(
+            select(RecipeIngredient, Item).join(
+                Item, RecipeIngredient.item_id == Item.id
+            ).where(
+                RecipeIngredient.recipe_id.in_([recipe.id for recipe, _ in recipes])
+            )
+        )
+        for ingredient, item in ingredients_data:
+            inputs_by_recipe.setdefault(ingredient.recipe_id, []).append(RecipeIngredientOut(
                 item_id=ingredient.item_id,
                 item_name=item.name,
                 item_icon=item.icon,
                 quantity_required=ingredient.quantity,
-            )
-            for ingredient, item in ingredients_data
-        ]
+            ))
+
+    result = []
+    for recipe, output_item in recipes:
+        output_name = output_item.name if output_item else recipe.name
+        output_icon = output_item.icon if output_item else None
+        inputs = inputs_by_recipe.get(recipe.id, [])
 
         result.append(RecipeWithInputsOut(
             id=recipe.id,
@@ -170,21 +191,23 @@ def list_recipes(
 
 
 @router.get("/recipes/{recipe_id}", response_model=RecipeOut)
-def get_recipe_details(
+async def get_recipe_details(
     recipe_id: uuid.UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Get detailed recipe information with ingredients."""
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
+    recipe = await db.get(Recipe, recipe_id)
     if not recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
 
     # Get ingredients with item details
-    ingredients_data = db.query(RecipeIngredient, Item).join(
-        Item, RecipeIngredient.item_id == Item.id
-    ).filter(
-        RecipeIngredient.recipe_id == recipe.id
-    ).all()
+    ingredients_data = (await db.execute(
+        select(RecipeIngredient, Item).join(
+            Item, RecipeIngredient.item_id == Item.id
+        ).where(
+            RecipeIngredient.recipe_id == recipe.id
+        )
+    )).all()
 
     ingredients_out = [
         RecipeIngredientOut(
@@ -208,15 +231,17 @@ def get_recipe_details(
 
 
 @router.get("/recipes/search/{name}", response_model=list[RecipeListOut])
-def search_recipes_by_name(
+async def search_recipes_by_name(
     name: str,
     limit: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Search recipes by name (case-insensitive)."""
-    recipes = db.query(Recipe).filter(
-        Recipe.name.ilike(f"%{name}%")
-    ).order_by(Recipe.tier, Recipe.name).limit(limit).all()
+    recipes = (await db.scalars(
+        select(Recipe).where(
+            Recipe.name.ilike(f"%{name}%")
+        ).order_by(Recipe.tier, Recipe.name).limit(limit)
+    )).all()
 
     return [
         RecipeListOut(
@@ -235,7 +260,7 @@ def search_recipes_by_name(
 # =====================================================
 
 @router.get("/airports", response_model=list[AirportOut])
-def list_airports(
+async def list_airports(
     country: str | None = Query(None, description="Filter by ISO country code (FR, DE, US, etc.)"),
     type: str | None = Query(None, description="Filter by airport type (large_airport, medium_airport, small_airport, heliport, seaplane_base)"),
     min_lat: float | None = Query(None, description="Minimum latitude (bounding box)"),
@@ -243,18 +268,18 @@ def list_airports(
     min_lon: float | None = Query(None, description="Minimum longitude (bounding box)"),
     max_lon: float | None = Query(None, description="Maximum longitude (bounding box)"),
     limit: int = Query(2000, ge=1, le=10000, description="Max results"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     List airports from database.
     Returns airports with their coordinates for map display.
     Use bounding box params (min_lat, max_lat, min_lon, max_lon) for viewport filtering.
     """
-    query = db.query(Airport)
+    query = select(Airport)
 
     # Filter by bounding box (viewport)
     if min_lat is not None and max_lat is not None and min_lon is not None and max_lon is not None:
-        query = query.filter(
+        query = query.where(
             Airport.latitude_deg >= min_lat,
             Airport.latitude_deg <= max_lat,
             Airport.longitude_deg >= min_lon,
@@ -263,18 +288,17 @@ def list_airports(
 
     # Filter by country
     if country:
-        query = query.filter(Airport.iso_country == country)
+        query = query.where(Airport.iso_country == country)
 
     # Filter by type
     if type:
-        query = query.filter(Airport.type == type)
+        query = query.where(Airport.type == type)
 
     # Exclude closed airports
-    query = query.filter(Airport.type != 'closed')
+    query = query.where(Airport.type != 'closed')
 
     # Order by importance (large airports first, then medium, small, heliport, etc.)
     # Use CASE to define custom ordering
-    from sqlalchemy import case
     type_order = case(
         (Airport.type == 'large_airport', 1),
         (Airport.type == 'medium_airport', 2),
@@ -284,37 +308,41 @@ def list_airports(
         (Airport.type == 'balloonport', 6),
         else_=7
     )
-    airports = query.order_by(type_order, Airport.name).limit(limit).all()
+    airports = (await db.scalars(query.order_by(type_order, Airport.name).limit(limit))).all()
 
     return airports
 
 
 @router.get("/airports/closest", response_model=AirportOut)
-def get_closest_airport(
-    lat: float = Query(..., description="Current latitude"),
-    lon: float = Query(..., description="Current longitude"),
-    db: Session = Depends(get_db),
+async def get_closest_airport(
+    lat: float = Query(..., ge=-90, le=90, description="Current latitude"),
+    lon: float = Query(..., ge=-180, le=180, description="Current longitude"),
+    include_heliports: bool = Query(True, description="Include heliports"),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
-    Find the closest airport to given coordinates.
-    Uses simple Euclidean distance approximation (good enough for nearby airports).
+    Find the closest airport to given coordinates (great-circle distance).
+    Served from the in-memory airport index (queried in the threadpool: numpy);
+    falls back to the database if the index is not loaded yet.
     Used by EFB to detect player's current airport for mission system.
     """
-    # Simple distance calculation using Euclidean approximation
-    # For nearby airports this is accurate enough
-    from sqlalchemy import func as sqlfunc
-
-    # Calculate distance: sqrt((lat2-lat1)^2 + (lon2-lon1)^2)
-    # We use squared distance to avoid sqrt (faster, same ordering)
+    index = get_airport_index()
+    if index is not None:
+        nearest = await run_in_threadpool(index.nearest, lat, lon, k=1, include_heliports=include_heliports)
+        if not nearest:
+            raise HTTPException(status_code=404, detail="No airports found")
+        return nearest[0][0]
+
+    # Fallback: squared Euclidean distance in degrees (same ordering nearby)
     distance_sq = (
-        sqlfunc.power(Airport.latitude_deg - lat, 2) +
-        sqlfunc.power(Airport.longitude_deg - lon, 2)
+        func.power(Airport.latitude_deg - lat, 2) +
+        func.power(Airport.longitude_deg - lon, 2)
     )
 
-    # Find closest airport (excluding closed)
-    airport = db.query(Airport).filter(
-        Airport.type != 'closed'
-    ).order_by(distance_sq).first()
+    query = select(Airport).where(Airport.type != 'closed')
+    if not include_heliports:
+        query = query.where(Airport.type != 'heliport')
+    airport = await db.scalar(query.order_by(distance_sq).limit(1))
 
     if not airport:
         raise HTTPException(status_code=404, detail="No airports found")
@@ -322,12 +350,124 @@ def get_closest_airport(
     return airport
 
 
+@router.get("/airports/nearest", response_model=list[AirportNearestOut])
+def list_nearest_airports(
+    lat: float = Query(..., ge=-90, le=90, description="Current latitude"),
+    lon: float = Query(..., ge=-180, le=180, description="Current longitude"),
+    k: int = Query(10, ge=1, le=100, description="Number of airports"),
+    include_heliports: bool = Query(True, description="Include heliports"),
+    type: list[str] | None = Query(None, description="Only these airport types (repeatable)"),
+    max_distance_nm: float | None = Query(None, gt=0, description="Search radius (nm)"),
+):
+    """
+    K nearest airports to given coordinates, closest first, with distance in nm.
+    Closed airports are never returned.
+    """
+    index = get_airport_index()
+    if index is None:
+        raise HTTPException(status_code=503, detail="Airport index not loaded")
+
+    nearest = index.nearest(
+        lat,
+        lon,
+        k=k,
+        include_heliports=include_heliports,
+        types=set(type) if type else None,
+        max_distance_nm=max_distance_nm,
+    )
+
+    return [
+        AirportNearestOut(
+            **AirportOut.model_validate(airport).model_dump(),
+            distance_nm=round(distance, 2),
+        )
+        for airport, distance in nearest
+    ]
+
+
+@router.get("/distance", response_model=list[AirportDistanceOut])
+def get_airport_distance(
+    origin: str = Query(..., min_length=2, max_length=8, description="Origin airport ident"),
+    destination: list[str] = Query(..., description="Destination airport ident(s) (repeatable)"),
+):
+    """
+    Great-circle distance (nm) from one airport to one or more airports.
+    Served from the in-memory airport index (no database query).
+    """
+    index = get_airport_index()
+    if index is None:
+        raise HTTPException(status_code=503, detail="Airport index not loaded")
+    if len(destination) > 500:
+        raise HTTPException(status_code=400, detail="Too many destinations (max 500)")
+
+    origin = origin.upper()
+    destinations = [d.upper() for d in destination]
+    unknown = [ident for ident in [origin, *destinations] if index.get(ident) is None]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Unknown airport(s): {', '.join(dict.fromkeys(unknown))}")
+
+    distances = index.distance_matrix((origin,), destinations)[0]
+    return [
+        AirportDistanceOut(origin=origin, destination=dest, distance_nm=round(float(distance), 2))
+        for dest, distance in zip(destinations, distances)
+    ]
+
+
+@router.post("/distance/batch", response_model=AirportDistanceMatrixOut)
+def get_airport_distance_matrix(payload: AirportDistanceMatrixIn):
+    """
+    Many-to-many great-circle distances (nm) for route planning.
+    Unknown (or closed) airports get null distances and are listed in `unknown`.
+    """
+    index = get_airport_index()
+    if index is None:
+        raise HTTPException(status_code=503, detail="Airport index not loaded")
+
+    origins = [o.upper() for o in payload.origins]
+    destinations = [d.upper() for d in payload.destinations]
+    matrix = index.distance_matrix(origins, destinations).round(2)
+
+    return AirportDistanceMatrixOut(
+        origins=origins,
+        destinations=destinations,
+        distances_nm=[[None if math.isnan(d) else d for d in row] for row in matrix.tolist()],
+        unknown=list(dict.fromkeys(i for i in [*origins, *destinations] if index.get(i) is None)),
+    )
+
+
+@router.get("/tiles/{z}/{x}/{y}")
+def get_airport_tile(
+    z: int,
+    x: int,
+    y: int,
+    if_none_match: str | None = Header(None),
+):
+    """
+    Airport map tile (Web Mercator z/x/y).
+    Below zoom 10 airports are aggregated into clusters (count, centroid,
+    counts by type, most important airport); from zoom 10 every airport is listed.
+    Tiles are cached in memory and served with an ETag (304 if unchanged).
+    """
+    if not 0 <= z <= MAX_ZOOM or not 0 <= x < (1 << z) or not 0 <= y < (1 << z):
+        raise HTTPException(status_code=404, detail="Tile out of range")
+
+    tiles = get_tile_set()
+    if tiles is None:
+        raise HTTPException(status_code=503, detail="Airport index not loaded")
+
+    body, etag = tiles.get(z, x, y)
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=3600"}
+    if if_none_match == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 @router.get("/airports/slots", response_model=list[AirportSlotOut])
-def list_airport_slots(
+async def list_airport_slots(
     airport_ident: str | None = Query(None, description="Filter by airport ICAO code"),
     has_slots: bool = Query(True, description="Show only airports with available slots"),
     limit: int = Query(50, ge=1, le=200),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     List airports with factory slot information.
@@ -345,9 +485,9 @@ def list_airport_slots(
     # Mock response for now
     if airport_ident:
         # Get occupied slots for specific airport
-        occupied = db.query(func.count(Factory.id)).filter(
-            Factory.airport_ident == airport_ident
-        ).scalar() or 0
+        occupied = await db.scalar(
+            select(func.count(Factory.id)).where(Factory.airport_ident == airport_ident)
+        ) or 0
 
         return [
             AirportSlotOut(
@@ -365,16 +505,16 @@ def list_airport_slots(
 
 
 @router.get("/airports/{airport_ident}/available-slots", response_model=dict)
-def get_airport_available_slots(
+async def get_airport_available_slots(
     airport_ident: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Get available factory slots for a specific airport.
     Max slots based on airport type: large=12, medium=6, small=3, heliport=1
     """
     # Get airport to determine type
-    airport = db.query(Airport).filter(Airport.ident == airport_ident).first()
+    airport = await db.scalar(select(Airport).where(Airport.ident == airport_ident).limit(1))
 
     # Determine max slots based on airport type
     if airport and airport.max_factories_slots:
@@ -396,10 +536,12 @@ def get_airport_available_slots(
         max_slots = 3  # Default if airport not found
 
     # Count occupied slots (number of factories at this airport)
-    occupied_count = db.query(Factory).filter(
-        Factory.airport_ident == airport_ident,
-        Factory.is_active == True
-    ).count()
+    occupied_count = await db.scalar(
+        select(func.count(Factory.id)).where(
+            Factory.airport_ident == airport_ident,
+            Factory.is_active == True
+        )
+    )
 
     return {
         "airport_ident": airport_ident,
@@ -414,7 +556,43 @@ def get_airport_available_slots(
 # FACTORIES (Public map view)
 # =====================================================
 
-# T0 factory name to product/type mapping for map icons (product, type, name, icon)
+FACTORY_MAP_CACHE_TTL_SECONDS = 30
+_factory_map_cache = TTLCache(maxsize=512, ttl_seconds=FACTORY_MAP_CACHE_TTL_SECONDS)
+
+# T0 output item name -> map display (product, type, name, icon)
+# Used with factories.output_item_id (resolved once, see production_service)
+T0_ITEM_DISPLAY = {
+    "Raw Wheat": ("wheat", "food", "Blé", "🌾"),
+    "Raw Meat": ("meat", "food", "Viande", "🥩"),
+    "Raw Milk": ("milk", "food", "Lait", "🥛"),
+    "Raw Fruits": ("fruits", "food", "Fruits", "🍎"),
+    "Raw Vegetables": ("vegetables", "food", "Légumes", "🥬"),
+    "Raw Fish": ("fish", "food", "Poisson", "🐟"),
+    "Water": ("water", "food", "Eau", "💧"),
+    "Raw Salt": ("salt", "food", "Sel", "🧂"),
+    "Raw Sugar": ("sugar", "food", "Sucre", "🍬"),
+    "Crude Oil": ("crude_oil", "fuel", "Pétrole Brut", "🛢️"),
+    "Natural Gas": ("natural_gas", "fuel", "Gaz Naturel", "💨"),
+    "Biomass": ("biomass", "fuel", "Biocarburant", "🌱"),
+    "Iron Ore": ("iron_ore", "mineral", "Minerai de Fer", "⛏️"),
+    "Coal": ("coal", "mineral", "Charbon", "⚫"),
+    "Raw Stone": ("stone", "mineral", "Pierre", "🪨"),
+    "Limestone": ("stone", "mineral", "Calcaire", "🪨"),
+    "Granite": ("stone", "mineral", "Granite", "🪨"),
+    "Raw Wood": ("wood", "construction", "Bois", "🪵"),
+}
+
+
+def _get_t0_item_display(item_name: str, item_icon: str | None) -> tuple[str, str, str, str]:
+    """Map display for a T0 output item. Returns (product, type, name, icon)."""
+    display = T0_ITEM_DISPLAY.get(item_name)
+    if display:
+        return display
+    return (item_name.lower().replace(" ", "_"), "raw", item_name, item_icon or "📦")
+
+
+# Legacy: T0 factory name to product/type mapping for map icons (product, type, name, icon)
+# Only used for T0 factories whose output_item_id is not resolved yet
 T0_FACTORY_PRODUCTS = {
     # Food - Cereals
     "Exploitation Céréalière Beauce": ("wheat", "food", "Blé", "🌾"),
@@ -458,6 +636,7 @@ T0_FACTORY_PRODUCTS = {
 }
 
 
+@lru_cache(maxsize=4096)
 def _get_t0_product_info(factory_name: str) -> tuple[str, str, str, str]:
     """Get product info for T0 factory based on name. Returns (product, type, name, icon)."""
     if factory_name in T0_FACTORY_PRODUCTS:
@@ -499,7 +678,7 @@ def _get_t0_product_info(factory_name: str) -> tuple[str, str, str, str]:
 
 
 @router.get("/factories")
-def list_factories_for_map(
+async def list_factories_for_map(
     country: str | None = Query(None, description="Filter by country (uses airport's iso_country)"),
     tier: int | None = Query(None, ge=0, le=5, description="Filter by tier (0=NPC, 1-5=player)"),
     min_lat: float | None = Query(None, description="Minimum latitude (bounding box)"),
@@ -507,69 +686,92 @@ def list_factories_for_map(
     min_lon: float | None = Query(None, description="Minimum longitude (bounding box)"),
     max_lon: float | None = Query(None, description="Maximum longitude (bounding box)"),
     limit: int = Query(500, ge=1, le=2000, description="Max results"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     List all factories for map display.
     Returns factories with airport coordinates for map markers.
     Includes both T0 (NPC) and player-owned factories.
+    One joined query (factory, airport, company, recipe output item) whatever
+    the result size; responses are cached for FACTORY_MAP_CACHE_TTL_SECONDS.
     """
+    has_bbox = min_lat is not None and max_lat is not None and min_lon is not None and max_lon is not None
+    cache_key = (country, tier, (min_lat, max_lat, min_lon, max_lon) if has_bbox else None, limit)
+    cached = _factory_map_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     from app.models.company import Company
 
-    # Join factories with airports to get coordinates
-    query = db.query(Factory, Airport).join(
+    OutputItem = aliased(Item)
+    T0Item = aliased(Item)
+
+    # Join factories with airports (coordinates), companies (name),
+    # the current recipe's output item (player factory icon)
+    # and the T0 output item (NPC factory product)
+    query = select(
+        Factory,
+        Airport.name.label("airport_name"),
+        Airport.latitude_deg,
+        Airport.longitude_deg,
+        Company.name.label("company_name"),
+        OutputItem.name.label("output_item_name"),
+        OutputItem.icon.label("output_item_icon"),
+        T0Item.name.label("t0_item_name"),
+        T0Item.icon.label("t0_item_icon"),
+    ).join(
         Airport, Factory.airport_ident == Airport.ident
-    ).filter(Factory.is_active == True)
+    ).outerjoin(
+        Company, Company.id == Factory.company_id
+    ).outerjoin(
+        Recipe, Recipe.id == Factory.current_recipe_id
+    ).outerjoin(
+        OutputItem, OutputItem.id == Recipe.result_item_id
+    ).outerjoin(
+        T0Item, T0Item.id == Factory.output_item_id
+    ).where(Factory.is_active == True)
 
     # Filter by tier
     if tier is not None:
-        query = query.filter(Factory.tier == tier)
+        query = query.where(Factory.tier == tier)
 
     # Filter by country (via airport)
     if country:
-        query = query.filter(Airport.iso_country == country)
+        query = query.where(Airport.iso_country == country)
 
     # Filter by bounding box
-    if min_lat is not None and max_lat is not None and min_lon is not None and max_lon is not None:
-        query = query.filter(
+    if has_bbox:
+        query = query.where(
             Airport.latitude_deg >= min_lat,
             Airport.latitude_deg <= max_lat,
             Airport.longitude_deg >= min_lon,
             Airport.longitude_deg <= max_lon
         )
 
-    results = query.limit(limit).all()
+    results = (await db.execute(query.limit(limit))).all()
 
     factories_out = []
-    for factory, airport in results:
-        # Get company name
-        company = db.query(Company).filter(Company.id == factory.company_id).first()
-        company_name = company.name if company else "Unknown"
-
+    for (
+        factory, airport_name, latitude, longitude, company_name,
+        output_name, output_icon, t0_item_name, t0_item_icon,
+    ) in results:
         # Get product info for T0 factories (with icon)
-        if factory.tier == 0:
+        if factory.tier == 0 and t0_item_name:
+            product, prod_type, product_name, icon = _get_t0_item_display(t0_item_name, t0_item_icon)
+        elif factory.tier == 0:
             product, prod_type, product_name, icon = _get_t0_product_info(factory.name)
         else:
-            # For player factories, look up recipe's output item icon
-            icon = "🏭"  # Default factory icon
+            # For player factories, use the current recipe's output item icon
             product = None
             prod_type = factory.factory_type or "production"
-            product_name = None
-
-            # If factory has a current recipe, get output item icon
-            if factory.current_recipe_id:
-                recipe = db.query(Recipe).filter(Recipe.id == factory.current_recipe_id).first()
-                if recipe and recipe.result_item_id:
-                    output_item = db.query(Item).filter(Item.id == recipe.result_item_id).first()
-                    if output_item:
-                        icon = output_item.icon or "🏭"
-                        product_name = output_item.name
+            product_name = output_name
+            icon = output_icon or "🏭"
 
         factories_out.append({
             "id": str(factory.id),
             "name": factory.name,
             "airport_ident": factory.airport_ident,
-            "airport_name": airport.name,
+            "airport_name": airport_name,
             "tier": factory.tier,
             "type": prod_type,  # For frontend compatibility
             "product": product,
@@ -578,11 +780,12 @@ def list_factories_for_map(
             "factory_type": factory.factory_type,
             "status": factory.status,
             "company_id": str(factory.company_id),
-            "company_name": company_name,
-            "latitude": airport.latitude_deg,
-            "longitude": airport.longitude_deg,
+            "company_name": company_name or "Unknown",
+            "latitude": latitude,
+            "longitude": longitude,
         })
 
+    _factory_map_cache.set(cache_key, factories_out)
     return factories_out
 
 
@@ -591,22 +794,24 @@ def list_factories_for_map(
 # =====================================================
 
 @router.get("/stats/items", response_model=dict)
-def get_item_statistics(db: Session = Depends(get_db)):
+async def get_item_statistics(db: AsyncSession = Depends(get_async_db)):
     """Get item statistics (count by tier, category, etc.)."""
     # Count by tier
-    tier_counts = db.query(
-        Item.tier,
-        func.count(Item.id).label("count")
-    ).group_by(Item.tier).order_by(Item.tier).all()
+    tier_counts = (await db.execute(
+        select(
+            Item.tier,
+            func.count(Item.id).label("count")
+        ).group_by(Item.tier).order_by(Item.tier)
+    )).all()
 
     # Count raw vs processed
-    raw_count = db.query(func.count(Item.id)).filter(
-        Item.is_raw == True
-    ).scalar() or 0
+    raw_count = await db.scalar(
+        select(func.count(Item.id)).where(Item.is_raw == True)
+    ) or 0
 
-    processed_count = db.query(func.count(Item.id)).filter(
-        Item.is_raw == False
-    ).scalar() or 0
+    processed_count = await db.scalar(
+        select(func.count(Item.id)).where(Item.is_raw == False)
+    ) or 0
 
     return {
         "total_items": raw_count + processed_count,
@@ -619,21 +824,20 @@ def get_item_statistics(db: Session = Depends(get_db)):
 
 
 @router.get("/stats/recipes", response_model=dict)
-def get_recipe_statistics(db: Session = Depends(get_db)):
+async def get_recipe_statistics(db: AsyncSession = Depends(get_async_db)):
     """Get recipe statistics (count by tier, avg duration, etc.)."""
-    # Count by tier
-    tier_counts = db.query(
-        Recipe.tier,
-        func.count(Recipe.id).label("count")
-    ).group_by(Recipe.tier).order_by(Recipe.tier).all()
-
-    # Average duration by tier
-    avg_durations = db.query(
-        Recipe.tier,
-        func.avg(Recipe.production_time_hours).label("avg_duration")
-    ).group_by(Recipe.tier).order_by(Recipe.tier).all()
-
-    total_recipes = db.query(func.count(Recipe.id)).scalar() or 0
+    # Count and average duration by tier
+    tier_stats = (await db.execute(
+        select(
+            Recipe.tier,
+            func.count(Recipe.id).label("count"),
+            func.avg(Recipe.production_time_hours).label("avg_duration")
+        ).group_by(Recipe.tier).order_by(Recipe.tier)
+    )).all()
+    tier_counts = [(tier, count) for tier, count, _ in tier_stats]
+    avg_durations = [(tier, avg_dur) for tier, _, avg_dur in tier_stats]
+
+    total_recipes = sum(count for _, count in tier_counts)
 
     return {
         "total_recipes": total_recipes,
@@ -0,0 +1,23 @@
+"""
+V0.9 Admin - Pydantic Schemas
+"""
+from datetime import datetime
+from typing import Any
+
+from pydantic import BaseModel
+
+
+class JobMetricsOut(BaseModel):
+    """Snapshot des métriques d'un job du scheduler (écrit par le worker leader)."""
+    job_id: str
+    updated_at: datetime
+    metrics: dict[str, Any]
+
+    class Config:
+        from_attributes = True
+
+
+class PoolMetricsOut(BaseModel):
+    """Usage des pools de connexions du process API qui répond."""
+    process: str
+    pools: dict[str, dict[str, Any]]
@@ -410,6 +410,32 @@ class AirportOut(BaseModel):
         from_attributes = True
 
 
+class AirportNearestOut(AirportOut):
+    """Airport with great-circle distance from the query point."""
+    distance_nm: float
+
+
+class AirportDistanceOut(BaseModel):
+    """Great-circle distance between two airports."""
+    origin: str
+    destination: str
+    distance_nm: float
+
+
+class AirportDistanceMatrixIn(BaseModel):
+    """Many-to-many distance request (airport idents)."""
+    origins: list[str] = Field(..., min_length=1, max_length=500)
+    destinations: list[str] = Field(..., min_length=1, max_length=500)
+
+
+class AirportDistanceMatrixOut(BaseModel):
+    """distances_nm[i][j] = origins[i] -> destinations[j] (null if unknown airport)."""
+    origins: list[str]
+    destinations: list[str]
+    distances_nm: list[list[float | None]]
+    unknown: list[str]
+
+
 class FactoryStatsOut(BaseModel):
     """Factory statistics for dashboard."""
     total_factories: int
@@ -70,6 +70,8 @@ class AircraftOut(BaseModel):
     condition: float
     hours: float
     cargo_capacity_kg: int = 500
+    current_cargo_kg: Decimal = Decimal("0")
+    current_pax: int = 0
     current_airport_ident: Optional[str] = None
     purchase_price: Optional[Decimal] = None
     is_active: bool = True
@@ -81,7 +83,6 @@ class AircraftOut(BaseModel):
 
 class AircraftDetailOut(AircraftOut):
     """Detailed aircraft info with cargo summary"""
-    current_cargo_kg: Decimal = Decimal("0")
     current_cargo_items: int = 0
     cargo_utilization_percent: float = 0.0
 
@@ -97,6 +98,7 @@ class FleetStatsOut(BaseModel):
     in_flight_count: int
     maintenance_count: int
     total_cargo_capacity_kg: int
+    total_cargo_kg: Decimal = Decimal("0")
     categories: dict[str, int]  # {"turboprop": 3, "jet_medium": 1}
 
 
@@ -140,6 +142,19 @@ class UnloadCargoIn(BaseModel):
     qty: int = Field(..., ge=1)
 
 
+class CargoManifestLineIn(BaseModel):
+    """Manifest line: load from / unload to a ground location"""
+    action: str = Field(..., pattern="^(load|unload)$")
+    location_id: UUID
+    item_id: UUID
+    qty: int = Field(..., ge=1)
+
+
+class CargoManifestIn(BaseModel):
+    """Bulk load/unload, applied in order in a single transaction"""
+    lines: list[CargoManifestLineIn] = Field(..., min_length=1, max_length=200)
+
+
 class AircraftLocationUpdateIn(BaseModel):
     """Update aircraft location after flight"""
     airport_ident: str = Field(..., min_length=2, max_length=8)
@@ -157,6 +172,8 @@ class FleetAvailableOut(BaseModel):
     aircraft_model: Optional[str] = None  # ICAO type code (C185, C208, etc.)
     current_icao: Optional[str] = None
     cargo_capacity_kg: int
+    current_cargo_kg: Decimal = Decimal("0")
+    current_pax: int = 0
     status: str
 
     class Config:
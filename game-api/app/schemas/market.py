@@ -26,6 +26,7 @@ class TransactionOut(BaseModel):
 class MarketOrderCreateIn(BaseModel):
     side: str = Field(pattern="^(buy|sell)$")
     item_code: str = Field(min_length=2, max_length=64)
+    airport_ident: str = Field(min_length=3, max_length=8)
     quantity: int = Field(gt=0)
     unit_price: float = Field(ge=0)
 
@@ -37,7 +38,9 @@ class MarketOrderOut(BaseModel):
     company_id: UUID
     side: str
     item_code: str
+    airport_ident: str | None = None
     quantity: int
+    filled_quantity: int = 0
     unit_price: float
     status: str
     created_at: datetime
@@ -0,0 +1,278 @@
+"""
+Airport spatial index - in-process nearest-neighbour engine
+- KD-tree over unit-sphere (x, y, z) coordinates, built once at startup
+- Great-circle distances in nautical miles
+- Type filters (closed always excluded, heliports optional) and k-nearest queries
+- Vectorized distances by ident (one-to-one, one-to-many, many-to-many), no DB query
+"""
+import heapq
+import logging
+import threading
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models.airport import Airport
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_NM = 3440.065  # Same radius as missions._haversine_distance_nm
+LEAF_SIZE = 32  # Points per KD-tree leaf (scanned with numpy)
+
+# Types kept in the index ('closed' is never indexed)
+AIRPORT_TYPES = (
+    "large_airport",
+    "medium_airport",
+    "small_airport",
+    "seaplane_base",
+    "heliport",
+    "balloonport",
+)
+
+
+@dataclass(frozen=True)
+class IndexedAirport:
+    """Airport row as held in memory (attribute-compatible with AirportOut)."""
+    ident: str
+    name: str | None
+    type: str | None
+    latitude_deg: float
+    longitude_deg: float
+    iso_country: str | None
+    municipality: str | None
+    iata_code: str | None
+    max_factories_slots: int | None
+
+
+def to_unit_vectors(lat_deg, lon_deg) -> np.ndarray:
+    """Convert lat/lon (degrees, scalars or arrays) to unit-sphere xyz."""
+    lat = np.radians(np.asarray(lat_deg, dtype=np.float64))
+    lon = np.radians(np.asarray(lon_deg, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)), axis=-1)
+
+
+def chord_sq_to_nm(chord_sq):
+    """Squared chord length on the unit sphere -> great-circle distance (nm)."""
+    half_chord = np.sqrt(np.clip(chord_sq, 0.0, 4.0)) / 2
+    return 2 * np.arcsin(np.minimum(half_chord, 1.0)) * EARTH_RADIUS_NM
+
+
+def haversine_nm(lat1, lon1, lat2, lon2):
+    """Haversine distance (nm) between points in radians; numpy arrays broadcast."""
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a)) * EARTH_RADIUS_NM
+
+
+class AirportIndex:
+    """
+    Static KD-tree over airports.
+
+    Nodes are stored in flat lists (split axis, split value, children, leaf range)
+    and points are reordered so each leaf is a contiguous slice of `self.xyz`.
+    The chord distance on the unit sphere is monotonic with the great-circle
+    distance, so the tree is searched in 3D euclidean space.
+    """
+
+    def __init__(self, airports: list[IndexedAirport]):
+        self.size = len(airports)
+        xyz = to_unit_vectors(
+            [a.latitude_deg for a in airports],
+            [a.longitude_deg for a in airports],
+        ).reshape(-1, 3)
+        type_codes = np.array(
+            [AIRPORT_TYPES.index(a.type) if a.type in AIRPORT_TYPES else len(AIRPORT_TYPES) for a in airports],
+            dtype=np.int8,
+        )
+
+        # Flat node storage
+        self._axis: list[int] = []
+        self._split: list[float] = []
+        self._left: list[int] = []
+        self._right: list[int] = []
+        self._start: list[int] = []
+        self._end: list[int] = []
+
+        order = np.arange(self.size)
+        if self.size:
+            self._build(xyz, order, 0, self.size)
+
+        self.xyz = xyz[order]
+        self.type_codes = type_codes[order]
+        self.airports = [airports[i] for i in order]
+        # Radians, same order as self.xyz (vectorized haversine)
+        self.lat_rad = np.radians(np.array([a.latitude_deg for a in self.airports], dtype=np.float64))
+        self.lon_rad = np.radians(np.array([a.longitude_deg for a in self.airports], dtype=np.float64))
+        self._by_ident = {a.ident: i for i, a in enumerate(self.airports)}
+
+    def _build(self, xyz: np.ndarray, order: np.ndarray, start: int, end: int) -> int:
+        node = len(self._axis)
+        self._axis.append(-1)
+        self._split.append(0.0)
+        self._left.append(-1)
+        self._right.append(-1)
+        self._start.append(start)
+        self._end.append(end)
+
+        if end - start <= LEAF_SIZE:
+            return node
+
+        pts = xyz[order[start:end]]
+        axis = int(np.argmax(pts.max(axis=0) - pts.min(axis=0)))
+        mid = (end - start) // 2
+        part = np.argpartition(pts[:, axis], mid)
+        order[start:end] = order[start:end][part]
+
+        self._axis[node] = axis
+        self._split[node] = float(xyz[order[start + mid], axis])
+        self._left[node] = self._build(xyz, order, start, start + mid)
+        self._right[node] = self._build(xyz, order, start + mid, end)
+        return node
+
+    def _allowed_mask(self, include_heliports: bool, types: set[str] | None) -> np.ndarray:
+        allowed = np.zeros(len(AIRPORT_TYPES) + 1, dtype=bool)
+        for code, airport_type in enumerate(AIRPORT_TYPES):
+            if types is not None and airport_type not in types:
+                continue
+            if airport_type == "heliport" and not include_heliports:
+                continue
+            allowed[code] = True
+        if types is None:
+            allowed[len(AIRPORT_TYPES)] = True  # Unknown/NULL types
+        return allowed
+
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        k: int = 1,
+        include_heliports: bool = True,
+        types: set[str] | None = None,
+        max_distance_nm: float | None = None,
+    ) -> list[tuple[IndexedAirport, float]]:
+        """Return up to k (airport, distance_nm) pairs, closest first."""
+        if not self.size or k <= 0:
+            return []
+
+        allowed = self._allowed_mask(include_heliports, types)
+        q = to_unit_vectors(lat, lon)
+
+        bound = np.inf
+        if max_distance_nm is not None:
+            bound = (2 * np.sin(min(max_distance_nm / EARTH_RADIUS_NM, np.pi) / 2)) ** 2
+
+        # Max-heap of the k best candidates: (-dist_sq, idx)
+        best: list[tuple[float, int]] = []
+        stack = [(0, 0.0)]  # (node, lower bound on dist_sq)
+        while stack:
+            node, min_sq = stack.pop()
+            worst = -best[0][0] if len(best) == k else bound
+            if min_sq > worst:
+                continue
+
+            axis = self._axis[node]
+            if axis < 0:
+                start, end = self._start[node], self._end[node]
+                d = self.xyz[start:end] - q
+                dist_sq = np.einsum("ij,ij->i", d, d)
+                ok = allowed[self.type_codes[start:end]] & (dist_sq <= worst)
+                for i in np.flatnonzero(ok):
+                    entry = (-float(dist_sq[i]), start + int(i))
+                    if len(best) < k:
+                        heapq.heappush(best, entry)
+                    elif entry > best[0]:
+                        heapq.heapreplace(best, entry)
+                continue
+
+            diff = float(q[axis]) - self._split[node]
+            near, far = (self._left[node], self._right[node]) if diff < 0 else (self._right[node], self._left[node])
+            # Push far side first so the near side is explored first
+            stack.append((far, max(min_sq, diff * diff)))
+            stack.append((near, min_sq))
+
+        best.sort(reverse=True)
+        return [(self.airports[idx], float(chord_sq_to_nm(-neg_sq))) for neg_sq, idx in best]
+
+    def get(self, ident: str) -> IndexedAirport | None:
+        idx = self._by_ident.get(ident)
+        return self.airports[idx] if idx is not None else None
+
+    def positions(self, idents: Sequence[str]) -> np.ndarray:
+        """Row of each ident in `self.xyz` (-1 if not indexed)."""
+        return np.fromiter((self._by_ident.get(i, -1) for i in idents), dtype=np.int64, count=len(idents))
+
+    def distance_matrix(self, origins: Sequence[str], destinations: Sequence[str]) -> np.ndarray:
+        """
+        Great-circle distances (nm), shape (len(origins), len(destinations)).
+        NaN where either ident is not indexed (unknown or closed).
+        """
+        dist = np.full((len(origins), len(destinations)), np.nan)
+        if not self.size:
+            return dist
+
+        o, d = self.positions(origins), self.positions(destinations)
+        o_ok, d_ok = o >= 0, d >= 0
+        dist[np.ix_(o_ok, d_ok)] = haversine_nm(
+            self.lat_rad[o[o_ok]][:, None], self.lon_rad[o[o_ok]][:, None],
+            self.lat_rad[d[d_ok]][None, :], self.lon_rad[d[d_ok]][None, :],
+        )
+        return dist
+
+    def distance_nm(self, origin: str, destination: str) -> float | None:
+        """Great-circle distance between two airports (nm), None if either is not indexed."""
+        distance = self.distance_matrix((origin,), (destination,))[0, 0]
+        return None if np.isnan(distance) else float(distance)
+
+
+_index: AirportIndex | None = None
+_lock = threading.Lock()
+
+
+def load_airport_index(db: Session) -> AirportIndex:
+    """(Re)build the airport index from public.airports and install it."""
+    global _index
+
+    rows = db.query(
+        Airport.ident,
+        Airport.name,
+        Airport.type,
+        Airport.latitude_deg,
+        Airport.longitude_deg,
+        Airport.iso_country,
+        Airport.municipality,
+        Airport.iata_code,
+        Airport.max_factories_slots,
+    ).filter(
+        Airport.type != "closed",
+        Airport.ident.isnot(None),
+        Airport.latitude_deg.isnot(None),
+        Airport.longitude_deg.isnot(None),
+    ).all()
+
+    airports = [
+        IndexedAirport(
+            ident=r.ident,
+            name=r.name,
+            type=r.type,
+            latitude_deg=float(r.latitude_deg),
+            longitude_deg=float(r.longitude_deg),
+            iso_country=r.iso_country,
+            municipality=r.municipality,
+            iata_code=r.iata_code,
+            max_factories_slots=r.max_factories_slots,
+        )
+        for r in rows
+    ]
+
+    index = AirportIndex(airports)
+    with _lock:
+        _index = index
+    logger.info(f"[AirportIndex] {index.size} airports indexed")
+    return index
+
+
+def get_airport_index() -> AirportIndex | None:
+    """Current index, or None if it has not been loaded (yet)."""
+    return _index
@@ -0,0 +1,183 @@
+"""
+Airport map tiles - zoom-aware airport layer for the webmap
+- Web Mercator (slippy map) tiles: /world/tiles/{z}/{x}/{y}
+- Low zoom: airports aggregated into grid clusters (count, centroid, top airport)
+- High zoom: individual airports
+- Built from the in-memory airport index, serialized once and cached with an ETag
+"""
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from app.services.airport_index import AIRPORT_TYPES, AirportIndex, get_airport_index
+
+logger = logging.getLogger(__name__)
+
+MAX_ZOOM = 18
+INDIVIDUAL_ZOOM = 10  # From this zoom, tiles list every airport (webmap declusters small airports at 10)
+CLUSTER_GRID = 8  # Clusters per tile side below INDIVIDUAL_ZOOM
+PRECOMPUTE_MAX_ZOOM = 4  # Tiles precomputed when the tile set is built (341 tiles)
+TILE_CACHE_SIZE = 4096  # Lazily built tiles kept in memory (LRU)
+MAX_MERCATOR_LAT = 85.05112878
+
+# Display priority (large airports first), same ordering as list_airports
+TYPE_RANK = np.array(list(range(len(AIRPORT_TYPES))) + [len(AIRPORT_TYPES)], dtype=np.int16)
+
+
+class TileSet:
+    """Tiles for one airport index snapshot."""
+
+    def __init__(self, index: AirportIndex):
+        self.index = index
+        airports = index.airports
+
+        lat = np.clip(np.array([a.latitude_deg for a in airports], dtype=np.float64), -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT)
+        lon = np.array([a.longitude_deg for a in airports], dtype=np.float64)
+        self.lat = lat
+        self.lon = lon
+        # Normalized mercator coordinates in [0, 1)
+        self.mx = np.clip((lon + 180.0) / 360.0, 0.0, np.nextafter(1.0, 0.0))
+        lat_rad = np.radians(lat)
+        my = (1.0 - np.log(np.tan(lat_rad) + 1.0 / np.cos(lat_rad)) / np.pi) / 2.0
+        self.my = np.clip(my, 0.0, np.nextafter(1.0, 0.0))
+        self.type_codes = index.type_codes
+        self.rank = TYPE_RANK[index.type_codes]
+
+        self._cache: OrderedDict[tuple[int, int, int], tuple[bytes, str]] = OrderedDict()
+        self._pinned: dict[tuple[int, int, int], tuple[bytes, str]] = {}
+        self._lock = threading.Lock()
+
+    def precompute(self, max_zoom: int = PRECOMPUTE_MAX_ZOOM):
+        """Build every tile up to max_zoom (kept outside the LRU)."""
+        for z in range(max_zoom + 1):
+            n = 1 << z
+            for x in range(n):
+                for y in range(n):
+                    self._pinned[(z, x, y)] = self._render(z, x, y)
+
+    def get(self, z: int, x: int, y: int) -> tuple[bytes, str]:
+        """Return (json body, etag) for a tile."""
+        key = (z, x, y)
+        tile = self._pinned.get(key)
+        if tile is not None:
+            return tile
+
+        with self._lock:
+            tile = self._cache.get(key)
+            if tile is not None:
+                self._cache.move_to_end(key)
+                return tile
+
+        tile = self._render(z, x, y)
+        with self._lock:
+            self._cache[key] = tile
+            if len(self._cache) > TILE_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return tile
+
+    def _render(self, z: int, x: int, y: int) -> tuple[bytes, str]:
+        n = 1 << z
+        tx = self.mx * n
+        ty = self.my * n
+        members = np.flatnonzero((tx >= x) & (tx < x + 1) & (ty >= y) & (ty < y + 1))
+
+        if z >= INDIVIDUAL_ZOOM:
+            order = members[np.lexsort((members, self.rank[members]))]
+            payload = {
+                "z": z, "x": x, "y": y,
+                "clusters": [],
+                "airports": [self._airport_out(i) for i in order],
+            }
+        else:
+            payload = {"z": z, "x": x, "y": y, **self._clusters(members, tx, ty, x, y)}
+
+        body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode()
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        return body, etag
+
+    def _clusters(self, members: np.ndarray, tx: np.ndarray, ty: np.ndarray, x: int, y: int) -> dict:
+        if members.size == 0:
+            return {"clusters": [], "airports": []}
+
+        cx = np.minimum(((tx[members] - x) * CLUSTER_GRID).astype(np.int32), CLUSTER_GRID - 1)
+        cy = np.minimum(((ty[members] - y) * CLUSTER_GRID).astype(np.int32), CLUSTER_GRID - 1)
+        cell_ids, cell = np.unique(cy * CLUSTER_GRID + cx, return_inverse=True)
+        n_cells = cell_ids.size
+
+        counts = np.bincount(cell, minlength=n_cells)
+        lat_mean = np.bincount(cell, weights=self.lat[members], minlength=n_cells) / counts
+        lon_mean = np.bincount(cell, weights=self.lon[members], minlength=n_cells) / counts
+
+        n_types = len(AIRPORT_TYPES) + 1
+        by_type = np.bincount(
+            cell * n_types + self.type_codes[members], minlength=n_cells * n_types
+        ).reshape(n_cells, n_types)
+
+        # Most important airport per cell: lowest rank, first in cell after sort
+        order = np.lexsort((members, self.rank[members], cell))
+        first = np.flatnonzero(np.r_[True, cell[order][1:] != cell[order][:-1]])
+        top = members[order[first]]
+
+        clusters = []
+        singles = []
+        for c in range(n_cells):
+            if counts[c] == 1:
+                singles.append(self._airport_out(int(top[c])))
+                continue
+            top_airport = self.index.airports[int(top[c])]
+            clusters.append({
+                "lat": round(float(lat_mean[c]), 5),
+                "lon": round(float(lon_mean[c]), 5),
+                "count": int(counts[c]),
+                "by_type": {
+                    (AIRPORT_TYPES[t] if t < len(AIRPORT_TYPES) else "other"): int(by_type[c, t])
+                    for t in np.flatnonzero(by_type[c])
+                },
+                "top": {
+                    "ident": top_airport.ident,
+                    "name": top_airport.name,
+                    "type": top_airport.type,
+                },
+            })
+        return {"clusters": clusters, "airports": singles}
+
+    def _airport_out(self, i: int) -> dict:
+        a = self.index.airports[i]
+        return {
+            "ident": a.ident,
+            "name": a.name,
+            "type": a.type,
+            "lat": a.latitude_deg,
+            "lon": a.longitude_deg,
+            "iso_country": a.iso_country,
+            "iata_code": a.iata_code,
+        }
+
+
+_tiles: TileSet | None = None
+_tiles_lock = threading.Lock()
+
+
+def get_tile_set() -> TileSet | None:
+    """Tile set for the current airport index (rebuilt when the index is reloaded)."""
+    global _tiles
+
+    index = get_airport_index()
+    if index is None:
+        return None
+
+    tiles = _tiles
+    if tiles is not None and tiles.index is index:
+        return tiles
+
+    with _tiles_lock:
+        if _tiles is None or _tiles.index is not index:
+            tiles = TileSet(index)
+            tiles.precompute()
+            _tiles = tiles
+            logger.info(f"[AirportTiles] Tile set built ({len(tiles._pinned)} tiles precomputed)")
+        return _tiles
@@ -0,0 +1,189 @@
+"""
+Complétion événementielle des batches de production
+- Heap en mémoire des estimated_completion à venir
+- Un thread dédié complète chaque batch à l'heure exacte
+- Alimenté au démarrage (seed) et par start_production / stop_production
+- Tourne dans le worker (python -m app.worker): les process API lui transmettent
+  les batches planifiés/annulés via NOTIFY sur le canal BATCH_TIMER_CHANNEL
+- Le job "batch_completion" du scheduler reste en filet de sécurité (réconciliation)
+"""
+import heapq
+import json
+import logging
+import threading
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+from app.core.db import SessionLocal, engine
+from app.models.production_batch import ProductionBatch
+
+logger = logging.getLogger(__name__)
+
+BATCH_TIMER_CHANNEL = "batch_timer"
+
+
+def _to_utc_naive(dt: datetime) -> datetime:
+    """estimated_completion est écrit en UTC naïf mais relu en timestamptz."""
+    if dt.tzinfo is not None:
+        return dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+class BatchCompletionTimer:
+    """Timer unique (heap) déclenchant complete_batches quand des batches arrivent à échéance."""
+
+    def __init__(self):
+        self._heap: list[tuple[datetime, uuid.UUID]] = []
+        self._scheduled: dict[uuid.UUID, datetime] = {}  # Échéance courante (entrées obsolètes ignorées)
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._stopped = False
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stopped = False
+        self.seed()
+        self._thread = threading.Thread(target=self._run, name="batch-completion-timer", daemon=True)
+        self._thread.start()
+        logger.info(f"[BatchTimer] Démarré ({len(self._scheduled)} batches en attente)")
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def seed(self):
+        """(Re)charge les échéances de tous les batches actifs depuis la DB."""
+        from app.services.production_service import BATCH_ACTIVE_STATUSES
+
+        db = SessionLocal()
+        try:
+            rows = db.query(ProductionBatch.id, ProductionBatch.estimated_completion).filter(
+                ProductionBatch.status.in_(BATCH_ACTIVE_STATUSES),
+                ProductionBatch.estimated_completion.isnot(None)
+            ).all()
+        finally:
+            db.close()
+
+        with self._cond:
+            for batch_id, due_at in rows:
+                self._push(batch_id, due_at)
+            self._cond.notify()
+
+    def reconcile(self):
+        """Filet de sécurité: complète les batches en retard puis resynchronise le heap."""
+        from app.services.production_service import complete_pending_batches
+
+        completed = complete_pending_batches()
+        self.seed()
+        return completed
+
+    def schedule(self, batch_id: uuid.UUID, due_at: datetime):
+        """Planifie (ou replanifie) la complétion d'un batch."""
+        if not self.running:
+            # Process API: le timer tourne dans le worker
+            self._notify({"batch_id": str(batch_id), "due_at": _to_utc_naive(due_at).isoformat()})
+            return
+        with self._cond:
+            self._push(batch_id, due_at)
+            self._cond.notify()
+
+    def cancel(self, batch_id: uuid.UUID):
+        if not self.running:
+            self._notify({"batch_id": str(batch_id)})
+            return
+        with self._cond:
+            self._scheduled.pop(batch_id, None)
+
+    def handle_notification(self, payload: str):
+        """
+        Applique un message NOTIFY reçu par le worker (schedule si due_at, sinon cancel).
+        Toujours en local: jamais re-émis (sinon boucle NOTIFY si le timer ne tourne pas).
+        """
+        try:
+            data = json.loads(payload)
+            batch_id = uuid.UUID(data["batch_id"])
+            due_at = datetime.fromisoformat(data["due_at"]) if data.get("due_at") else None
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"[BatchTimer] Notification ignorée ({payload!r}): {e}")
+            return
+        if not self.running:
+            logger.warning(f"[BatchTimer] Timer arrêté, notification laissée à la réconciliation: {payload!r}")
+        with self._cond:
+            if due_at is not None:
+                self._push(batch_id, due_at)
+            else:
+                self._scheduled.pop(batch_id, None)
+            self._cond.notify()
+
+    @staticmethod
+    def _notify(message: dict):
+        """Transmet au worker; en cas d'échec la réconciliation rattrape le batch."""
+        try:
+            with engine.begin() as conn:
+                conn.execute(
+                    text("SELECT pg_notify(:channel, :payload)"),
+                    {"channel": BATCH_TIMER_CHANNEL, "payload": json.dumps(message)},
+                )
+        except Exception as e:
+            logger.warning(f"[BatchTimer] NOTIFY {message} échoué: {e}")
+
+    def _push(self, batch_id: uuid.UUID, due_at: datetime):
+        due_at = _to_utc_naive(due_at)
+        if self._scheduled.get(batch_id) == due_at:
+            return
+        self._scheduled[batch_id] = due_at
+        heapq.heappush(self._heap, (due_at, batch_id))
+
+    def _pop_due(self, now: datetime) -> list[uuid.UUID]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due_at, batch_id = heapq.heappop(self._heap)
+            if self._scheduled.get(batch_id) == due_at:
+                del self._scheduled[batch_id]
+                due.append(batch_id)
+        return due
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    now = datetime.utcnow()
+                    if self._heap and self._heap[0][0] <= now:
+                        break
+                    timeout = (self._heap[0][0] - now).total_seconds() if self._heap else None
+                    self._cond.wait(timeout=timeout)
+                if self._stopped:
+                    return
+                due = self._pop_due(datetime.utcnow())
+
+            if due:
+                self._complete(due)
+
+    def _complete(self, batch_ids: list[uuid.UUID]):
+        from app.services.production_service import complete_batches
+
+        db = SessionLocal()
+        try:
+            completed, failed = complete_batches(db, batch_ids, datetime.utcnow())
+            db.commit()
+            logger.info(f"[BatchTimer] {completed} batches complétés, {failed} en échec")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"[BatchTimer] Erreur complétion ({len(batch_ids)} batches): {e}")
+        finally:
+            db.close()
+
+
+# Instance globale (démarrée dans le worker, émettrice NOTIFY dans les process API)
+batch_timer = BatchCompletionTimer()
@@ -0,0 +1,411 @@
+"""
+Carnet d'ordres du marché (game.market_orders)
+- Un carnet par (item_code, airport_ident), priorité prix puis ancienneté
+- Exécution au prix de l'ordre en carnet, exécutions partielles, pas d'auto-exécution
+  (les ordres de la même company sont ignorés lors du matching)
+- Ordres garantis au dépôt: un ordre d'achat réserve quantity * unit_price sur le
+  solde de la company, un ordre de vente retire le stock de company_inventory à
+  l'aéroport; l'exécution ne peut donc jamais échouer faute de fonds ou de stock
+- Carnets en mémoire (par process), persistés dans market_orders. Chaque opération
+  verrouille la ligne game.market_books du carnet et compare son numéro de séquence
+  à celui du carnet en cache: rechargé depuis la DB si un autre process l'a modifié
+  entre-temps. Le carnet est retiré du cache pendant l'opération et n'y revient
+  qu'après le commit: un carnet modifié puis annulé (rollback) n'est jamais réutilisé
+- Priorité temps = market_books.seq au moment du dépôt (market_orders.book_seq)
+- Soldes des companies verrouillés par id croissant (pas d'interblocage entre carnets)
+- Règlement set-based: nombre de requêtes constant quel que soit le nombre d'exécutions
+"""
+import heapq
+import json
+import logging
+import threading
+import uuid
+from dataclasses import dataclass
+from decimal import Decimal
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.models.item import Item
+from app.models.market_order import MarketOrder, MarketTrade
+
+logger = logging.getLogger(__name__)
+
+OPEN_STATUSES = ("open", "partial")
+
+
+class OrderRejected(Exception):
+    """Ordre refusé (fonds/stock insuffisants, ordre introuvable...)."""
+
+
+@dataclass(slots=True)
+class BookOrder:
+    id: uuid.UUID
+    company_id: uuid.UUID
+    side: str  # buy / sell
+    price: Decimal
+    remaining: int
+    seq: int  # Ancienneté (market_orders.book_seq, priorité temps à prix égal)
+
+    @property
+    def active(self) -> bool:
+        return self.remaining > 0
+
+
+@dataclass(slots=True)
+class Fill:
+    resting: BookOrder
+    incoming: BookOrder
+    qty: int
+    price: Decimal
+
+
+class OrderBook:
+    """Carnet prix/temps: deux heaps (bids, asks), annulation paresseuse."""
+
+    def __init__(self):
+        self._bids: list[tuple[Decimal, int, BookOrder]] = []  # (-price, seq, order)
+        self._asks: list[tuple[Decimal, int, BookOrder]] = []  # (price, seq, order)
+        self._orders: dict[uuid.UUID, BookOrder] = {}
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    def add(self, order: BookOrder):
+        self._orders[order.id] = order
+        if order.side == "buy":
+            heapq.heappush(self._bids, (-order.price, order.seq, order))
+        else:
+            heapq.heappush(self._asks, (order.price, order.seq, order))
+
+    def remove(self, order_id: uuid.UUID) -> BookOrder | None:
+        order = self._orders.pop(order_id, None)
+        if order is not None:
+            order.remaining = 0  # Retiré du heap au prochain passage
+        return order
+
+    def best(self, side: str) -> BookOrder | None:
+        heap = self._bids if side == "buy" else self._asks
+        while heap and not heap[0][2].active:
+            heapq.heappop(heap)
+        return heap[0][2] if heap else None
+
+    def match(self, incoming: BookOrder) -> list[Fill]:
+        """Exécute incoming contre le côté opposé tant que les prix se croisent."""
+        heap = self._asks if incoming.side == "buy" else self._bids
+        fills: list[Fill] = []
+        own_orders = []  # Ordres de la même company, remis en carnet après le matching
+
+        while incoming.remaining and heap:
+            resting = heap[0][2]
+            if not resting.active:
+                heapq.heappop(heap)
+                continue
+            crosses = resting.price <= incoming.price if incoming.side == "buy" else resting.price >= incoming.price
+            if not crosses:
+                break
+            if resting.company_id == incoming.company_id:
+                own_orders.append(heapq.heappop(heap))
+                continue
+
+            qty = min(incoming.remaining, resting.remaining)
+            incoming.remaining -= qty
+            resting.remaining -= qty
+            fills.append(Fill(resting=resting, incoming=incoming, qty=qty, price=resting.price))
+            if not resting.active:
+                heapq.heappop(heap)
+                self._orders.pop(resting.id, None)
+
+        for entry in own_orders:
+            heapq.heappush(heap, entry)
+        if incoming.active:
+            self.add(incoming)
+        return fills
+
+
+# ─────────────────────────────────────────────────────────
+# SQL (verrou de carnet + règlement set-based)
+# ─────────────────────────────────────────────────────────
+
+# Crée le carnet au besoin et verrouille sa ligne (ON CONFLICT DO UPDATE verrouille la ligne existante)
+LOCK_BOOK_SQL = text("""
+    INSERT INTO game.market_books AS b (item_code, airport_ident)
+    VALUES (:item_code, :airport_ident)
+    ON CONFLICT (item_code, airport_ident) DO UPDATE SET seq = b.seq
+    RETURNING seq
+""")
+
+BUMP_BOOK_SQL = text("""
+    UPDATE game.market_books SET seq = seq + 1, updated_at = now()
+    WHERE item_code = :item_code AND airport_ident = :airport_ident
+    RETURNING seq
+""")
+
+LOAD_BOOK_SQL = text("""
+    SELECT id, company_id, side, unit_price, quantity - filled_quantity AS remaining, book_seq
+    FROM game.market_orders
+    WHERE item_code = :item_code AND airport_ident = :airport_ident
+      AND status IN ('open', 'partial') AND quantity > filled_quantity
+    ORDER BY book_seq, id
+""")
+
+# Verrouille les companies concernées par id croissant, avant toute mise à jour de solde
+LOCK_COMPANIES_SQL = text("""
+    SELECT c.id, c.balance FROM game.companies c
+    WHERE c.id IN (SELECT CAST(jsonb_array_elements_text(CAST(:ids AS jsonb)) AS uuid))
+    ORDER BY c.id
+    FOR UPDATE
+""")
+
+RESERVE_STOCK_SQL = text("""
+    UPDATE game.company_inventory SET qty = qty - :qty, updated_at = now()
+    WHERE company_id = :company_id AND item_id = :item_id AND airport_ident = :airport_ident
+      AND qty >= :qty
+    RETURNING qty
+""")
+
+CREDIT_BALANCES_SQL = text("""
+    UPDATE game.companies c SET balance = c.balance + d.amount
+    FROM jsonb_to_recordset(CAST(:deltas AS jsonb)) AS d(company_id uuid, amount numeric)
+    WHERE c.id = d.company_id
+""")
+
+CREDIT_STOCK_SQL = text("""
+    INSERT INTO game.company_inventory (id, company_id, item_id, airport_ident, qty, created_at, updated_at)
+    SELECT gen_random_uuid(), d.company_id, :item_id, :airport_ident, d.qty, now(), now()
+    FROM jsonb_to_recordset(CAST(:deltas AS jsonb)) AS d(company_id uuid, qty int)
+    ON CONFLICT ON CONSTRAINT uq_company_item_airport
+    DO UPDATE SET qty = game.company_inventory.qty + EXCLUDED.qty, updated_at = now()
+""")
+
+UPDATE_ORDERS_SQL = text("""
+    UPDATE game.market_orders o
+    SET filled_quantity = o.quantity - d.remaining,
+        status = CASE WHEN d.remaining = 0 THEN 'filled' ELSE 'partial' END,
+        updated_at = now()
+    FROM jsonb_to_recordset(CAST(:orders AS jsonb)) AS d(id uuid, remaining int)
+    WHERE o.id = d.id
+""")
+
+LEDGER_SQL = text("""
+    INSERT INTO game.company_transactions (id, company_id, amount, reason, meta, created_at)
+    SELECT gen_random_uuid(), d.company_id, d.amount, d.reason, d.meta, now()
+    FROM jsonb_to_recordset(CAST(:entries AS jsonb)) AS d(company_id uuid, amount numeric, reason text, meta jsonb)
+""")
+
+
+def _jsonb(rows: list[dict]) -> str:
+    return json.dumps(rows, default=str)
+
+
+# ─────────────────────────────────────────────────────────
+# Moteur
+# ─────────────────────────────────────────────────────────
+
+class MatchingEngine:
+    """Carnets en cache (par process) + opérations transactionnelles sur market_orders."""
+
+    def __init__(self):
+        self._books: dict[tuple[str, str], tuple[OrderBook, int]] = {}
+        self._lock = threading.Lock()
+
+    def _book(self, db: Session, key: tuple[str, str]) -> tuple[OrderBook, int]:
+        """
+        Verrouille le carnet en DB et retourne sa version en mémoire (rechargée si périmée).
+        Le carnet est retiré du cache: seul _commit l'y remet, après le commit.
+        """
+        item_code, airport_ident = key
+        seq = db.execute(LOCK_BOOK_SQL, {"item_code": item_code, "airport_ident": airport_ident}).scalar_one()
+        with self._lock:
+            cached = self._books.pop(key, None)
+        if cached is not None and cached[1] == seq:
+            return cached[0], seq
+
+        book = OrderBook()
+        for order_id, company_id, side, price, remaining, book_seq in db.execute(
+            LOAD_BOOK_SQL, {"item_code": item_code, "airport_ident": airport_ident}
+        ):
+            book.add(BookOrder(order_id, company_id, side, Decimal(price), remaining, book_seq))
+        return book, seq
+
+    def _commit(self, db: Session, key: tuple[str, str], book: OrderBook):
+        item_code, airport_ident = key
+        seq = db.execute(BUMP_BOOK_SQL, {"item_code": item_code, "airport_ident": airport_ident}).scalar_one()
+        db.commit()
+        with self._lock:
+            cached = self._books.get(key)
+            if cached is None or cached[1] < seq:
+                self._books[key] = (book, seq)
+
+    def place(self, db: Session, order: MarketOrder) -> list[MarketTrade]:
+        """
+        Enregistre l'ordre, réserve fonds/stock, l'exécute contre le carnet et règle
+        les exécutions, le tout dans une seule transaction (commit inclus).
+        """
+        key = (order.item_code, order.airport_ident)
+        try:
+            item = db.query(Item).filter(Item.name == order.item_code).first()
+            if not item:
+                raise OrderRejected(f"Unknown item: {order.item_code}")
+
+            book, seq = self._book(db, key)
+            price = Decimal(str(order.unit_price)).quantize(Decimal("0.01"))
+            order.unit_price = price
+            order.filled_quantity = 0
+            order.status = "open"
+            order.book_seq = seq  # Attribué sous le verrou du carnet (BUMP_BOOK_SQL le rend unique)
+            db.add(order)
+
+            # Garantie au dépôt (vente: stock; achat: fonds, réservés au règlement
+            # avec les autres soldes pour les verrouiller dans l'ordre des ids)
+            if order.side == "sell":
+                reserved = db.execute(RESERVE_STOCK_SQL, {
+                    "company_id": order.company_id, "item_id": item.id,
+                    "airport_ident": order.airport_ident, "qty": order.quantity,
+                }).first()
+                if reserved is None:
+                    raise OrderRejected("Not enough stock at this airport")
+            db.flush()
+
+            incoming = BookOrder(order.id, order.company_id, order.side, price, order.quantity, seq)
+            fills = book.match(incoming)
+            trades = self._settle(db, order, item, incoming, fills)
+            self._commit(db, key, book)
+            if fills:
+                logger.info(
+                    f"[OrderBook] {order.item_code}@{order.airport_ident}: ordre {order.id} "
+                    f"{len(fills)} exécutions, {order.quantity - incoming.remaining}/{order.quantity}"
+                )
+            return trades
+        except Exception:
+            # Le carnet modifié n'est plus dans le cache (voir _book): rechargé au prochain accès
+            db.rollback()
+            raise
+
+    def cancel(self, db: Session, order: MarketOrder):
+        """Annule le reliquat d'un ordre ouvert et restitue la garantie (fonds ou stock)."""
+        key = (order.item_code, order.airport_ident)
+        try:
+            book, _seq = self._book(db, key)
+            db.refresh(order, with_for_update=True)
+            if order.status not in OPEN_STATUSES:
+                raise OrderRejected("Order is not open")
+
+            remaining = order.quantity - order.filled_quantity
+            if order.side == "buy":
+                refund = Decimal(order.unit_price) * remaining
+                self._apply_balances(db, {order.company_id: refund})
+                db.execute(LEDGER_SQL, {"entries": _jsonb([{
+                    "company_id": order.company_id, "amount": refund, "reason": "market_order_refund",
+                    "meta": {"order_id": order.id},
+                }])})
+            else:
+                item = db.query(Item).filter(Item.name == order.item_code).first()
+                if not item:
+                    raise OrderRejected(f"Unknown item: {order.item_code}")
+                db.execute(CREDIT_STOCK_SQL, {
+                    "item_id": item.id, "airport_ident": order.airport_ident,
+                    "deltas": _jsonb([{"company_id": order.company_id, "qty": remaining}]),
+                })
+
+            order.status = "cancelled"
+            book.remove(order.id)
+            self._commit(db, key, book)
+        except Exception:
+            db.rollback()
+            raise
+
+    def _settle(self, db: Session, order: MarketOrder, item: Item, incoming: BookOrder, fills: list[Fill]) -> list[MarketTrade]:
+        """Règle toutes les exécutions (et la garantie d'un achat) en quelques requêtes set-based."""
+        ledger = []
+        balances: dict[uuid.UUID, Decimal] = {}
+        escrow = None
+        if order.side == "buy":
+            escrow = incoming.price * order.quantity
+            balances[order.company_id] = -escrow
+            ledger.append({
+                "company_id": order.company_id, "amount": -escrow,
+                "reason": "market_order_escrow", "meta": {"order_id": order.id},
+            })
+
+        if not fills:
+            if balances:
+                self._apply_balances(db, balances, escrow=(order.company_id, escrow))
+            if ledger:
+                db.execute(LEDGER_SQL, {"entries": _jsonb(ledger)})
+            return []
+
+        stock: dict[uuid.UUID, int] = {}
+        orders: dict[uuid.UUID, int] = {incoming.id: incoming.remaining}
+        trades = []
+
+        for fill in fills:
+            buy, sell = (fill.incoming, fill.resting) if fill.incoming.side == "buy" else (fill.resting, fill.incoming)
+            amount = fill.price * fill.qty
+            balances[sell.company_id] = balances.get(sell.company_id, Decimal("0")) + amount
+            # L'acheteur a réservé à son prix limite: restitue l'écart si exécuté moins cher
+            refund = (buy.price - fill.price) * fill.qty
+            if refund:
+                balances[buy.company_id] = balances.get(buy.company_id, Decimal("0")) + refund
+            stock[buy.company_id] = stock.get(buy.company_id, 0) + fill.qty
+            orders[fill.resting.id] = fill.resting.remaining
+
+            trades.append(MarketTrade(
+                id=uuid.uuid4(),
+                item_code=order.item_code,
+                airport_ident=order.airport_ident,
+                buy_order_id=buy.id,
+                sell_order_id=sell.id,
+                buyer_company_id=buy.company_id,
+                seller_company_id=sell.company_id,
+                quantity=fill.qty,
+                unit_price=fill.price,
+            ))
+            ledger.append({
+                "company_id": sell.company_id, "amount": amount, "reason": "market_sale",
+                "meta": {"order_id": sell.id, "item_code": order.item_code, "qty": fill.qty, "unit_price": fill.price},
+            })
+            if refund:
+                ledger.append({
+                    "company_id": buy.company_id, "amount": refund, "reason": "market_order_refund",
+                    "meta": {"order_id": buy.id, "qty": fill.qty, "unit_price": fill.price},
+                })
+
+        self._apply_balances(db, balances, escrow=(order.company_id, escrow) if escrow is not None else None)
+        db.add_all(trades)
+        db.execute(CREDIT_STOCK_SQL, {
+            "item_id": item.id, "airport_ident": order.airport_ident,
+            "deltas": _jsonb([{"company_id": company_id, "qty": qty} for company_id, qty in stock.items()]),
+        })
+        db.execute(UPDATE_ORDERS_SQL, {"orders": _jsonb([
+            {"id": order_id, "remaining": remaining} for order_id, remaining in orders.items()
+        ])})
+        db.execute(LEDGER_SQL, {"entries": _jsonb(ledger)})
+        db.flush()
+        db.expire(order, ["filled_quantity", "status"])
+        return trades
+
+    def _apply_balances(
+        self,
+        db: Session,
+        deltas: dict[uuid.UUID, Decimal],
+        escrow: tuple[uuid.UUID, Decimal] | None = None,
+    ):
+        """
+        Verrouille les companies par id croissant puis applique les deltas de solde.
+        escrow = (company_id, montant): garantie d'achat, vérifiée sur le solde avant crédit.
+        """
+        balances = dict(db.execute(LOCK_COMPANIES_SQL, {
+            "ids": _jsonb(sorted(str(company_id) for company_id in deltas)),
+        }).all())
+        if escrow is not None:
+            company_id, amount = escrow
+            if balances.get(company_id, Decimal("0")) < amount:
+                raise OrderRejected("Insufficient company balance")
+        db.execute(CREDIT_BALANCES_SQL, {"deltas": _jsonb([
+            {"company_id": company_id, "amount": amount} for company_id, amount in deltas.items()
+        ])})
+
+
+# Instance globale (carnets en cache par process API)
+matching_engine = MatchingEngine()
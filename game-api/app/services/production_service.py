@@ -4,7 +4,15 @@ Service de production automatique
 - Production automatique des usines T0 (NPC)
 """
 import logging
-from datetime import datetime
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from decimal import Decimal
+from functools import lru_cache
+
+from sqlalchemy import Integer, column, func, insert, text, update, values
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
@@ -24,6 +32,8 @@ from app.models.inventory_item import InventoryItem
 T0_STOCK_LIMIT = 1000  # Stock max par produit T0
 T0_PRODUCTION_RATE = 50  # Items produits par cycle pour T0
 NPC_COMPANY_ID = "00000000-0000-0000-0000-000000000001"
+BATCH_ACTIVE_STATUSES = ("pending", "in_progress")
+BATCH_COMPLETION_CHUNK_SIZE = 500  # Batches complétés par commit
 
 # Mapping factory name keywords -> item names pour T0
 T0_FACTORY_ITEM_MAPPING = {
@@ -49,8 +59,8 @@ T0_FACTORY_ITEM_MAPPING = {
     "minier": "Coal",
     "bois": "Raw Wood",
     "forêt": "Raw Wood",
-    "eaux": "Raw Water",
-    "source": "Raw Water",
+    "eaux": "Water",
+    "source": "Water",
     "sel": "Raw Salt",
     "sucre": "Raw Sugar",
 }
@@ -61,10 +71,12 @@ def get_db_session() -> Session:
     return SessionLocal()
 
 
-def complete_pending_batches():
+def complete_pending_batches() -> int:
     """
     Vérifie les batches dont estimated_completion est passé
     et les marque comme completed.
+    Traitement par chunks (complete_batches), un commit par chunk.
+    Retourne le nombre de batches complétés.
     """
     db = get_db_session()
     try:
@@ -72,100 +84,202 @@ def complete_pending_batches():
         logger.info(f"[Production] {now.isoformat()} - Vérification batches...")
 
         # Trouver les batches à compléter
-        batches = db.query(ProductionBatch).filter(
-            ProductionBatch.status.in_(["pending", "in_progress"]),
-            ProductionBatch.estimated_completion <= now
-        ).all()
-
-        if not batches:
+        batch_ids = [
+            row.id for row in db.query(ProductionBatch.id).filter(
+                ProductionBatch.status.in_(BATCH_ACTIVE_STATUSES),
+                ProductionBatch.estimated_completion <= now
+            ).order_by(ProductionBatch.estimated_completion).all()
+        ]
+
+        if not batch_ids:
             logger.debug("[Production] Aucun batch à compléter")
-            return
+            return 0
 
-        for batch in batches:
+        completed = failed = 0
+        for i in range(0, len(batch_ids), BATCH_COMPLETION_CHUNK_SIZE):
+            chunk = batch_ids[i:i + BATCH_COMPLETION_CHUNK_SIZE]
             try:
-                complete_batch(db, batch)
-                logger.info(f"[Production] Batch {batch.id} complété")
+                done, errors = complete_batches(db, chunk, now)
+                db.commit()
+                completed += done
+                failed += errors
             except Exception as e:
-                logger.error(f"[Production] Erreur batch {batch.id}: {e}")
+                logger.error(f"[Production] Erreur chunk de {len(chunk)} batches: {e}")
                 db.rollback()
 
+        logger.info(f"[Production] {completed} batches complétés, {failed} en échec")
+        return completed
+
     except Exception as e:
         logger.error(f"[Production] Erreur globale: {e}")
+        raise
     finally:
         db.close()
 
 
-def complete_batch(db: Session, batch: ProductionBatch):
-    """Complète un batch de production (V0.6)"""
-    # Récupérer la recette
-    recipe = db.query(Recipe).filter(Recipe.id == batch.recipe_id).first()
-    if not recipe:
-        batch.status = "failed"
-        db.commit()
-        return
+def complete_batches(db: Session, batch_ids: list[uuid.UUID], now: datetime) -> tuple[int, int]:
+    """
+    Complète un ensemble de batches en bulk (sans commit).
+    - 2 requêtes de chargement (batches + recettes + factories, workers)
+    - upsert company_inventory, XP workers, transactions et statuts en quelques statements
+    Si l'application bulk échoue, rejoue batch par batch dans des savepoints
+    pour isoler le batch fautif.
+    Retourne (complétés, échoués).
+    """
+    rows = db.query(ProductionBatch, Recipe, Factory).outerjoin(
+        Recipe, Recipe.id == ProductionBatch.recipe_id
+    ).outerjoin(
+        Factory, Factory.id == ProductionBatch.factory_id
+    ).filter(
+        ProductionBatch.id.in_(batch_ids),
+        ProductionBatch.status.in_(BATCH_ACTIVE_STATUSES)
+    ).with_for_update(of=ProductionBatch, skip_locked=True).all()
+
+    if not rows:
+        return 0, 0
+
+    factory_ids = {factory.id for _, _, factory in rows if factory}
+    workers_by_factory: dict[uuid.UUID, list] = {}
+    for worker in db.query(WorkerInstance.id, WorkerInstance.factory_id, WorkerInstance.tier).filter(
+        WorkerInstance.factory_id.in_(factory_ids),
+        WorkerInstance.status == "working"
+    ):
+        workers_by_factory.setdefault(worker.factory_id, []).append(worker)
 
-    factory = db.query(Factory).filter(Factory.id == batch.factory_id).first()
-    if not factory:
-        batch.status = "failed"
-        db.commit()
-        return
+    try:
+        with db.begin_nested():
+            completed, failed = _apply_batch_completions(db, rows, workers_by_factory, now)
+        return completed, failed
+    except Exception as e:
+        logger.warning(f"[Production] Bulk completion échouée ({e}), reprise batch par batch")
+
+    completed = failed = 0
+    for batch, recipe, factory in rows:
+        try:
+            with db.begin_nested():
+                done, errors = _apply_batch_completions(db, [(batch, recipe, factory)], workers_by_factory, now)
+            completed += done
+            failed += errors
+        except Exception as e:
+            logger.error(f"[Production] Erreur batch {batch.id}: {e}")
+    return completed, failed
+
+
+def _apply_batch_completions(db: Session, rows: list, workers_by_factory: dict, now: datetime) -> tuple[int, int]:
+    """Écrit en bulk le résultat d'un ensemble de (batch, recipe, factory)."""
+    inventory_deltas: Counter[tuple[uuid.UUID, uuid.UUID, str]] = Counter()
+    xp_deltas: Counter[uuid.UUID] = Counter()
+    transactions = []
+    completed_ids = []
+    failed_ids = []
+    idle_factory_ids = set()
+
+    for batch, recipe, factory in rows:
+        if not recipe or not factory:
+            failed_ids.append(batch.id)
+            continue
+
+        workers = workers_by_factory.get(factory.id, [])
+        result_qty = calculate_batch_output(batch.result_quantity, [w.tier for w in workers])
+
+        # V0.7: Ajouter directement à company_inventory (au lieu de factory_storage)
+        inventory_deltas[(factory.company_id, recipe.result_item_id, factory.airport_ident)] += result_qty
+
+        # Log la transaction (output = production completed)
+        transactions.append({
+            "factory_id": batch.factory_id,
+            "item_id": recipe.result_item_id,
+            "transaction_type": "output",
+            "quantity": result_qty,
+            "batch_id": batch.id,
+            "notes": f"Production completed: {recipe.name}",
+        })
+
+        # V2: Donner de l'XP aux workers (10 XP par tier de recette)
+        for worker in workers:
+            xp_deltas[worker.id] += recipe.tier * 10
+
+        completed_ids.append(batch.id)
+        idle_factory_ids.add(factory.id)
+
+    if inventory_deltas:
+        stmt = pg_insert(CompanyInventory).values([
+            {
+                "id": uuid.uuid4(),
+                "company_id": company_id,
+                "item_id": item_id,
+                "airport_ident": airport_ident,
+                "qty": qty,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for (company_id, item_id, airport_ident), qty in inventory_deltas.items()
+        ])
+        db.execute(stmt.on_conflict_do_update(
+            constraint="uq_company_item_airport",
+            set_={"qty": CompanyInventory.qty + stmt.excluded.qty, "updated_at": now},
+        ))
+
+    if xp_deltas:
+        xp_values = values(
+            column("id", PG_UUID(as_uuid=True)), column("xp", Integer), name="xp_deltas"
+        ).data(list(xp_deltas.items()))
+        db.execute(
+            update(WorkerInstance)
+            .where(WorkerInstance.id == xp_values.c.id)
+            .values(xp=WorkerInstance.xp + xp_values.c.xp),
+            execution_options={"synchronize_session": False},
+        )
 
-    # Récupérer les workers actifs (V2)
-    workers = db.query(WorkerInstance).filter(
-        WorkerInstance.factory_id == batch.factory_id,
-        WorkerInstance.status == "working"
-    ).all()
+    if transactions:
+        db.execute(insert(FactoryTransaction), transactions)
 
-    # V2: No separate engineers - bonus based on worker tier instead
-    result_qty = batch.result_quantity
-    # Bonus based on average tier of workers
-    if workers:
-        avg_tier = sum(w.tier for w in workers) / len(workers)
-        tier_bonus = 1.0 + ((avg_tier - 1) * 0.05)  # +5% per tier above 1
-        result_qty = int(result_qty * min(tier_bonus, 1.25))  # Max 25% bonus
-
-    # V0.7: Ajouter directement à company_inventory (au lieu de factory_storage)
-    company_inv = db.query(CompanyInventory).filter(
-        CompanyInventory.company_id == factory.company_id,
-        CompanyInventory.item_id == recipe.result_item_id,
-        CompanyInventory.airport_ident == factory.airport_ident,
-    ).first()
+    if completed_ids:
+        db.execute(
+            update(ProductionBatch)
+            .where(ProductionBatch.id.in_(completed_ids))
+            .values(status="completed", completed_at=now),
+            execution_options={"synchronize_session": False},
+        )
+        # Remettre les factories en idle
+        db.execute(
+            update(Factory)
+            .where(Factory.id.in_(idle_factory_ids))
+            .values(status="idle"),
+            execution_options={"synchronize_session": False},
+        )
 
-    if not company_inv:
-        company_inv = CompanyInventory(
-            company_id=factory.company_id,
-            item_id=recipe.result_item_id,
-            airport_ident=factory.airport_ident,
-            qty=0,
+    if failed_ids:
+        db.execute(
+            update(ProductionBatch)
+            .where(ProductionBatch.id.in_(failed_ids))
+            .values(status="failed"),
+            execution_options={"synchronize_session": False},
         )
-        db.add(company_inv)
-        db.flush()
 
-    company_inv.qty += result_qty
+    return len(completed_ids), len(failed_ids)
 
-    # Log la transaction (output = production completed)
-    transaction = FactoryTransaction(
-        factory_id=batch.factory_id,
-        item_id=recipe.result_item_id,
-        transaction_type="output",
-        quantity=result_qty,
-        batch_id=batch.id,
-        notes=f"Production completed: {recipe.name}"
-    )
-    db.add(transaction)
 
-    # V2: Donner de l'XP aux workers
-    xp_per_worker = recipe.tier * 10  # 10 XP par tier
-    for worker in workers:
-        worker.xp += xp_per_worker
+def calculate_batch_output(result_quantity: int, worker_tiers: list[int]) -> int:
+    """Quantité produite avec le bonus de tier moyen des workers (+5%/tier, max +25%)."""
+    if not worker_tiers:
+        return result_quantity
+    avg_tier = sum(worker_tiers) / len(worker_tiers)
+    tier_bonus = 1.0 + ((avg_tier - 1) * 0.05)
+    return int(result_quantity * min(tier_bonus, 1.25))
 
-    # Mettre à jour le batch
-    batch.status = "completed"
-    batch.completed_at = datetime.utcnow()
 
-    # Remettre la factory en idle
-    factory.status = "idle"
+def complete_batch(db: Session, batch: ProductionBatch):
+    """Complète un batch de production (V0.6)"""
+    recipe = db.query(Recipe).filter(Recipe.id == batch.recipe_id).first()
+    factory = db.query(Factory).filter(Factory.id == batch.factory_id).first()
+
+    workers = db.query(WorkerInstance.id, WorkerInstance.factory_id, WorkerInstance.tier).filter(
+        WorkerInstance.factory_id == batch.factory_id,
+        WorkerInstance.status == "working"
+    ).all()
 
+    _apply_batch_completions(db, [(batch, recipe, factory)], {batch.factory_id: workers}, datetime.utcnow())
     db.commit()
 
 
@@ -208,160 +322,157 @@ def calculate_production_time(base_hours: float, workers: list[WorkerInstance],
     return base_hours * time_multiplier
 
 
-def process_food_consumption(db: Session, factory: Factory, hours_elapsed: float = 1.0):
-    """
-    Consomme la nourriture de la factory.
-    Retourne True si les workers sont nourris, False sinon.
-    """
-    workers = db.query(WorkerInstance).filter(
-        WorkerInstance.factory_id == factory.id,
-        WorkerInstance.status == "working"
-    ).all()
-
-    if not workers:
-        return True  # No workers, no food needed
-
-    # Food consumption: 1 unit per worker per hour
-    food_needed = int(len(workers) * hours_elapsed)
-
-    if factory.food_stock >= food_needed:
-        factory.food_stock -= food_needed
-        return True
-    else:
-        # Consume what's available
-        factory.food_stock = 0
-        return False
-
-
-def check_worker_injuries(db: Session, factory: Factory, has_food: bool):
-    """
-    V0.6: Vérifie et applique les blessures aux workers.
-    Sans food: risque de blessure x2
-    """
-    import random
-    from datetime import timedelta
-
-    workers = db.query(WorkerInstance).filter(
-        WorkerInstance.factory_id == factory.id,
-        WorkerInstance.status == "working"
-    ).all()
-
-    base_injury_chance = 0.005  # 0.5% base chance per hour
-
-    if not has_food:
-        base_injury_chance *= 2  # Double risk without food
-
-    for worker in workers:
-        # Resistance reduces injury chance
-        injury_chance = base_injury_chance * (100 - worker.resistance) / 100
-
-        if random.random() < injury_chance:
-            worker.status = "injured"
-            worker.injured_at = datetime.utcnow()
-            logger.warning(f"[Injury] Worker {worker.id} injured at factory {factory.id}")
+MAX_INJURY_DAYS = 10
+DEATH_PENALTY = 10000
+
+# Transitions ensemblistes des blessés: mort + retrait de la factory en un UPDATE,
+# pénalités agrégées par company (plafonnées à 0). Ne touche que les décès
+# (index idx_worker_instances_status_injured_at).
+INJURED_WORKERS_SQL = text("""
+    WITH dead AS (
+        UPDATE game.worker_instances
+        SET status = 'dead', factory_id = NULL
+        WHERE status = 'injured'
+          AND injured_at <= :cutoff
+        RETURNING id, owner_company_id, EXTRACT(DAY FROM now() - injured_at)::int AS days_injured
+    ),
+    penalized AS (
+        UPDATE game.companies c
+        SET balance = GREATEST(0, c.balance - :penalty * p.deaths)
+        FROM (
+            SELECT owner_company_id, COUNT(*) AS deaths
+            FROM dead
+            WHERE owner_company_id IS NOT NULL
+            GROUP BY owner_company_id
+        ) p
+        WHERE c.id = p.owner_company_id
+        RETURNING c.id
+    )
+    SELECT id, owner_company_id, days_injured FROM dead
+""")
 
 
-def process_injured_workers():
+def process_injured_workers() -> list:
     """
     V0.6: Traite les workers blessés (job scheduler).
     - ≤10 jours: récupération possible
-    - >10 jours: mort
+    - >10 jours: mort (pénalité 10000 pour la company employeuse)
+    Retourne la liste des workers morts (id, owner_company_id, days_injured).
     """
-    from app.models.company import Company
-
     db = get_db_session()
     try:
         now = datetime.utcnow()
-        max_injury_days = 10
         logger.info(f"[V0.6] {now.isoformat()} - Processing injured workers...")
 
-        injured_workers = db.query(WorkerInstance).filter(
-            WorkerInstance.status == "injured",
-            WorkerInstance.injured_at.isnot(None)
+        # (now - injured_at).days > MAX_INJURY_DAYS  <=>  injured_at <= now - (MAX_INJURY_DAYS + 1) jours
+        cutoff = now - timedelta(days=MAX_INJURY_DAYS + 1)
+        deaths = db.execute(
+            INJURED_WORKERS_SQL, {"cutoff": cutoff, "penalty": DEATH_PENALTY}
         ).all()
-
-        deaths = 0
-        for worker in injured_workers:
-            days_injured = (now - worker.injured_at).days
-
-            if days_injured > max_injury_days:
-                # Worker dies
-                worker.status = "dead"
-                deaths += 1
-                logger.error(f"[Death] Worker {worker.id} died after {days_injured} days injured")
-
-                # Death penalty for company (if employed)
-                if worker.owner_company_id:
-                    company = db.query(Company).filter(Company.id == worker.owner_company_id).first()
-                    if company:
-                        # Penalty: lose 10000 credits
-                        company.balance = max(0, company.balance - 10000)
-                        logger.warning(f"[Death Penalty] Company {company.id} penalized 10000 for worker death")
-
-                # Remove from factory (keep ownership for records)
-                worker.factory_id = None
-
         db.commit()
 
-        if deaths > 0:
-            logger.info(f"[V0.6] {deaths} workers died from injuries")
+        if deaths:
+            penalties = Counter(d.owner_company_id for d in deaths if d.owner_company_id)
+            for worker in deaths:
+                logger.error(f"[Death] Worker {worker.id} died after {worker.days_injured} days injured")
+            for company_id, count in penalties.items():
+                logger.warning(f"[Death Penalty] Company {company_id} penalized {DEATH_PENALTY * count} for {count} worker death(s)")
+            logger.info(f"[V0.6] {len(deaths)} workers died from injuries")
         else:
             logger.debug("[V0.6] No worker deaths")
+        return deaths
 
     except Exception as e:
         logger.error(f"[V0.6] Error processing injured workers: {e}")
         db.rollback()
+        raise
     finally:
         db.close()
 
 
-def process_salary_payments():
+# Payroll ensembliste: agrégation des salaires par company, débit plafonné à 0
+# et écriture d'une ligne de ledger (company_transactions) par company,
+# le tout en un seul statement.
+SALARY_PAYROLL_SQL = text("""
+    WITH salaries AS (
+        SELECT owner_company_id AS company_id,
+               SUM(hourly_salary) AS salary_due,
+               COUNT(*) AS workers
+        FROM game.worker_instances
+        WHERE owner_company_id IS NOT NULL
+          AND status IN ('working', 'available')
+        GROUP BY owner_company_id
+    ),
+    -- Verrou (par id croissant) avant calcul: balance_before est le solde réellement
+    -- débité, même si un achat concurrent a modifié la company entre-temps
+    locked AS (
+        SELECT c.id, c.balance, s.salary_due, s.workers
+        FROM game.companies c
+        JOIN salaries s ON s.company_id = c.id
+        ORDER BY c.id
+        FOR UPDATE OF c
+    ),
+    paid AS (
+        UPDATE game.companies c
+        SET balance = GREATEST(0, l.balance - l.salary_due)
+        FROM locked l
+        WHERE c.id = l.id
+        RETURNING c.id AS company_id, l.salary_due, l.workers,
+                  l.balance AS balance_before, c.balance AS balance_after
+    )
+    INSERT INTO game.company_transactions (id, company_id, amount, reason, meta)
+    SELECT gen_random_uuid(),
+           company_id,
+           balance_after - balance_before,
+           'salary_payment',
+           jsonb_build_object(
+               'salary_due', salary_due,
+               'workers', workers,
+               'balance_before', balance_before,
+               'balance_after', balance_after
+           )
+    FROM paid
+    RETURNING company_id, amount, meta
+""")
+
+
+def process_salary_payments() -> list:
     """
     V0.6: Paye les salaires des workers (job scheduler).
     Salaire payé même sans food (les workers continuent de travailler).
+    Un seul aller-retour DB quel que soit le nombre de companies;
+    retourne le ledger (company_id, amount, meta) écrit dans company_transactions.
     """
-    from app.models.company import Company
-
     db = get_db_session()
     try:
         now = datetime.utcnow()
         logger.info(f"[V0.6] {now.isoformat()} - Processing salary payments...")
 
-        # Get all employed workers (V2)
-        workers = db.query(WorkerInstance).filter(
-            WorkerInstance.owner_company_id.isnot(None),
-            WorkerInstance.status.in_(["working", "available"])
-        ).all()
-
-        # Group by company (1 hour of salary)
-        company_salaries = {}
-        for worker in workers:
-            if worker.owner_company_id not in company_salaries:
-                company_salaries[worker.owner_company_id] = 0
-            company_salaries[worker.owner_company_id] += float(worker.hourly_salary)
-
-        # Deduct from company balance
-        total_paid = 0
-        for company_id, total_salary in company_salaries.items():
-            company = db.query(Company).filter(Company.id == company_id).first()
-            if company:
-                company.balance = max(0, company.balance - total_salary)
-                total_paid += total_salary
-
+        ledger = db.execute(SALARY_PAYROLL_SQL).all()
         db.commit()
-        logger.info(f"[V0.6] Paid {total_paid:.2f} credits in salaries to {len(company_salaries)} companies")
+
+        total_paid = -sum(row.amount for row in ledger)
+        logger.info(f"[V0.6] Paid {total_paid:.2f} credits in salaries to {len(ledger)} companies")
+        return ledger
 
     except Exception as e:
         logger.error(f"[V0.6] Error processing salary payments: {e}")
         db.rollback()
+        raise
     finally:
         db.close()
 
 
-def process_t0_factories():
+def process_t0_factories() -> int:
     """
     Production automatique des usines T0 (NPC).
     Les items sont mis en vente directement à l'aéroport.
+    Retourne le nombre de stocks réapprovisionnés.
+
+    Cycle ensembliste: l'item produit vient de factories.output_item_id
+    (résolu une seule fois depuis le nom puis persisté), puis un seul upsert
+    applique LEAST(qty + rate, limit) à tous les warehouses NPC (nombre de
+    requêtes constant quel que soit le nombre de factories).
     """
     db = get_db_session()
     try:
@@ -369,7 +480,9 @@ def process_t0_factories():
         logger.info(f"[T0 Production] {now.isoformat()} - Cycle de production...")
 
         # Récupérer toutes les factories T0 actives
-        factories = db.query(Factory).filter(
+        factories = db.query(
+            Factory.id, Factory.name, Factory.airport_ident, Factory.output_item_id
+        ).filter(
             Factory.tier == 0,
             Factory.is_active == True,
             Factory.status == "producing"
@@ -377,78 +490,118 @@ def process_t0_factories():
 
         if not factories:
             logger.debug("[T0 Production] Aucune factory T0 active")
-            return
+            return 0
 
         # Importer Item ici pour éviter les imports circulaires
         from app.models.item import Item
 
-        for factory in factories:
-            try:
-                # Déterminer l'item à produire basé sur le nom
-                item_name = get_t0_item_from_factory_name(factory.name)
-                if not item_name:
-                    continue
-
-                # Trouver l'item
-                item = db.query(Item).filter(Item.name == item_name).first()
-                if not item:
-                    logger.warning(f"[T0] Item '{item_name}' non trouvé pour {factory.name}")
-                    continue
-
-                # Trouver ou créer le warehouse NPC à cet aéroport
-                warehouse = get_or_create_npc_warehouse(db, factory.airport_ident)
-
-                # Vérifier le stock actuel
-                inventory = db.query(InventoryItem).filter(
-                    InventoryItem.location_id == warehouse.id,
-                    InventoryItem.item_id == item.id
-                ).first()
-
-                current_stock = inventory.qty if inventory else 0
-
-                # Ne pas produire si stock >= limite
-                if current_stock >= T0_STOCK_LIMIT:
-                    continue
-
-                # Calculer combien produire (sans dépasser la limite)
-                can_produce = min(T0_PRODUCTION_RATE, T0_STOCK_LIMIT - current_stock)
-
-                if can_produce <= 0:
-                    continue
-
-                # Ajouter au stock
-                if not inventory:
-                    inventory = InventoryItem(
-                        location_id=warehouse.id,
-                        item_id=item.id,
-                        qty=0,
-                        for_sale=True,
-                        sale_price=item.base_value,
-                        sale_qty=0
-                    )
-                    db.add(inventory)
-                    db.flush()
-
-                inventory.qty += can_produce
-                inventory.for_sale = True
-                inventory.sale_price = item.base_value
-                inventory.sale_qty = inventory.qty  # Tout en vente
-
-                logger.info(f"[T0] {factory.name} @ {factory.airport_ident}: +{can_produce} {item_name}")
+        # Item produit: output_item_id (résolu une fois, backfill si manquant)
+        output_items = {f.id: f.output_item_id for f in factories if f.output_item_id}
+        unresolved = [f for f in factories if not f.output_item_id]
+        if unresolved:
+            output_items.update(backfill_t0_output_items(db, unresolved))
 
-            except Exception as e:
-                logger.error(f"[T0] Erreur factory {factory.name}: {e}")
+        prices: dict[uuid.UUID, Decimal] = dict(
+            db.query(Item.id, Item.base_value).filter(Item.id.in_(set(output_items.values()))).all()
+        )
+
+        # Nombre de factories par (aéroport, item)
+        producers: Counter[tuple[str, uuid.UUID]] = Counter()
+        for factory in factories:
+            item_id = output_items.get(factory.id)
+            if item_id in prices:
+                producers[(factory.airport_ident, item_id)] += 1
+
+        if not producers:
+            db.commit()  # Persiste un éventuel backfill
+            return 0
+
+        warehouses = get_or_create_npc_warehouses(db, {airport for airport, _ in producers})
+
+        rows = [
+            {
+                "location_id": warehouses[airport],
+                "item_id": item_id,
+                "qty": min(count * T0_PRODUCTION_RATE, T0_STOCK_LIMIT),
+                "for_sale": True,
+                "sale_price": prices[item_id],
+                "sale_qty": min(count * T0_PRODUCTION_RATE, T0_STOCK_LIMIT),
+            }
+            for (airport, item_id), count in producers.items()
+        ]
+
+        # Upsert unique: stock plafonné à T0_STOCK_LIMIT, tout en vente
+        stmt = pg_insert(InventoryItem).values(rows)
+        new_qty = func.least(InventoryItem.qty + stmt.excluded.qty, T0_STOCK_LIMIT)
+        stmt = stmt.on_conflict_do_update(
+            constraint="inventory_items_location_id_item_id_key",
+            set_={
+                "qty": new_qty,
+                "for_sale": True,
+                "sale_price": stmt.excluded.sale_price,
+                "sale_qty": new_qty,
+                "updated_at": func.now(),
+            },
+            where=InventoryItem.qty < T0_STOCK_LIMIT,
+        )
+        result = db.execute(stmt)
 
         db.commit()
-        logger.info("[T0 Production] Cycle terminé")
+        logger.info(
+            f"[T0 Production] Cycle terminé: {len(factories)} factories, "
+            f"{result.rowcount}/{len(rows)} stocks réapprovisionnés"
+        )
+        return result.rowcount
 
     except Exception as e:
         logger.error(f"[T0 Production] Erreur globale: {e}")
         db.rollback()
+        raise
     finally:
         db.close()
 
 
+def backfill_t0_output_items(db: Session, factories: list | None = None) -> dict[uuid.UUID, uuid.UUID]:
+    """
+    Résout et persiste output_item_id pour les factories T0 qui n'en ont pas.
+    `factories`: lignes (id, name); par défaut toutes les T0 sans output_item_id.
+    Retourne {factory_id: item_id} pour les factories résolues.
+    """
+    from app.models.item import Item
+
+    if factories is None:
+        factories = db.query(Factory.id, Factory.name).filter(
+            Factory.tier == 0,
+            Factory.output_item_id.is_(None)
+        ).all()
+    if not factories:
+        return {}
+
+    item_names = {get_t0_item_from_factory_name(f.name) for f in factories} - {None}
+    item_ids = dict(db.query(Item.name, Item.id).filter(Item.name.in_(item_names)).all())
+
+    resolved = {}
+    missing = set()
+    for factory in factories:
+        item_id = item_ids.get(get_t0_item_from_factory_name(factory.name))
+        if item_id:
+            resolved[factory.id] = item_id
+        else:
+            missing.add(factory.name)
+    for name in sorted(missing):
+        logger.warning(f"[T0] Aucun item trouvé pour {name}")
+
+    if resolved:
+        db.execute(
+            update(Factory),
+            [{"id": factory_id, "output_item_id": item_id} for factory_id, item_id in resolved.items()],
+        )
+        logger.info(f"[T0] output_item_id renseigné pour {len(resolved)} factories")
+
+    return resolved
+
+
+@lru_cache(maxsize=4096)
 def get_t0_item_from_factory_name(factory_name: str) -> str | None:
     """Détermine l'item produit par une factory T0 basé sur son nom"""
     name_lower = factory_name.lower()
@@ -481,3 +634,36 @@ def get_or_create_npc_warehouse(db: Session, airport_ident: str) -> InventoryLoc
         db.flush()
 
     return warehouse
+
+
+def get_or_create_npc_warehouses(db: Session, airport_idents: set[str]) -> dict[str, uuid.UUID]:
+    """Récupère ou crée (en bulk) les warehouses NPC. Retourne {airport_ident: location_id}."""
+    npc_company_id = uuid.UUID(NPC_COMPANY_ID)
+
+    warehouses = dict(
+        db.query(InventoryLocation.airport_ident, InventoryLocation.id).filter(
+            InventoryLocation.company_id == npc_company_id,
+            InventoryLocation.airport_ident.in_(airport_idents),
+            InventoryLocation.kind == "warehouse"
+        ).all()
+    )
+
+    missing = sorted(airport_idents - warehouses.keys())
+    if missing:
+        created = db.execute(
+            insert(InventoryLocation).values([
+                {
+                    "id": uuid.uuid4(),
+                    "company_id": npc_company_id,
+                    "owner_type": "company",
+                    "owner_id": npc_company_id,
+                    "kind": "warehouse",
+                    "airport_ident": airport_ident,
+                    "name": f"NPC Warehouse {airport_ident}",
+                }
+                for airport_ident in missing
+            ]).returning(InventoryLocation.airport_ident, InventoryLocation.id)
+        ).all()
+        warehouses.update(dict(created))
+
+    return warehouses
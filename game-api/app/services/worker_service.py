@@ -6,72 +6,139 @@ V0.8.1 Worker Service (V2)
 import logging
 from datetime import datetime
 
+import numpy as np
+from sqlalchemy import Integer, column, update, values
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 from sqlalchemy.orm import Session
 
 from app.core.db import SessionLocal
 from app.models.factory import Factory
 from app.models.worker import WorkerInstance
-from app.services.production_service import (
-    process_food_consumption,
-    check_worker_injuries,
-)
 
 logger = logging.getLogger(__name__)
 
+BASE_INJURY_CHANCE = 0.005  # 0.5% base chance per hour (x2 without food)
+
 
 def get_db_session() -> Session:
     """Crée une nouvelle session DB"""
     return SessionLocal()
 
 
-def process_food_and_injuries():
+def simulate_food_and_injuries(
+    food_stock: np.ndarray,
+    worker_factory: np.ndarray,
+    worker_resistance: np.ndarray,
+    rng: np.random.Generator,
+    hours_elapsed: float = 1.0,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Simulation vectorisée d'un tick (toutes les factories en une passe).
+    - food_stock: stock par factory
+    - worker_factory: index de factory (dans food_stock) de chaque worker
+    - worker_resistance: résistance de chaque worker (1-100)
+    Retourne (nouveau stock, has_food, nb workers par factory, masque des workers blessés).
+    """
+    worker_count = np.bincount(worker_factory, minlength=food_stock.size)
+
+    # Food: 1 unité par worker par heure, sinon stock vidé
+    food_needed = (worker_count * hours_elapsed).astype(np.int64)
+    has_food = food_stock >= food_needed
+    new_stock = np.where(has_food, food_stock - food_needed, 0)
+
+    # Blessures: risque x2 sans food, réduit par la résistance
+    injury_chance = np.where(has_food[worker_factory], BASE_INJURY_CHANCE, BASE_INJURY_CHANCE * 2)
+    injury_chance = injury_chance * (100 - worker_resistance) / 100
+    injured = rng.random(worker_factory.size) < injury_chance
+
+    return new_stock, has_food, worker_count, injured
+
+
+def process_food_and_injuries(rng: np.random.Generator | None = None):
     """
     Job horaire: consomme la nourriture et vérifie les blessures
     pour toutes les factories actives.
+    Chargement en 2 requêtes, simulation NumPy, écriture en 2 UPDATE bulk.
+    `rng`: générateur NumPy (seedable pour des tirages reproductibles).
     """
+    rng = rng if rng is not None else np.random.default_rng()
+
     db = get_db_session()
     try:
         now = datetime.utcnow()
         logger.info(f"[V2] {now.isoformat()} - Processing food & injuries...")
 
-        # Get all active factories with workers
-        factories = db.query(Factory).filter(
+        # Working workers of active T1+ factories (T0 are NPC)
+        workers = db.query(
+            WorkerInstance.id, WorkerInstance.factory_id, WorkerInstance.resistance
+        ).join(
+            Factory, Factory.id == WorkerInstance.factory_id
+        ).filter(
+            WorkerInstance.status == "working",
             Factory.is_active == True,
-            Factory.tier > 0  # T1+ only, T0 are NPC
+            Factory.tier > 0
         ).all()
 
-        for factory in factories:
-            try:
-                # Check if factory has workers (V2)
-                worker_count = db.query(WorkerInstance).filter(
-                    WorkerInstance.factory_id == factory.id,
-                    WorkerInstance.status == "working"
-                ).count()
-
-                if worker_count == 0:
-                    continue
-
-                # Process food consumption (1 hour elapsed)
-                has_food = process_food_consumption(db, factory, hours_elapsed=1.0)
-
-                # Check for injuries
-                check_worker_injuries(db, factory, has_food)
-
-                # Update food consumption rate
-                factory.food_consumption_per_hour = worker_count
-
-                if not has_food:
-                    logger.warning(f"[V2] Factory {factory.name} has no food! Workers at risk.")
-
-            except Exception as e:
-                logger.error(f"[V2] Error processing factory {factory.id}: {e}")
+        if not workers:
+            logger.info("[V2] No working workers")
+            return 0
+
+        factory_ids = list({w.factory_id for w in workers})
+        factory_index = {factory_id: i for i, factory_id in enumerate(factory_ids)}
+        stocks = dict(db.query(Factory.id, Factory.food_stock).filter(Factory.id.in_(factory_ids)).all())
+
+        food_stock = np.array([stocks[factory_id] for factory_id in factory_ids], dtype=np.int64)
+        worker_factory = np.fromiter((factory_index[w.factory_id] for w in workers), dtype=np.int64, count=len(workers))
+        worker_resistance = np.fromiter((w.resistance for w in workers), dtype=np.float64, count=len(workers))
+
+        new_stock, has_food, worker_count, injured = simulate_food_and_injuries(
+            food_stock, worker_factory, worker_resistance, rng, hours_elapsed=1.0
+        )
+
+        # Bulk write-back: food stock + consumption rate per factory
+        factory_values = values(
+            column("id", PG_UUID(as_uuid=True)),
+            column("food_stock", Integer),
+            column("food_consumption_per_hour", Integer),
+            name="factory_food",
+        ).data([
+            (factory_id, int(new_stock[i]), int(worker_count[i]))
+            for i, factory_id in enumerate(factory_ids)
+        ])
+        db.execute(
+            update(Factory)
+            .where(Factory.id == factory_values.c.id)
+            .values(
+                food_stock=factory_values.c.food_stock,
+                food_consumption_per_hour=factory_values.c.food_consumption_per_hour,
+            ),
+            execution_options={"synchronize_session": False},
+        )
+
+        injured_ids = [workers[i].id for i in np.flatnonzero(injured)]
+        if injured_ids:
+            db.execute(
+                update(WorkerInstance)
+                .where(WorkerInstance.id.in_(injured_ids), WorkerInstance.status == "working")
+                .values(status="injured", injured_at=now),
+                execution_options={"synchronize_session": False},
+            )
 
         db.commit()
-        logger.info("[V2] Food & injuries processing complete")
+
+        starving = int((~has_food).sum())
+        if starving:
+            logger.warning(f"[V2] {starving} factories have no food! Workers at risk.")
+        logger.info(
+            f"[V2] Food & injuries processing complete: {len(workers)} workers, "
+            f"{len(factory_ids)} factories, {len(injured_ids)} injuries"
+        )
+        return len(workers)
 
     except Exception as e:
         logger.error(f"[V2] Global error: {e}")
         db.rollback()
+        raise
     finally:
         db.close()
 
@@ -96,9 +163,11 @@ def cleanup_dead_workers():
 
         if deleted > 0:
             logger.info(f"[V2] Cleaned up {deleted} dead workers")
+        return deleted
 
     except Exception as e:
         logger.error(f"[V2] Cleanup error: {e}")
         db.rollback()
+        raise
     finally:
         db.close()
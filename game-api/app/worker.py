@@ -0,0 +1,138 @@
+"""
+Worker process: exécute les jobs planifiés hors de l'API
+Usage: python -m app.worker
+
+- Élection d'un leader via un advisory lock Postgres (pg_try_advisory_lock):
+  un seul worker actif exécute le scheduler et le batch_timer, les autres
+  restent en standby et prennent le relais si le leader disparaît
+- Le lock (niveau session) est pris sur une connexion dédiée, hors pool, et gardé
+  tant que le leader tourne. Le heartbeat vérifie dans pg_locks que cette session
+  le détient toujours; la connexion a un tcp_user_timeout de LEADER_LEASE_SECONDS,
+  une coupure réseau arrête donc le scheduler avant que Postgres ne libère le lock
+  (keepalive serveur, bien plus long) et qu'un autre worker ne devienne leader
+- Cette même connexion écoute le canal NOTIFY du batch_timer (batches
+  planifiés/annulés par les process API)
+"""
+import logging
+import select
+import signal
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+from app.core.scheduler import start_scheduler, stop_scheduler
+from app.services.batch_timer import BATCH_TIMER_CHANNEL, batch_timer
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Configuration
+SCHEDULER_LOCK_KEY = 0x4D465343  # "MFSC": clé de l'advisory lock du leader
+STANDBY_RETRY_SECONDS = 10       # Tentative de prise du lock en standby
+HEARTBEAT_SECONDS = 5            # Vérification que le leader détient toujours le lock
+LEADER_LEASE_SECONDS = 15        # Délai max pour détecter une connexion perdue (tcp_user_timeout)
+
+# Connexion du lock: hors pool (jamais recyclée ni partagée), coupure détectée en LEADER_LEASE_SECONDS
+lock_engine = create_engine(
+    settings.DATABASE_URL,
+    poolclass=NullPool,
+    connect_args={
+        "keepalives": 1,
+        "keepalives_idle": HEARTBEAT_SECONDS,
+        "keepalives_interval": HEARTBEAT_SECONDS,
+        "keepalives_count": 2,
+        "tcp_user_timeout": LEADER_LEASE_SECONDS * 1000,
+    },
+)
+
+# Vrai si cette session détient l'advisory lock (clé bigint: classid = 32 bits hauts, objid = bas)
+LOCK_HELD_SQL = text("""
+    SELECT EXISTS (
+        SELECT 1 FROM pg_locks
+        WHERE locktype = 'advisory' AND granted AND pid = pg_backend_pid()
+          AND objsubid = 1 AND ((classid::bigint << 32) | objid::bigint) = :key
+    )
+""")
+
+
+def _drain_notifications(dbapi_conn):
+    dbapi_conn.poll()
+    while dbapi_conn.notifies:
+        notification = dbapi_conn.notifies.pop(0)
+        batch_timer.handle_notification(notification.payload)
+
+
+def _lead(conn, stop: threading.Event):
+    """Boucle du leader: NOTIFY du batch_timer + heartbeat jusqu'à l'arrêt."""
+    dbapi_conn = conn.connection.dbapi_connection
+    next_heartbeat = time.monotonic() + HEARTBEAT_SECONDS
+    while not stop.is_set():
+        ready, _, _ = select.select([dbapi_conn], [], [], max(0.0, next_heartbeat - time.monotonic()))
+        if ready:
+            _drain_notifications(dbapi_conn)
+        if time.monotonic() >= next_heartbeat:
+            # Heartbeat (même sous un flux continu de NOTIFY): erreur si la connexion
+            # est perdue, arrêt si la session ne détient plus le lock
+            if not conn.execute(LOCK_HELD_SQL, {"key": SCHEDULER_LOCK_KEY}).scalar():
+                raise RuntimeError("advisory lock du leader perdu")
+            _drain_notifications(dbapi_conn)
+            next_heartbeat = time.monotonic() + HEARTBEAT_SECONDS
+
+
+def run(stop: threading.Event):
+    while not stop.is_set():
+        conn = None
+        try:
+            conn = lock_engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+            acquired = conn.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": SCHEDULER_LOCK_KEY}
+            ).scalar()
+            if not acquired:
+                logger.debug("[Worker] Standby (un autre worker est leader)")
+                conn.close()
+                conn = None
+                stop.wait(STANDBY_RETRY_SECONDS)
+                continue
+
+            logger.info("[Worker] Leader élu, démarrage du scheduler")
+            conn.execute(text(f"LISTEN {BATCH_TIMER_CHANNEL}"))
+            start_scheduler()
+            try:
+                _lead(conn, stop)
+            finally:
+                stop_scheduler()
+                logger.info("[Worker] Scheduler arrêté")
+
+        except Exception as e:
+            logger.error(f"[Worker] Perte du leadership ou erreur DB: {e}")
+            stop.wait(STANDBY_RETRY_SECONDS)
+        finally:
+            if conn is not None:
+                # Ferme la connexion physique (après l'arrêt du scheduler): libère le lock et le LISTEN
+                conn.invalidate()
+                conn.close()
+
+
+def main():
+    stop = threading.Event()
+
+    def handle_signal(signum, frame):
+        logger.info(f"[Worker] Signal {signum} reçu, arrêt...")
+        stop.set()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    logger.info("[Worker] Démarré")
+    run(stop)
+    logger.info("[Worker] Arrêté")
+
+
+if __name__ == "__main__":
+    main()
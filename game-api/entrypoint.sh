@@ -0,0 +1,34 @@
+#!/usr/bin/env bash
+# Rôle du conteneur game-api (APP_ROLE):
+#   all    (défaut) API uvicorn + worker des jobs planifiés dans le même conteneur
+#   api    API seule (quand un service worker séparé tourne)
+#   worker python -m app.worker seul (jobs planifiés, leader élu par advisory lock)
+# Plusieurs workers (réplicas "all" ou "worker") peuvent tourner: un seul est leader.
+set -u
+
+API_CMD=(uvicorn app.main:app --host 0.0.0.0 --port 8000)
+WORKER_CMD=(python -m app.worker)
+
+case "${APP_ROLE:-all}" in
+  api)
+    exec "${API_CMD[@]}"
+    ;;
+  worker)
+    exec "${WORKER_CMD[@]}"
+    ;;
+  all)
+    "${WORKER_CMD[@]}" &
+    "${API_CMD[@]}" &
+    trap 'kill -TERM $(jobs -p) 2>/dev/null' TERM INT
+    # Le conteneur s'arrête (et redémarre via la restart policy) si l'un des deux s'arrête
+    wait -n
+    status=$?
+    kill -TERM $(jobs -p) 2>/dev/null
+    wait
+    exit "$status"
+    ;;
+  *)
+    echo "APP_ROLE inconnu: ${APP_ROLE} (all, api, worker)" >&2
+    exit 64
+    ;;
+esac
@@ -0,0 +1,75 @@
+"""
+Benchmark of AirportIndex.distance_matrix (app/services/airport_index.py) against the
+per-pair haversine of routers/missions.py, on random airports of public.airports.
+Checks both agree (exit code 1 otherwise) and prints pairs/s for each.
+Run this script from the project root: DATABASE_URL=... python scripts/bench_airport_distance.py
+"""
+import os
+import random
+import sys
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'game-api'))
+
+import numpy as np
+
+from app.core.db import SessionLocal
+from app.routers.missions import _haversine_distance_nm
+from app.services.airport_index import load_airport_index
+
+SIZES = [(1, 1), (1, 500), (100, 100), (500, 500)]
+MAX_ERROR_NM = 1e-6
+
+
+def bench():
+    db = SessionLocal()
+    try:
+        index = load_airport_index(db)
+    finally:
+        db.close()
+    if index.size < 2:
+        print("skipped: airport index is empty")
+        return
+
+    rng = random.Random(5)
+    idents = [a.ident for a in index.airports]
+    failed = False
+
+    print(f"{'matrix':>9} {'numpy ms':>9} {'python ms':>10} {'speedup':>8} {'max err nm':>11}")
+    for m, n in SIZES:
+        origins = [rng.choice(idents) for _ in range(m)]
+        destinations = [rng.choice(idents) for _ in range(n)]
+
+        start = time.perf_counter()
+        matrix = index.distance_matrix(origins, destinations)
+        numpy_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        expected = np.array([
+            [
+                _haversine_distance_nm(o.latitude_deg, o.longitude_deg, d.latitude_deg, d.longitude_deg)
+                for d in map(index.get, destinations)
+            ]
+            for o in map(index.get, origins)
+        ])
+        python_ms = (time.perf_counter() - start) * 1000
+
+        error = float(np.max(np.abs(matrix - expected)))
+        print(f"{f'{m}x{n}':>9} {numpy_ms:>9.2f} {python_ms:>10.2f} {python_ms / max(numpy_ms, 1e-6):>7.0f}x {error:>11.2e}")
+        if error > MAX_ERROR_NM:
+            failed = True
+
+    unknown = index.distance_matrix(["ZZZZ-UNKNOWN", idents[0]], [idents[1]])
+    if not np.isnan(unknown[0, 0]) or np.isnan(unknown[1, 0]):
+        print("FAIL: unknown idents must give NaN (and only them)")
+        failed = True
+
+    if failed:
+        print(f"FAIL: distances differ from the per-pair haversine by more than {MAX_ERROR_NM} nm")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,145 @@
+"""
+Benchmark of POST /fleet/{aircraft_id}/manifest vs. single /load and /unload calls.
+Loads then unloads a 20-line manifest both ways and compares SQL statements and latency.
+Checks the manifest leaves the same stock as the single calls (exit code 1 otherwise).
+Test data is created for the run and deleted afterwards.
+Run this script from the project root: DATABASE_URL=... python scripts/bench_cargo_manifest.py
+"""
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'game-api'))
+
+from sqlalchemy import event, text
+
+from app.core.auth_context import get_auth_context, invalidate_auth_context
+from app.core.db import SessionLocal, engine
+from app.deps import RequestContext
+from app.models.airport import Airport  # noqa: F401 (FK company_aircraft.current_airport_ident)
+from app.models.company import Company
+from app.models.company_aircraft import CompanyAircraft
+from app.models.company_member import CompanyMember
+from app.models.company_permission import CompanyPermission
+from app.models.inventory_item import InventoryItem
+from app.models.inventory_location import InventoryLocation
+from app.models.item import Item
+from app.models.user import User
+from app.routers import fleet
+from app.schemas.fleet import CargoManifestIn, LoadCargoIn, UnloadCargoIn
+
+MANIFEST_LINES = 20
+QTY = 2
+
+
+def seed(db, airport: str, items: list[Item]) -> tuple[uuid.UUID, uuid.UUID, uuid.UUID]:
+    user = User(
+        id=uuid.uuid4(),
+        email=f"bench-{uuid.uuid4().hex[:8]}@example.com",
+        username=f"bench-{uuid.uuid4().hex[:8]}",
+        password_hash="x",
+        is_active=True,
+        is_admin=False,
+        wallet=0,
+        created_at=datetime.utcnow(),
+    )
+    db.add(user)
+    db.flush()
+    company = Company(name="Bench Cargo", slug=f"bench-{uuid.uuid4().hex[:8]}", home_airport_ident=airport, owner_user_id=user.id)
+    db.add(company)
+    db.flush()
+    db.add(CompanyMember(company_id=company.id, user_id=user.id, role="owner"))
+    db.add(CompanyPermission.create_founder_permissions(company.id, user.id))
+    warehouse = InventoryLocation(
+        kind="warehouse", airport_ident=airport, name=f"Warehouse {airport}",
+        owner_type="company", owner_id=company.id, company_id=company.id,
+    )
+    aircraft = CompanyAircraft(
+        company_id=company.id, owner_type="company", aircraft_type="Bench C208",
+        status="parked", cargo_capacity_kg=1_000_000, current_airport_ident=airport,
+    )
+    db.add_all([warehouse, aircraft])
+    db.flush()
+    for item in items:
+        db.add(InventoryItem(location_id=warehouse.id, item_id=item.id, qty=1_000))
+    db.commit()
+    return user.id, warehouse.id, aircraft.id
+
+
+def stock(db, location_id: uuid.UUID) -> dict:
+    return dict(db.query(InventoryItem.item_id, InventoryItem.qty).filter(InventoryItem.location_id == location_id).all())
+
+
+def bench():
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    db = SessionLocal()
+    airport = db.execute(text("SELECT ident FROM public.airports LIMIT 1")).scalar()
+    items = db.query(Item).order_by(Item.name).limit(MANIFEST_LINES).all()
+    user_id, warehouse_id, aircraft_id = seed(db, airport, items)
+    lines = [items[n % len(items)].id for n in range(MANIFEST_LINES)]  # Items repeated if fewer than MANIFEST_LINES
+    failed = False
+    try:
+        def context():
+            db.expire_all()
+            user = db.merge(get_auth_context(db, user_id).to_user(), load=False)
+            return user, RequestContext(db, get_auth_context(db, user_id), user)
+
+        def run(label, fn):
+            statements.clear()
+            start = time.perf_counter()
+            calls = fn()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            print(f"{label:<30} {calls:>5} calls {len(statements):>6} statements {elapsed_ms:>9.1f} ms")
+
+        def single(action):
+            for item_id in lines:
+                user, ctx = context()
+                if action == "load":
+                    fleet.load_cargo(aircraft_id, LoadCargoIn(from_location_id=warehouse_id, item_id=item_id, qty=QTY), db=db, user=user, ctx=ctx)
+                else:
+                    fleet.unload_cargo(aircraft_id, UnloadCargoIn(to_location_id=warehouse_id, item_id=item_id, qty=QTY), db=db, user=user, ctx=ctx)
+            return len(lines)
+
+        def manifest(action):
+            user, ctx = context()
+            payload = CargoManifestIn(lines=[
+                {"action": action, "location_id": warehouse_id, "item_id": item_id, "qty": QTY} for item_id in lines
+            ])
+            fleet.apply_cargo_manifest(aircraft_id, payload, db=db, user=user, ctx=ctx)
+            return 1
+
+        initial = stock(db, warehouse_id)
+        run(f"single load x{len(lines)}", lambda: single("load"))
+        after_single = stock(db, warehouse_id)
+        run(f"single unload x{len(lines)}", lambda: single("unload"))
+        run(f"manifest load ({len(lines)} lines)", lambda: manifest("load"))
+        after_manifest = stock(db, warehouse_id)
+        run(f"manifest unload ({len(lines)} lines)", lambda: manifest("unload"))
+
+        if after_single != after_manifest or stock(db, warehouse_id) != initial:
+            print("FAIL: manifest and single calls leave different stock")
+            failed = True
+    finally:
+        event.remove(engine, "before_cursor_execute", count_statement)
+        db.rollback()
+        db.query(Company).filter(Company.owner_user_id == user_id).delete(synchronize_session=False)
+        db.query(User).filter(User.id == user_id).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+        invalidate_auth_context(user_id)
+
+    if failed:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    bench()
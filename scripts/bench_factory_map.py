@@ -0,0 +1,61 @@
+"""
+Benchmark /world/factories: SQL statements and latency per response size.
+The statement count must stay constant whatever the number of factories returned.
+Run this script from the project root: DATABASE_URL=... python scripts/bench_factory_map.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'game-api'))
+
+from sqlalchemy import event
+
+from app.core.db import AsyncSessionLocal, async_engine
+from app.routers import world
+
+LIMITS = [1, 10, 100, 500, 2000]
+
+
+async def bench():
+    statements = []
+    engine = async_engine.sync_engine
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    db = AsyncSessionLocal()
+    try:
+        print(f"{'limit':>6} {'rows':>6} {'queries':>8} {'cold ms':>9} {'cached ms':>10}")
+        for limit in LIMITS:
+            world._factory_map_cache.clear()
+            statements.clear()
+
+            start = time.perf_counter()
+            rows = await world.list_factories_for_map(
+                country=None, tier=None,
+                min_lat=None, max_lat=None, min_lon=None, max_lon=None,
+                limit=limit, db=db,
+            )
+            cold_ms = (time.perf_counter() - start) * 1000
+            queries = len(statements)
+
+            start = time.perf_counter()
+            await world.list_factories_for_map(
+                country=None, tier=None,
+                min_lat=None, max_lat=None, min_lon=None, max_lon=None,
+                limit=limit, db=db,
+            )
+            cached_ms = (time.perf_counter() - start) * 1000
+
+            print(f"{limit:>6} {len(rows):>6} {queries:>8} {cold_ms:>9.1f} {cached_ms:>10.3f}")
+    finally:
+        await db.close()
+        event.remove(engine, "before_cursor_execute", count_statement)
+
+
+if __name__ == "__main__":
+    asyncio.run(bench())
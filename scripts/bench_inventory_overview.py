@@ -0,0 +1,117 @@
+"""
+Benchmark /inventory/overview: SQL statements and latency per number of locations.
+The statement count must stay constant whatever the number of warehouses/aircraft
+(exit code 1 otherwise). Test data is created in a transaction and rolled back.
+Run this script from the project root: DATABASE_URL=... python scripts/bench_inventory_overview.py
+"""
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'game-api'))
+
+from sqlalchemy import event
+
+from app.core.auth_context import get_auth_context, invalidate_auth_context
+from app.core.db import SessionLocal, engine
+from app.deps import RequestContext
+from app.models.company import Company
+from app.models.company_member import CompanyMember
+from app.models.company_permission import CompanyPermission
+from app.models.inventory_item import InventoryItem
+from app.models.inventory_location import InventoryLocation
+from app.models.item import Item
+from app.models.user import User
+from app.routers import inventory
+
+LOCATION_COUNTS = [1, 10, 50, 200]
+ITEMS_PER_LOCATION = 3
+
+
+def seed(db, items: list[Item]) -> User:
+    user = User(
+        id=uuid.uuid4(),
+        email=f"bench-{uuid.uuid4().hex[:8]}@example.com",
+        username=f"bench-{uuid.uuid4().hex[:8]}",
+        password_hash="x",
+        is_active=True,
+        is_admin=False,
+        wallet=0,
+        created_at=datetime.utcnow(),
+    )
+    db.add(user)
+    db.flush()
+    company = Company(name="Bench Co", slug=f"bench-{uuid.uuid4().hex[:8]}", home_airport_ident="LFPG", owner_user_id=user.id)
+    db.add(company)
+    db.flush()
+    db.add(CompanyMember(company_id=company.id, user_id=user.id, role="owner"))
+    db.add(CompanyPermission.create_founder_permissions(company.id, user.id))
+    db.flush()
+    return user
+
+
+def add_locations(db, company_id: uuid.UUID, count: int, items: list[Item]):
+    for i in range(count):
+        loc = InventoryLocation(
+            kind="warehouse",
+            airport_ident=f"B{i % 20:03d}",
+            name=f"Bench warehouse {i}",
+            owner_type="company",
+            owner_id=company_id,
+            company_id=company_id,
+        )
+        db.add(loc)
+        db.flush()
+        for item in items:
+            db.add(InventoryItem(location_id=loc.id, item_id=item.id, qty=5))
+    db.flush()
+
+
+def bench():
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    db = SessionLocal()
+    query_counts = set()
+    items = db.query(Item).limit(ITEMS_PER_LOCATION).all()
+    user = seed(db, items)
+    user_id = user.id
+    try:
+        ctx = RequestContext(db, get_auth_context(db, user_id), user)
+
+        print(f"{'locations':>9} {'containers':>10} {'queries':>8} {'ms':>9}")
+        created = 0
+        for count in LOCATION_COUNTS:
+            add_locations(db, ctx.company_id, count - created, items)
+            created = count
+            db.expire_all()
+
+            statements.clear()
+            start = time.perf_counter()
+            overview = inventory.get_inventory_overview(db=db, ctx=ctx)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            queries = len(statements)
+            query_counts.add(queries)
+
+            containers = sum(len(a.containers) for a in overview.locations)
+            print(f"{count:>9} {containers:>10} {queries:>8} {elapsed_ms:>9.1f}")
+    finally:
+        event.remove(engine, "before_cursor_execute", count_statement)
+        db.rollback()
+        db.close()
+        invalidate_auth_context(user_id)
+
+    if len(query_counts) != 1:
+        print(f"FAIL: statement count depends on the number of locations ({sorted(query_counts)})")
+        sys.exit(1)
+    print(f"OK: {query_counts.pop()} statements whatever the number of locations")
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,167 @@
+"""
+Benchmark of the market order book (app/services/order_book.py).
+1. In-memory matching only (OrderBook): orders/s
+2. End-to-end MatchingEngine.place (escrow + matching + settlement + commit): orders/s,
+   then checks that money and stock are conserved (exit code 1 otherwise).
+Test companies are created for the run and deleted afterwards.
+Run this script from the project root: DATABASE_URL=... python scripts/bench_order_book.py
+"""
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'game-api'))
+
+from sqlalchemy import func
+
+from app.core.db import SessionLocal
+from app.models.company import Company
+from app.models.company_inventory import CompanyInventory
+from app.models.item import Item
+from app.models.market_order import MarketOrder, MarketTrade
+from app.models.user import User
+from app.services.order_book import BookOrder, MatchingEngine, OrderBook, OrderRejected
+
+IN_MEMORY_ORDERS = 200_000
+END_TO_END_ORDERS = 2_000
+COMPANIES = 4
+AIRPORT = "ZZOB"
+START_BALANCE = Decimal("1000000000.00")
+START_STOCK = 1_000_000
+
+
+def random_order(rng: random.Random, companies: list[uuid.UUID]) -> tuple[str, Decimal, int, uuid.UUID]:
+    side = rng.choice(("buy", "sell"))
+    price = Decimal(rng.randint(95, 105))
+    return side, price, rng.randint(1, 20), rng.choice(companies)
+
+
+def bench_in_memory():
+    rng = random.Random(42)
+    companies = [uuid.uuid4() for _ in range(COMPANIES)]
+    book = OrderBook()
+    fills = 0
+
+    start = time.perf_counter()
+    for seq in range(IN_MEMORY_ORDERS):
+        side, price, qty, company_id = random_order(rng, companies)
+        fills += len(book.match(BookOrder(uuid.uuid4(), company_id, side, price, qty, seq)))
+    elapsed = time.perf_counter() - start
+
+    print(f"[in-memory] {IN_MEMORY_ORDERS} orders, {fills} fills, {len(book)} resting: "
+          f"{IN_MEMORY_ORDERS / elapsed:,.0f} orders/s")
+
+
+def seed(db, item: Item) -> list[uuid.UUID]:
+    company_ids = []
+    for i in range(COMPANIES):
+        user = User(
+            id=uuid.uuid4(),
+            email=f"bench-ob-{uuid.uuid4().hex[:8]}@example.com",
+            username=f"bench-ob-{uuid.uuid4().hex[:8]}",
+            password_hash="x",
+            is_active=True,
+            is_admin=False,
+            wallet=0,
+            created_at=datetime.utcnow(),
+        )
+        db.add(user)
+        db.flush()
+        company = Company(
+            name=f"Bench OB {i}", slug=f"bench-ob-{uuid.uuid4().hex[:8]}",
+            home_airport_ident=AIRPORT, owner_user_id=user.id, balance=START_BALANCE,
+        )
+        db.add(company)
+        db.flush()
+        db.add(CompanyInventory(company_id=company.id, item_id=item.id, airport_ident=AIRPORT, qty=START_STOCK))
+        company_ids.append(company.id)
+    db.commit()
+    return company_ids
+
+
+def totals(db, company_ids: list[uuid.UUID], item: Item) -> tuple[Decimal, int]:
+    """Balances + buy escrow, stock + sell escrow (must not change)."""
+    balance = db.query(func.sum(Company.balance)).filter(Company.id.in_(company_ids)).scalar()
+    stock = db.query(func.sum(CompanyInventory.qty)).filter(
+        CompanyInventory.company_id.in_(company_ids), CompanyInventory.item_id == item.id,
+    ).scalar()
+    open_orders = db.query(MarketOrder).filter(
+        MarketOrder.company_id.in_(company_ids), MarketOrder.status.in_(("open", "partial")),
+    ).all()
+    for order in open_orders:
+        remaining = order.quantity - order.filled_quantity
+        if order.side == "buy":
+            balance += Decimal(order.unit_price) * remaining
+        else:
+            stock += remaining
+    return balance, stock
+
+
+def bench_end_to_end():
+    db = SessionLocal()
+    item = db.query(Item).order_by(Item.name).first()
+    if item is None:
+        print("[end-to-end] skipped: no item in game.items")
+        return True
+
+    engine = MatchingEngine()
+    company_ids = seed(db, item)
+    try:
+        before = totals(db, company_ids, item)
+        rng = random.Random(7)
+        trades = rejected = 0
+
+        start = time.perf_counter()
+        for _ in range(END_TO_END_ORDERS):
+            side, price, qty, company_id = random_order(rng, company_ids)
+            order = MarketOrder(
+                id=uuid.uuid4(), company_id=company_id, side=side, item_code=item.name,
+                airport_ident=AIRPORT, quantity=qty, unit_price=price, status="open",
+            )
+            try:
+                trades += len(engine.place(db, order))
+            except OrderRejected:
+                rejected += 1
+        elapsed = time.perf_counter() - start
+
+        # Cancel half of what is left in the book (escrow refund)
+        open_orders = db.query(MarketOrder).filter(
+            MarketOrder.company_id.in_(company_ids), MarketOrder.status.in_(("open", "partial")),
+        ).all()
+        for order in open_orders[::2]:
+            engine.cancel(db, order)
+
+        db.expire_all()
+        after = totals(db, company_ids, item)
+        recorded = db.query(func.count(MarketTrade.id)).filter(MarketTrade.buyer_company_id.in_(company_ids)).scalar()
+
+        print(f"[end-to-end] {END_TO_END_ORDERS} orders, {trades} trades, {rejected} rejected, "
+              f"{len(open_orders[::2])} cancelled: {END_TO_END_ORDERS / elapsed:,.0f} orders/s")
+
+        ok = True
+        if before != after:
+            print(f"FAIL: balance/stock not conserved (before={before}, after={after})")
+            ok = False
+        if recorded != trades:
+            print(f"FAIL: {recorded} market_trades rows for {trades} trades")
+            ok = False
+        return ok
+    finally:
+        db.rollback()
+        owners = [c.owner_user_id for c in db.query(Company).filter(Company.id.in_(company_ids))]
+        db.query(Company).filter(Company.id.in_(company_ids)).delete(synchronize_session=False)
+        db.query(User).filter(User.id.in_(owners)).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    bench_in_memory()
+    if not bench_end_to_end():
+        sys.exit(1)
+    print("OK")
@@ -169,9 +169,9 @@ def seed_factories():
         try:
             cur.execute("""
                 INSERT INTO game.factories
-                (company_id, airport_ident, name, tier, factory_type, status)
-                VALUES (%s, %s, %s, 0, 'extraction', 'producing')
-            """, (NPC_COMPANY_ID, airport_ident, factory_name))
+                (company_id, airport_ident, name, tier, factory_type, status, output_item_id)
+                VALUES (%s, %s, %s, 0, 'extraction', 'producing', %s)
+            """, (NPC_COMPANY_ID, airport_ident, factory_name, item_id))
             created += 1
             print(f"  OK: {factory_name} @ {airport_ident} ({region})")
         except Exception as e:
@@ -0,0 +1,191 @@
+"""
+Concurrency stress test of POST /inventory/market/buy (routers/inventory.buy_from_market).
+Hundreds of parallel purchases against a few listings, including cross purchases
+between companies (A buys from B while B buys from A) to exercise lock ordering.
+Checks: no oversell, item quantities and money conserved, no deadlock/error
+(exit code 1 otherwise). Test data is created for the run and deleted afterwards.
+Run this script from the project root: DATABASE_URL=... python scripts/stress_market_buy.py
+"""
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'game-api'))
+
+from fastapi import HTTPException
+from sqlalchemy import func
+
+from app.core.auth_context import get_auth_context, invalidate_auth_context
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.deps import RequestContext
+from app.models.company import Company
+from app.models.company_member import CompanyMember
+from app.models.company_permission import CompanyPermission
+from app.models.inventory_item import InventoryItem
+from app.models.inventory_location import InventoryLocation
+from app.models.item import Item
+from app.models.user import User
+from app.routers import inventory
+from app.schemas.inventory import BuyFromMarketIn
+
+PURCHASES = 400
+WORKERS = min(32, settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW)
+COMPANIES = 6
+LISTING_QTY = 100  # Par company: demande totale > offre totale
+PRICE = Decimal("10.00")
+AIRPORT = "ZZMB"
+START_BALANCE = Decimal("1000000.00")
+START_WALLET = Decimal("500.00")
+
+
+def new_user(db) -> User:
+    user = User(
+        id=uuid.uuid4(),
+        email=f"stress-{uuid.uuid4().hex[:8]}@example.com",
+        username=f"stress-{uuid.uuid4().hex[:8]}",
+        password_hash="x",
+        is_active=True,
+        is_admin=False,
+        wallet=START_WALLET,
+        created_at=datetime.utcnow(),
+    )
+    db.add(user)
+    db.flush()
+    return user
+
+
+def seed(db, item: Item) -> tuple[list[uuid.UUID], list[uuid.UUID], dict[uuid.UUID, uuid.UUID]]:
+    """Une company par owner, chacune avec un warehouse et une annonce au même aéroport."""
+    user_ids, company_ids, listings = [], [], {}
+    for i in range(COMPANIES):
+        user = new_user(db)
+        company = Company(
+            name=f"Stress {i}", slug=f"stress-{uuid.uuid4().hex[:8]}",
+            home_airport_ident=AIRPORT, owner_user_id=user.id, balance=START_BALANCE,
+        )
+        db.add(company)
+        db.flush()
+        db.add(CompanyMember(company_id=company.id, user_id=user.id, role="owner"))
+        db.add(CompanyPermission.create_founder_permissions(company.id, user.id))
+        loc = InventoryLocation(
+            kind="warehouse", airport_ident=AIRPORT, name=f"Warehouse {AIRPORT}",
+            owner_type="company", owner_id=company.id, company_id=company.id,
+        )
+        db.add(loc)
+        db.flush()
+        db.add(InventoryItem(
+            location_id=loc.id, item_id=item.id, qty=LISTING_QTY,
+            for_sale=True, sale_price=PRICE, sale_qty=LISTING_QTY,
+        ))
+        user_ids.append(user.id)
+        company_ids.append(company.id)
+        listings[company.id] = loc.id
+    db.commit()
+    return user_ids, company_ids, listings
+
+
+def totals(db, user_ids, company_ids, item: Item) -> tuple[Decimal, int]:
+    money = db.query(func.sum(Company.balance)).filter(Company.id.in_(company_ids)).scalar()
+    money += db.query(func.sum(User.wallet)).filter(User.id.in_(user_ids)).scalar()
+    stock = db.query(func.sum(InventoryItem.qty)).join(InventoryLocation).filter(
+        InventoryItem.item_id == item.id,
+        InventoryLocation.owner_id.in_(user_ids + company_ids),
+    ).scalar()
+    return money, stock
+
+
+def stress():
+    db = SessionLocal()
+    item = db.query(Item).order_by(Item.name).first()
+    if item is None:
+        print("skipped: no item in game.items")
+        return
+
+    user_ids, company_ids, listings = seed(db, item)
+    failed = False
+    try:
+        before = totals(db, user_ids, company_ids, item)
+        rng = random.Random(1)
+        plan = []
+        for _ in range(PURCHASES):
+            buyer = rng.randrange(COMPANIES)
+            seller = rng.choice([i for i in range(COMPANIES) if i != buyer])
+            plan.append((user_ids[buyer], listings[company_ids[seller]], rng.randint(1, 3), rng.choice(("company", "player"))))
+
+        sold: dict[uuid.UUID, int] = {}
+        counts = {"ok": 0, "rejected": 0, "errors": 0}
+        lock = threading.Lock()
+
+        def buy(user_id, seller_location_id, qty, buyer_type):
+            session = SessionLocal()
+            try:
+                user = session.merge(get_auth_context(session, user_id).to_user(), load=False)
+                ctx = RequestContext(session, get_auth_context(session, user_id), user)
+                payload = BuyFromMarketIn(
+                    seller_location_id=seller_location_id, item_code=item.name, qty=qty, buyer_type=buyer_type,
+                )
+                inventory.buy_from_market(payload, db=session, user=user, ctx=ctx)
+                with lock:
+                    counts["ok"] += 1
+                    sold[seller_location_id] = sold.get(seller_location_id, 0) + qty
+            except HTTPException:
+                with lock:
+                    counts["rejected"] += 1
+            except Exception as e:
+                with lock:
+                    counts["errors"] += 1
+                print(f"ERROR: {type(e).__name__}: {str(e).splitlines()[0]}")
+            finally:
+                session.close()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+            for args in plan:
+                pool.submit(buy, *args)
+        elapsed = time.perf_counter() - start
+
+        print(f"{PURCHASES} purchases, {WORKERS} workers: {counts['ok']} ok, {counts['rejected']} rejected, "
+              f"{counts['errors']} errors in {elapsed:.2f}s ({PURCHASES / elapsed:,.0f} purchases/s)")
+
+        db.expire_all()
+        for company_id, location_id in listings.items():
+            listing = db.query(InventoryItem).filter(
+                InventoryItem.location_id == location_id, InventoryItem.item_id == item.id,
+            ).one()
+            expected = LISTING_QTY - sold.get(location_id, 0)
+            if listing.sale_qty != expected or listing.sale_qty < 0 or listing.qty < 0:
+                print(f"FAIL: listing {location_id} sale_qty={listing.sale_qty} qty={listing.qty}, expected {expected}")
+                failed = True
+
+        after = totals(db, user_ids, company_ids, item)
+        if before != after:
+            print(f"FAIL: money/stock not conserved (before={before}, after={after})")
+            failed = True
+        if counts["errors"]:
+            failed = True
+    finally:
+        db.rollback()
+        db.query(InventoryLocation).filter(
+            InventoryLocation.owner_id.in_(user_ids + company_ids)
+        ).delete(synchronize_session=False)
+        db.query(Company).filter(Company.id.in_(company_ids)).delete(synchronize_session=False)
+        db.query(User).filter(User.id.in_(user_ids)).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+        invalidate_auth_context(*user_ids)
+
+    if failed:
+        sys.exit(1)
+    print("OK: no oversell, money and stock conserved")
+
+
+if __name__ == "__main__":
+    stress()
@@ -0,0 +1,132 @@
+-- V0.9 Aircraft cargo totals: weight / item count / pax maintained on game.company_aircraft
+-- Kept up to date by triggers on game.inventory_items (fleet load/unload, manifest,
+-- /inventory/transfer, mission delivery...) and game.inventory_locations (cargo
+-- location deleted or re-attached). Capacity checks read one aircraft row instead of
+-- SUM(qty * weight_kg) over the cargo location.
+--
+-- Cargo = inventory_items of the aircraft's location (kind = 'aircraft').
+-- Pax = qty of items tagged 'pax'.
+-- Resync at any time (e.g. after changing items.weight_kg) with:
+--   SELECT game.rebuild_aircraft_cargo_totals();
+
+ALTER TABLE game.company_aircraft ADD COLUMN IF NOT EXISTS current_cargo_kg NUMERIC(14, 3) NOT NULL DEFAULT 0;
+ALTER TABLE game.company_aircraft ADD COLUMN IF NOT EXISTS current_cargo_items BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE game.company_aircraft ADD COLUMN IF NOT EXISTS current_pax INT NOT NULL DEFAULT 0;
+
+-- Apply one stock row's contribution (sign = +1 to add, -1 to remove)
+CREATE OR REPLACE FUNCTION game.aircraft_cargo_apply(
+    p_location_id UUID, p_item_id UUID, p_qty BIGINT, p_sign INT
+) RETURNS VOID AS $$
+DECLARE
+    v_aircraft_id UUID;
+BEGIN
+    SELECT aircraft_id INTO v_aircraft_id
+    FROM game.inventory_locations
+    WHERE id = p_location_id AND kind = 'aircraft';
+    IF v_aircraft_id IS NULL THEN
+        RETURN;  -- Not an aircraft, or location deleted (handled by the inventory_locations trigger)
+    END IF;
+
+    UPDATE game.company_aircraft a SET
+        current_cargo_kg = a.current_cargo_kg + p_sign * p_qty * i.weight_kg,
+        current_cargo_items = a.current_cargo_items + p_sign * p_qty,
+        current_pax = a.current_pax + CASE WHEN 'pax' = ANY(i.tags) THEN p_sign * p_qty ELSE 0 END
+    FROM game.items i
+    WHERE a.id = v_aircraft_id AND i.id = p_item_id;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION game.aircraft_cargo_on_inventory_item()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.qty <> 0 THEN
+        PERFORM game.aircraft_cargo_apply(OLD.location_id, OLD.item_id, OLD.qty, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.qty <> 0 THEN
+        PERFORM game.aircraft_cargo_apply(NEW.location_id, NEW.item_id, NEW.qty, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_aircraft_cargo_inventory_item ON game.inventory_items;
+CREATE TRIGGER trigger_aircraft_cargo_inventory_item
+AFTER INSERT OR UPDATE OF qty, location_id, item_id OR DELETE ON game.inventory_items
+FOR EACH ROW EXECUTE FUNCTION game.aircraft_cargo_on_inventory_item();
+
+-- Cargo location re-attached or deleted: move/remove the contributions of its items
+CREATE OR REPLACE FUNCTION game.aircraft_cargo_on_location()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF OLD.kind = 'aircraft' AND OLD.aircraft_id IS NOT NULL THEN
+        UPDATE game.company_aircraft a SET
+            current_cargo_kg = a.current_cargo_kg - t.kg,
+            current_cargo_items = a.current_cargo_items - t.items,
+            current_pax = a.current_pax - t.pax
+        FROM (
+            SELECT COALESCE(SUM(ii.qty * i.weight_kg), 0) AS kg, COALESCE(SUM(ii.qty), 0) AS items,
+                   COALESCE(SUM(ii.qty) FILTER (WHERE 'pax' = ANY(i.tags)), 0) AS pax
+            FROM game.inventory_items ii
+            JOIN game.items i ON i.id = ii.item_id
+            WHERE ii.location_id = OLD.id
+        ) t
+        WHERE a.id = OLD.aircraft_id;
+    END IF;
+
+    IF TG_OP = 'DELETE' THEN
+        RETURN OLD;
+    END IF;
+
+    IF NEW.kind = 'aircraft' AND NEW.aircraft_id IS NOT NULL THEN
+        UPDATE game.company_aircraft a SET
+            current_cargo_kg = a.current_cargo_kg + t.kg,
+            current_cargo_items = a.current_cargo_items + t.items,
+            current_pax = a.current_pax + t.pax
+        FROM (
+            SELECT COALESCE(SUM(ii.qty * i.weight_kg), 0) AS kg, COALESCE(SUM(ii.qty), 0) AS items,
+                   COALESCE(SUM(ii.qty) FILTER (WHERE 'pax' = ANY(i.tags)), 0) AS pax
+            FROM game.inventory_items ii
+            JOIN game.items i ON i.id = ii.item_id
+            WHERE ii.location_id = NEW.id
+        ) t
+        WHERE a.id = NEW.aircraft_id;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_aircraft_cargo_location_moved ON game.inventory_locations;
+CREATE TRIGGER trigger_aircraft_cargo_location_moved
+AFTER UPDATE OF kind, aircraft_id ON game.inventory_locations
+FOR EACH ROW WHEN (OLD.kind IS DISTINCT FROM NEW.kind OR OLD.aircraft_id IS DISTINCT FROM NEW.aircraft_id)
+EXECUTE FUNCTION game.aircraft_cargo_on_location();
+
+-- BEFORE DELETE: the items are still visible (the cascade on inventory_items runs afterwards)
+DROP TRIGGER IF EXISTS trigger_aircraft_cargo_location_deleted ON game.inventory_locations;
+CREATE TRIGGER trigger_aircraft_cargo_location_deleted
+BEFORE DELETE ON game.inventory_locations
+FOR EACH ROW EXECUTE FUNCTION game.aircraft_cargo_on_location();
+
+-- Full resync (initial backfill, or after a manual data fix / items.weight_kg change)
+CREATE OR REPLACE FUNCTION game.rebuild_aircraft_cargo_totals()
+RETURNS VOID AS $$
+BEGIN
+    UPDATE game.company_aircraft a SET
+        current_cargo_kg = COALESCE(t.kg, 0),
+        current_cargo_items = COALESCE(t.items, 0),
+        current_pax = COALESCE(t.pax, 0)
+    FROM game.company_aircraft a2
+    LEFT JOIN (
+        SELECT l.aircraft_id, SUM(ii.qty * i.weight_kg) AS kg, SUM(ii.qty) AS items,
+               COALESCE(SUM(ii.qty) FILTER (WHERE 'pax' = ANY(i.tags)), 0) AS pax
+        FROM game.inventory_locations l
+        JOIN game.inventory_items ii ON ii.location_id = l.id
+        JOIN game.items i ON i.id = ii.item_id
+        WHERE l.kind = 'aircraft' AND l.aircraft_id IS NOT NULL
+        GROUP BY l.aircraft_id
+    ) t ON t.aircraft_id = a2.id
+    WHERE a.id = a2.id;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT game.rebuild_aircraft_cargo_totals();
@@ -0,0 +1,17 @@
+-- V0.9 Market listing (GET /inventory/market): keyset pagination + name search
+-- - Partial index on active listings only, (item_id, sale_price, id): stays small however
+--   many non-listed inventory rows exist. The keyset order is (items.name, sale_price, id):
+--   items.name is unique, so the planner walks items by name (items_name btree) and reads
+--   each item's listings from this index already in (sale_price, id) order; it does not
+--   cover the full order on its own (an incremental sort per item may remain)
+-- - Trigram index on item names: ILIKE '%...%' can use an index (btree cannot)
+-- CONCURRENTLY: run outside a transaction (psql autocommit), no write lock on the tables.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_inventory_items_market_listing
+    ON game.inventory_items (item_id, sale_price, id)
+    WHERE for_sale AND sale_qty > 0;
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_items_name_trgm
+    ON game.items USING gin (name gin_trgm_ops);
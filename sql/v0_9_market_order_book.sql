@@ -0,0 +1,65 @@
+-- V0.9 Market order book: matching of game.market_orders
+-- - One book per (item_code, airport_ident), price-time priority, partial fills
+-- - market_books: one row per book, row-locked by every order placement or
+--   cancellation; seq lets each API process detect that its
+--   in-memory copy of the book is stale
+-- - market_trades: one row per fill (buy order, sell order, qty, price)
+-- Orders are escrowed when placed (buy: balance, sell: company_inventory stock).
+
+ALTER TABLE game.market_orders ADD COLUMN IF NOT EXISTS airport_ident VARCHAR(8);
+ALTER TABLE game.market_orders ADD COLUMN IF NOT EXISTS filled_quantity INT NOT NULL DEFAULT 0;
+-- Time priority: market_books.seq of the placement, assigned under the book lock
+-- (created_at is the transaction start and can disagree with the lock order)
+ALTER TABLE game.market_orders ADD COLUMN IF NOT EXISTS book_seq BIGINT;
+
+-- Legacy orders (no airport, nothing escrowed) were never tradable
+UPDATE game.market_orders SET status = 'cancelled', updated_at = NOW()
+WHERE airport_ident IS NULL AND status = 'open';
+
+-- Orders placed before book_seq existed: keep their created_at order
+UPDATE game.market_orders o SET book_seq = r.rn
+FROM (
+    SELECT id, ROW_NUMBER() OVER (PARTITION BY item_code, airport_ident ORDER BY created_at, id) - 1 AS rn
+    FROM game.market_orders
+    WHERE book_seq IS NULL AND airport_ident IS NOT NULL
+) r
+WHERE o.id = r.id;
+
+-- Book reload: open orders of one book, in time priority
+DROP INDEX IF EXISTS game.idx_market_orders_book_open;
+CREATE INDEX IF NOT EXISTS idx_market_orders_book_open_seq
+    ON game.market_orders (item_code, airport_ident, book_seq, id)
+    WHERE status IN ('open', 'partial');
+
+CREATE TABLE IF NOT EXISTS game.market_books (
+    item_code VARCHAR(64) NOT NULL,
+    airport_ident VARCHAR(8) NOT NULL,
+    seq BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (item_code, airport_ident)
+);
+
+-- Existing books: seq must be past the backfilled book_seq values
+INSERT INTO game.market_books AS b (item_code, airport_ident, seq)
+SELECT item_code, airport_ident, MAX(book_seq) + 1
+FROM game.market_orders
+WHERE airport_ident IS NOT NULL AND book_seq IS NOT NULL
+GROUP BY item_code, airport_ident
+ON CONFLICT (item_code, airport_ident) DO UPDATE SET seq = GREATEST(b.seq, EXCLUDED.seq);
+
+CREATE TABLE IF NOT EXISTS game.market_trades (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    item_code VARCHAR(64) NOT NULL,
+    airport_ident VARCHAR(8) NOT NULL,
+    buy_order_id UUID NOT NULL REFERENCES game.market_orders(id) ON DELETE CASCADE,
+    sell_order_id UUID NOT NULL REFERENCES game.market_orders(id) ON DELETE CASCADE,
+    buyer_company_id UUID NOT NULL,
+    seller_company_id UUID NOT NULL,
+    quantity INT NOT NULL CHECK (quantity > 0),
+    unit_price NUMERIC(14, 2) NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_market_trades_buy_order_id ON game.market_trades(buy_order_id);
+CREATE INDEX IF NOT EXISTS idx_market_trades_sell_order_id ON game.market_trades(sell_order_id);
+CREATE INDEX IF NOT EXISTS idx_market_trades_book ON game.market_trades(item_code, airport_ident, created_at DESC);
@@ -0,0 +1,193 @@
+-- V0.9 Market stats: incrementally maintained aggregate of for-sale listings
+-- One row per (airport_ident, tier) in game.market_stats.
+--
+-- Writers never touch game.market_stats directly: triggers on
+-- game.inventory_items (set_for_sale, buy_from_market, production, moves...)
+-- and game.inventory_locations (aircraft moving, location deleted) append
+-- their deltas to game.market_stats_deltas (insert-only, no shared row lock).
+-- game.fold_market_stats() (scheduler job, every minute) folds the pending
+-- deltas into game.market_stats in (airport_ident, tier) order.
+-- GET /inventory/market/stats reads market_stats + pending deltas: always exact.
+--
+-- A listing = inventory_items row with for_sale = TRUE AND sale_qty > 0.
+-- Resync at any time with: SELECT game.rebuild_market_stats();
+
+CREATE TABLE IF NOT EXISTS game.market_stats (
+    airport_ident VARCHAR(8) NOT NULL,
+    tier INT NOT NULL,
+    listings BIGINT NOT NULL DEFAULT 0,
+    items_for_sale BIGINT NOT NULL DEFAULT 0,
+    total_value NUMERIC(20, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (airport_ident, tier)
+);
+
+CREATE TABLE IF NOT EXISTS game.market_stats_deltas (
+    id BIGSERIAL PRIMARY KEY,
+    airport_ident VARCHAR(8) NOT NULL,
+    tier INT NOT NULL,
+    listings BIGINT NOT NULL DEFAULT 0,
+    items_for_sale BIGINT NOT NULL DEFAULT 0,
+    total_value NUMERIC(20, 2) NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Previous version: one shared market_stats row upserted per listing row event
+DROP TRIGGER IF EXISTS trigger_market_stats_inventory_item ON game.inventory_items;
+DROP FUNCTION IF EXISTS game.market_stats_on_inventory_item();
+DROP FUNCTION IF EXISTS game.market_stats_apply(UUID, UUID, BIGINT, NUMERIC, INT);
+
+-- Statement-level: one delta row per (airport, tier) touched by the statement,
+-- whatever the number of listings (bulk T0 upsert = a handful of inserts).
+-- Rows whose location is already deleted are skipped (handled by the location trigger).
+CREATE OR REPLACE FUNCTION game.market_stats_on_inventory_items()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO game.market_stats_deltas (airport_ident, tier, listings, items_for_sale, total_value)
+        SELECT COALESCE(l.airport_ident, ''), COALESCE(i.tier, 0),
+               COUNT(*), SUM(n.sale_qty), SUM(n.sale_qty * COALESCE(n.sale_price, 0))
+        FROM new_rows n
+        JOIN game.inventory_locations l ON l.id = n.location_id
+        JOIN game.items i ON i.id = n.item_id
+        WHERE n.for_sale AND n.sale_qty > 0
+        GROUP BY 1, 2;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO game.market_stats_deltas (airport_ident, tier, listings, items_for_sale, total_value)
+        SELECT COALESCE(l.airport_ident, ''), COALESCE(i.tier, 0),
+               -COUNT(*), -SUM(o.sale_qty), -SUM(o.sale_qty * COALESCE(o.sale_price, 0))
+        FROM old_rows o
+        JOIN game.inventory_locations l ON l.id = o.location_id
+        JOIN game.items i ON i.id = o.item_id
+        WHERE o.for_sale AND o.sale_qty > 0
+        GROUP BY 1, 2;
+    ELSE
+        -- UPDATE: old contributions out, new ones in; unchanged listings cancel out
+        INSERT INTO game.market_stats_deltas (airport_ident, tier, listings, items_for_sale, total_value)
+        SELECT COALESCE(l.airport_ident, ''), COALESCE(i.tier, 0),
+               SUM(t.sign), SUM(t.sign * t.qty), SUM(t.sign * t.value)
+        FROM (
+            SELECT o.location_id, o.item_id, -1 AS sign,
+                   o.sale_qty AS qty, o.sale_qty * COALESCE(o.sale_price, 0) AS value
+            FROM old_rows o
+            WHERE o.for_sale AND o.sale_qty > 0
+            UNION ALL
+            SELECT n.location_id, n.item_id, 1,
+                   n.sale_qty, n.sale_qty * COALESCE(n.sale_price, 0)
+            FROM new_rows n
+            WHERE n.for_sale AND n.sale_qty > 0
+        ) t
+        JOIN game.inventory_locations l ON l.id = t.location_id
+        JOIN game.items i ON i.id = t.item_id
+        GROUP BY 1, 2
+        HAVING SUM(t.sign) <> 0 OR SUM(t.sign * t.qty) <> 0 OR SUM(t.sign * t.value) <> 0;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables: one trigger per event (no column list allowed)
+DROP TRIGGER IF EXISTS trigger_market_stats_items_insert ON game.inventory_items;
+CREATE TRIGGER trigger_market_stats_items_insert
+AFTER INSERT ON game.inventory_items
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION game.market_stats_on_inventory_items();
+
+DROP TRIGGER IF EXISTS trigger_market_stats_items_update ON game.inventory_items;
+CREATE TRIGGER trigger_market_stats_items_update
+AFTER UPDATE ON game.inventory_items
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION game.market_stats_on_inventory_items();
+
+DROP TRIGGER IF EXISTS trigger_market_stats_items_delete ON game.inventory_items;
+CREATE TRIGGER trigger_market_stats_items_delete
+AFTER DELETE ON game.inventory_items
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION game.market_stats_on_inventory_items();
+
+-- Location moved (aircraft) or deleted: move/remove the contributions of its listings
+CREATE OR REPLACE FUNCTION game.market_stats_on_location()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO game.market_stats_deltas (airport_ident, tier, listings, items_for_sale, total_value)
+    SELECT t.airport_ident, t.tier, SUM(t.sign), SUM(t.sign * t.qty), SUM(t.sign * t.value)
+    FROM (
+        SELECT COALESCE(OLD.airport_ident, '') AS airport_ident, COALESCE(i.tier, 0) AS tier, -1 AS sign,
+               ii.sale_qty AS qty, ii.sale_qty * COALESCE(ii.sale_price, 0) AS value
+        FROM game.inventory_items ii
+        JOIN game.items i ON i.id = ii.item_id
+        WHERE ii.location_id = OLD.id AND ii.for_sale AND ii.sale_qty > 0
+        UNION ALL
+        SELECT COALESCE(NEW.airport_ident, ''), COALESCE(i.tier, 0), 1,
+               ii.sale_qty, ii.sale_qty * COALESCE(ii.sale_price, 0)
+        FROM game.inventory_items ii
+        JOIN game.items i ON i.id = ii.item_id
+        WHERE TG_OP = 'UPDATE' AND ii.location_id = NEW.id AND ii.for_sale AND ii.sale_qty > 0
+    ) t
+    GROUP BY t.airport_ident, t.tier;
+
+    IF TG_OP = 'DELETE' THEN
+        RETURN OLD;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_market_stats_location_moved ON game.inventory_locations;
+CREATE TRIGGER trigger_market_stats_location_moved
+AFTER UPDATE OF airport_ident ON game.inventory_locations
+FOR EACH ROW WHEN (OLD.airport_ident IS DISTINCT FROM NEW.airport_ident)
+EXECUTE FUNCTION game.market_stats_on_location();
+
+-- BEFORE DELETE: the listings are still visible (the cascade on inventory_items runs afterwards)
+DROP TRIGGER IF EXISTS trigger_market_stats_location_deleted ON game.inventory_locations;
+CREATE TRIGGER trigger_market_stats_location_deleted
+BEFORE DELETE ON game.inventory_locations
+FOR EACH ROW EXECUTE FUNCTION game.market_stats_on_location();
+
+-- Fold the committed deltas into market_stats. Rows are upserted in key order,
+-- so two concurrent folds never deadlock; deltas committed meanwhile wait for the next fold.
+CREATE OR REPLACE FUNCTION game.fold_market_stats()
+RETURNS INT AS $$
+DECLARE
+    v_rows INT;
+BEGIN
+    WITH folded AS (
+        DELETE FROM game.market_stats_deltas
+        RETURNING airport_ident, tier, listings, items_for_sale, total_value
+    )
+    INSERT INTO game.market_stats AS ms (airport_ident, tier, listings, items_for_sale, total_value, updated_at)
+    SELECT airport_ident, tier, SUM(listings), SUM(items_for_sale), SUM(total_value), NOW()
+    FROM folded
+    GROUP BY airport_ident, tier
+    ORDER BY airport_ident, tier
+    ON CONFLICT (airport_ident, tier) DO UPDATE SET
+        listings = ms.listings + EXCLUDED.listings,
+        items_for_sale = ms.items_for_sale + EXCLUDED.items_for_sale,
+        total_value = ms.total_value + EXCLUDED.total_value,
+        updated_at = NOW();
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Full resync (initial backfill, or after a manual data fix)
+-- EXCLUSIVE on the deltas waits for in-flight writers and blocks new ones until commit
+CREATE OR REPLACE FUNCTION game.rebuild_market_stats()
+RETURNS VOID AS $$
+BEGIN
+    LOCK TABLE game.market_stats_deltas, game.market_stats IN EXCLUSIVE MODE;
+    DELETE FROM game.market_stats_deltas;
+    DELETE FROM game.market_stats;
+    INSERT INTO game.market_stats (airport_ident, tier, listings, items_for_sale, total_value)
+    SELECT COALESCE(l.airport_ident, ''), COALESCE(i.tier, 0),
+           COUNT(*), SUM(ii.sale_qty), SUM(ii.sale_qty * COALESCE(ii.sale_price, 0))
+    FROM game.inventory_items ii
+    JOIN game.inventory_locations l ON l.id = ii.location_id
+    JOIN game.items i ON i.id = ii.item_id
+    WHERE ii.for_sale AND ii.sale_qty > 0
+    GROUP BY 1, 2;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT game.rebuild_market_stats();
@@ -0,0 +1,6 @@
+-- V0.9 Missions: index for the timeout sweeper
+-- check_mission_timeouts (every 15 min) selects in_progress missions
+-- started more than MISSION_TIMEOUT_HOURS ago.
+
+CREATE INDEX IF NOT EXISTS idx_missions_status_started_at
+ON game.missions(status, started_at);
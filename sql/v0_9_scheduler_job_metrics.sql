@@ -0,0 +1,10 @@
+-- V0.9 Scheduler: per-job execution metrics
+-- One row per scheduler job, overwritten by the leader worker after each run
+-- (runs, failures, skipped runs, duration histogram, rows processed...).
+-- Read by GET /admin/metrics/jobs.
+
+CREATE TABLE IF NOT EXISTS game.scheduler_job_metrics (
+    job_id VARCHAR(64) PRIMARY KEY,
+    metrics JSONB NOT NULL DEFAULT '{}',
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
@@ -0,0 +1,16 @@
+-- V0.9 T0 factories: persisted output item
+-- The item produced by a T0 (NPC) factory used to be guessed from its name
+-- (substring match) on every production cycle and every map request.
+-- It is now resolved once and stored in factories.output_item_id.
+--
+-- Backfill: rows left NULL are resolved and saved by the T0 production job
+-- (production_service.backfill_t0_output_items) on its next cycle.
+
+ALTER TABLE game.factories
+ADD COLUMN IF NOT EXISTS output_item_id UUID REFERENCES game.items(id);
+
+COMMENT ON COLUMN game.factories.output_item_id IS 'T0: item produced (resolved once from factory name)';
+
+CREATE INDEX IF NOT EXISTS idx_factories_t0_output_item
+ON game.factories(output_item_id)
+WHERE tier = 0;
@@ -0,0 +1,7 @@
+-- V0.9 Workers: index for the injured-worker lifecycle job
+-- process_injured_workers only touches workers injured for more than
+-- MAX_INJURY_DAYS (status = 'injured' AND injured_at <= cutoff), so the
+-- scan is proportional to actual deaths instead of all injured workers.
+
+CREATE INDEX IF NOT EXISTS idx_worker_instances_status_injured_at
+ON game.worker_instances(status, injured_at);